@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Async Workflow Engine — runs many workflows concurrently on one event loop.
+Each run gets its own pause/resume/cancel handle; the callback attributes
+mirror WorkflowEngine so the Tk GUIs can bind the same handlers.
+"""
+
+import asyncio
+import copy
+import inspect
+import itertools
+import threading
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+import logging
+
+from workflow_conditions import ConditionContext
+from workflow_engine import Workflow, WorkflowStep
+from workflow_fanout import FanoutError, aggregate_results, expand_items, item_variables
+
+logger = logging.getLogger(__name__)
+
+SendFn = Callable[[str], Union[str, Awaitable[str]]]
+
+
+def _drain_send(fn: SendFn, prompt: str) -> Any:
+    """Call a sync send function; streamed (iterator) results are joined
+    in the worker thread so the event loop never iterates blocking chunks"""
+    result = fn(prompt)
+    if result is None or isinstance(result, str) or inspect.isawaitable(result):
+        return result
+    return "".join(str(chunk) for chunk in result)
+
+
+class WorkflowRun:
+    """Handle for a single run on an AsyncWorkflowEngine.
+    Control methods are safe to call from any thread."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, engine: "AsyncWorkflowEngine", workflow: Workflow,
+                 loop_mode: bool = False, loop_interval: float = 120.0):
+        self.run_id = next(self._ids)
+        self.workflow = workflow
+        self.loop_mode = loop_mode
+        self.loop_interval = loop_interval
+        self.status = "pending"  # pending | running | completed | cancelled | error: ...
+        self.current_step_index = -1
+        self._engine = engine
+        self._paused = False
+        self._cancel_requested = False
+        self._changed = asyncio.Event()
+        self._inflight: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._conditions: Optional[ConditionContext] = None  # guards, per iteration
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def is_paused(self) -> bool:
+        return self._paused
+
+    def pause(self):
+        self._engine._call_in_loop(self._set_paused, True)
+
+    def resume(self):
+        self._engine._call_in_loop(self._set_paused, False)
+
+    def cancel(self):
+        self._engine._call_in_loop(self._cancel)
+
+    async def wait(self) -> str:
+        """Await the end of the run and return its final status"""
+        if self._task:
+            await asyncio.shield(self._task)
+        return self.status
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """Block a non-loop thread until the run finishes"""
+        future = asyncio.run_coroutine_threadsafe(self.wait(), self._engine.loop)
+        return future.result(timeout)
+
+    # --- loop-thread internals ---
+    def _set_paused(self, paused: bool):
+        if self.is_running and self._paused != paused:
+            self._paused = paused
+            self._notify()
+
+    def _cancel(self):
+        self._cancel_requested = True
+        self.loop_mode = False
+        self._paused = False
+        for task in list(self._inflight):
+            task.cancel()
+        self._notify()
+
+    def _notify(self):
+        """Wake every coroutine waiting on this run's state"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait_changed(self, timeout: Optional[float] = None):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _wait_while_paused(self):
+        while self._paused and not self._cancel_requested:
+            await self._wait_changed()
+
+
+class AsyncWorkflowEngine:
+    """Event-loop engine that executes any number of workflow runs at once"""
+
+    def __init__(self, max_parallel_steps: int = 4, max_concurrent_sends: Optional[int] = None):
+        # Same callback surface as WorkflowEngine (called on the loop thread)
+        self.on_step_start: Optional[Callable[[int, WorkflowStep], None]] = None
+        self.on_step_complete: Optional[Callable[[int, WorkflowStep, str], None]] = None
+        self.on_workflow_done: Optional[Callable[[Workflow, str], None]] = None
+        self.on_error: Optional[Callable[[int, WorkflowStep, str], None]] = None
+        self.on_progress: Optional[Callable[[int, int, float], None]] = None
+        self.on_loop_wait: Optional[Callable[[float], None]] = None
+
+        # Coroutine functions or plain callables (plain ones run in a worker thread)
+        self.send_prompt_fn: Optional[SendFn] = None
+        self.send_and_wait_fn: Optional[SendFn] = None
+
+        self.max_parallel_steps = max_parallel_steps  # per run, DAG mode
+        self.countdown_interval = 1.0
+        self._send_slots = (asyncio.Semaphore(max_concurrent_sends)
+                            if max_concurrent_sends else None)
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._runs: Dict[int, WorkflowRun] = {}
+
+    # ═══════════════════════════════════════════════════
+    # LOOP MANAGEMENT
+    # ═══════════════════════════════════════════════════
+    def start_background_loop(self) -> asyncio.AbstractEventLoop:
+        """Run the event loop in a daemon thread (for Tk / sync callers)"""
+        if self.loop and self.loop.is_running():
+            return self.loop
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self._loop_thread = threading.Thread(target=run, name="async-workflow-engine", daemon=True)
+        self._loop_thread.start()
+        ready.wait()
+        return self.loop
+
+    def stop_background_loop(self):
+        if self.loop and self._loop_thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._loop_thread.join(timeout=5)
+            self._loop_thread = None
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _call_in_loop(self, fn: Callable, *args):
+        if self.loop is None or self._in_loop_thread():
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    # ═══════════════════════════════════════════════════
+    # RUNS
+    # ═══════════════════════════════════════════════════
+    @property
+    def runs(self) -> List[WorkflowRun]:
+        return list(self._runs.values())
+
+    async def run(self, workflow: Workflow, loop_mode: bool = False,
+                  loop_interval: float = 120.0, isolated: bool = False) -> WorkflowRun:
+        """Schedule a run on the current loop and return its handle.
+        `isolated=True` deep-copies the workflow so the same definition can
+        run many times concurrently without sharing step state."""
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        if workflow.is_dag:
+            workflow.dependency_graph()
+        nested = [step.name for step in workflow.steps if step.workflow]
+        if nested:
+            raise ValueError(f"Sub-workflow steps need WorkflowEngine: {', '.join(nested)}")
+        workflow.compile_conditions()  # guard errors surface before the run
+        if isolated:
+            workflow = copy.deepcopy(workflow)
+
+        handle = WorkflowRun(self, workflow, loop_mode, loop_interval)
+        self._runs[handle.run_id] = handle
+        handle._task = asyncio.ensure_future(self._run_workflow(handle))
+        return handle
+
+    def start(self, workflow: Workflow, loop_mode: bool = False,
+              loop_interval: float = 120.0, isolated: bool = False) -> WorkflowRun:
+        """Thread-safe start for sync callers; uses the background loop"""
+        if self.loop is None or not self.loop.is_running():
+            self.start_background_loop()
+        if self._in_loop_thread():
+            raise RuntimeError("Use 'await engine.run(...)' from inside the event loop")
+        future = asyncio.run_coroutine_threadsafe(
+            self.run(workflow, loop_mode, loop_interval, isolated), self.loop
+        )
+        return future.result()
+
+    def cancel_all(self):
+        for handle in self.runs:
+            handle.cancel()
+
+    # ═══════════════════════════════════════════════════
+    # EXECUTION
+    # ═══════════════════════════════════════════════════
+    async def _run_workflow(self, run: WorkflowRun):
+        workflow = run.workflow
+        run.status = "running"
+        for step in workflow.steps:
+            step.status = "pending"
+            step.result = ""
+            step.started_at = None
+            step.completed_at = None
+
+        try:
+            while True:
+                run._conditions = ConditionContext(
+                    workflow.variables, workflow.steps, workflow.variables.get("project_path")
+                )
+                if workflow.is_dag:
+                    await self._run_dag(run)
+                else:
+                    await self._run_sequential(run)
+
+                if not run.loop_mode or run._cancel_requested:
+                    break
+
+                self._emit(self.on_workflow_done, workflow, "looping")
+                for step in workflow.steps:
+                    step.status = "pending"
+
+                await self._countdown(run, run.loop_interval,
+                                      lambda: run._cancel_requested or not run.loop_mode)
+                if run._cancel_requested or not run.loop_mode:
+                    break
+
+            run.status = "cancelled" if run._cancel_requested else "completed"
+        except Exception as e:
+            logger.error(f"Workflow run {run.run_id} error: {e}")
+            run.status = f"error: {e}"
+
+        total = len(workflow.steps)
+        self._emit(self.on_progress, total, total, 100)
+        self._emit(self.on_workflow_done, workflow, run.status)
+        run.current_step_index = -1
+        self._runs.pop(run.run_id, None)
+
+    async def _run_sequential(self, run: WorkflowRun):
+        steps = run.workflow.steps
+        total_steps = len(steps)
+        for i, step in enumerate(steps):
+            await run._wait_while_paused()
+            if run._cancel_requested or not step.enabled:
+                step.status = "skipped"
+                continue
+            if not await self._guard_passes(run, i, step):
+                continue
+
+            await self._execute_step(run, i, step, i, total_steps)
+
+            if i < total_steps - 1 and step.delay_after > 0:
+                await self._countdown(run, step.delay_after, lambda: run._cancel_requested)
+
+    async def _run_dag(self, run: WorkflowRun):
+        steps = run.workflow.steps
+        total_steps = len(steps)
+        deps = run.workflow.dependency_graph()
+        has_dependents = {d for ds in deps.values() for d in ds}
+        slots = asyncio.Semaphore(max(1, self.max_parallel_steps))
+        done_events = {i: asyncio.Event() for i in range(total_steps)}
+        blocked: set = set()
+        finished = [0]
+
+        async def run_step(i: int):
+            step = steps[i]
+            for d in deps[i]:
+                await done_events[d].wait()
+            try:
+                if run._cancel_requested or any(d in blocked for d in deps[i]):
+                    step.status = "skipped"
+                    blocked.add(i)
+                    return
+                if not step.enabled:
+                    step.status = "skipped"
+                    return
+                async with slots:
+                    await run._wait_while_paused()
+                    if run._cancel_requested:
+                        step.status = "skipped"
+                        blocked.add(i)
+                        return
+                    if not await self._guard_passes(run, i, step):
+                        if step.status == "failed":
+                            blocked.add(i)  # guard-skipped steps do not block dependents
+                        return
+                    await self._execute_step(run, i, step, finished[0], total_steps)
+                    if step.status == "failed":
+                        blocked.add(i)
+                    elif i in has_dependents and step.delay_after > 0:
+                        await self._countdown(run, step.delay_after, lambda: run._cancel_requested)
+            finally:
+                finished[0] += 1
+                done_events[i].set()
+
+        await asyncio.gather(*(run_step(i) for i in range(total_steps)))
+
+    async def _guard_passes(self, run: WorkflowRun, index: int, step: WorkflowStep) -> bool:
+        """Evaluate the step's condition (probes run off the loop). False
+        means the step is skipped, or failed if the condition errored."""
+        if not step.condition.strip():
+            return True
+        try:
+            condition = run.workflow.compiled_condition(step)
+            passed = await asyncio.to_thread(condition.evaluate, run._conditions)
+        except Exception as e:
+            step.status = "failed"
+            step.result = f"Condition error: {e}"
+            step.completed_at = datetime.now()
+            self._emit(self.on_error, index, step, step.result)
+            return False
+        if not passed:
+            step.status = "skipped"
+            step.result = f"Condition not met: {step.condition.strip()}"
+            logger.info(f"Step '{step.name}' skipped: condition not met")
+        return passed
+
+    async def _execute_step(self, run: WorkflowRun, index: int, step: WorkflowStep,
+                            progress_index: int, total_steps: int):
+        run.current_step_index = index
+        step.status = "running"
+        step.started_at = datetime.now()
+        self._emit(self.on_step_start, index, step)
+        self._emit(self.on_progress, progress_index, total_steps,
+                   (progress_index / total_steps) * 100)
+
+        if step.foreach:
+            task = asyncio.ensure_future(self._send_fanout(run.workflow, step))
+        else:
+            task = asyncio.ensure_future(self._send(run.workflow.resolve_prompt(step)))
+        run._inflight.add(task)
+        timeout = None if step.foreach else step.timeout  # fan-out: per item instead
+        try:
+            result = await asyncio.wait_for(task, timeout) if timeout else await task
+            step.status = "completed"
+            step.result = result or "Done"
+            step.completed_at = datetime.now()
+            self._emit(self.on_step_complete, index, step, result)
+        except asyncio.CancelledError:
+            if not run._cancel_requested:
+                raise
+            step.status = "skipped"
+            step.result = "Cancelled"
+            step.completed_at = datetime.now()
+        except asyncio.TimeoutError:
+            step.status = "failed"
+            step.result = f"Step timed out after {step.timeout:g}s"
+            step.completed_at = datetime.now()
+            self._emit(self.on_error, index, step, step.result)
+        except Exception as e:
+            step.status = "failed"
+            step.result = str(e)
+            step.completed_at = datetime.now()
+            self._emit(self.on_error, index, step, str(e))
+        finally:
+            run._inflight.discard(task)
+            if run._conditions:
+                run._conditions.invalidate_probes()  # the step may have changed the project
+
+    async def _send_fanout(self, workflow: Workflow, step: WorkflowStep) -> str:
+        """One send per foreach item, step.max_parallel at a time"""
+        items = expand_items(step.foreach, workflow.variables,
+                             workflow.variables.get("project_path"))
+        if not items:
+            return f"No items for '{step.foreach}'"
+        limit = asyncio.Semaphore(step.max_parallel)
+
+        async def send_item(k: int) -> str:
+            async with limit:
+                extra = item_variables(items[k], k, len(items))
+                send = self._send(workflow.resolve_prompt(step, extra))
+                return await asyncio.wait_for(send, step.timeout) if step.timeout else await send
+
+        outcomes = await asyncio.gather(*(send_item(k) for k in range(len(items))),
+                                        return_exceptions=True)
+        statuses, results = [], []
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                statuses.append("failed")
+                results.append(str(outcome) or type(outcome).__name__)
+            else:
+                statuses.append("completed")
+                results.append(outcome or "Done")
+        report = aggregate_results(items, statuses, results)
+        failed = statuses.count("failed")
+        if failed:
+            raise FanoutError(f"{failed}/{len(items)} items failed\n\n{report}", failed, len(items))
+        return report
+
+    async def _send(self, prompt: str) -> str:
+        fn = self.send_and_wait_fn or self.send_prompt_fn
+        if fn is None:
+            return f"[Dry Run] Prompt queued: {prompt[:80]}..."
+        if self._send_slots:
+            async with self._send_slots:
+                return await self._call_send(fn, prompt)
+        return await self._call_send(fn, prompt)
+
+    @staticmethod
+    async def _call_send(fn: SendFn, prompt: str) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            return await fn(prompt)
+        result = await asyncio.to_thread(_drain_send, fn, prompt)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _countdown(self, run: WorkflowRun, duration: float,
+                         interrupted: Callable[[], bool]) -> bool:
+        """Pause-aware deadline wait; mirrors RunClock.countdown"""
+        loop = asyncio.get_running_loop()
+        remaining = max(0.0, duration)
+        ticking = self.on_loop_wait is not None and self.countdown_interval > 0
+        if self.on_loop_wait and remaining > 0:
+            self._emit(self.on_loop_wait, remaining)
+
+        while remaining > 0:
+            if interrupted():
+                return False
+            if run._paused:
+                await run._wait_while_paused()
+                continue
+            started = loop.time()
+            step = min(remaining, self.countdown_interval) if ticking else remaining
+            await run._wait_changed(step)
+            remaining -= loop.time() - started
+            if ticking and remaining > 0 and not interrupted() and not run._paused:
+                self._emit(self.on_loop_wait, remaining)
+        return not interrupted()
+
+    @staticmethod
+    def _emit(callback: Optional[Callable], *args):
+        if callback:
+            try:
+                callback(*args)
+            except Exception:
+                pass
+
+
+if __name__ == "__main__":
+    import time
+
+    async def fake_send(prompt: str) -> str:
+        await asyncio.sleep(0.01)
+        return f"ok ({len(prompt)} chars)"
+
+    async def demo(count: int):
+        from workflow_engine import WorkflowEngine
+        engine = AsyncWorkflowEngine()
+        engine.send_and_wait_fn = fake_send
+        template = WorkflowEngine().builtin_workflows["Full Feature Dev"]
+        for step in template.steps:
+            step.delay_after = 0.01
+        started = time.perf_counter()
+        runs = [await engine.run(template, isolated=True) for _ in range(count)]
+        statuses = await asyncio.gather(*(r.wait() for r in runs))
+        elapsed = time.perf_counter() - started
+        print(f"✅ {statuses.count('completed')}/{count} runs completed in {elapsed:.2f}s on one loop")
+
+    asyncio.run(demo(500))
@@ -18,7 +18,14 @@ from typing import Optional
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from project_lock import shared_lock_service
 from workflow_engine import WorkflowEngine, Workflow, WorkflowStep
+from workflow_cache import StepResultCache
+from workflow_dispatcher import shared_dispatcher
+from workflow_history import RunHistory
+from workflow_ledger import StepLedger
+from workflow_library import WorkflowLibrary
+from workflow_snapshot import SnapshotStore
 from editor_bridge import EditorBridge
 
 # ─────────────────────────────────────────────────────
@@ -92,7 +99,20 @@ class AutoPromptGUI:
         self.engine.on_error = self._on_step_error
         self.engine.on_progress = self._on_progress
         self.engine.send_prompt_fn = self.bridge.send_prompt
+        self.engine.prepare_prompt_fn = self.bridge.prepare
         self.engine.on_loop_wait = self._on_loop_wait
+        self.engine.on_step_output = self._on_step_output
+        self.engine.journal_dir = os.path.join(self.WORKFLOW_SAVE_DIR, "runs")
+        self.engine.result_cache = StepResultCache(os.path.join(self.WORKFLOW_SAVE_DIR, "cache"))
+        self.engine.trace_dir = os.path.join(self.WORKFLOW_SAVE_DIR, "traces")
+        self.engine.metrics_path = os.path.join(self.WORKFLOW_SAVE_DIR, "metrics.prom")
+        self.engine.history = RunHistory(os.path.join(self.WORKFLOW_SAVE_DIR, "history.db"))
+        self.engine.snapshot_dir = os.path.join(self.WORKFLOW_SAVE_DIR, "suspended")
+        self.engine.step_ledger = StepLedger(os.path.join(self.WORKFLOW_SAVE_DIR, "ledger"))
+        self.engine.workflow_resolver = self._find_workflow  # sub-workflow steps
+        self.engine.dispatcher = shared_dispatcher()  # one editor, many runs
+        self.engine.project_locks = shared_lock_service()  # one project, many writers
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # Bridge status callback for live AI status
         self.bridge.on_status_change = self._on_bridge_status
@@ -100,16 +120,20 @@ class AutoPromptGUI:
         # State
         self._active_workflow: Optional[Workflow] = None
         self._step_frames = []
-        self._all_workflows = dict(self.engine.builtin_workflows)
+        # name -> Workflow (None = not built / parsed yet)
+        self._all_workflows = dict.fromkeys(self.engine.builtin_workflow_names)
+        self.library = WorkflowLibrary(self.WORKFLOW_SAVE_DIR)
         self._auto_launch_var = tk.BooleanVar(value=True)
         self._auto_focus_var = tk.BooleanVar(value=True)
         self._custom_hotkey_var = tk.StringVar(value="")
         self._global_delay_var = tk.StringVar(value="")  # Empty = use default delay
         self._loop_var = tk.BooleanVar(value=False)
         self._loop_interval_var = tk.StringVar(value="2")  # 2 mins
-        # load saved
-        saved = self.engine.load_all_saved(self.WORKFLOW_SAVE_DIR)
-        self._all_workflows.update(saved)
+        self._skip_unchanged_var = tk.BooleanVar(value=True)
+        self._incremental_var = tk.BooleanVar(value=True)  # only re-run edited steps
+        # Index saved workflows; each file is parsed when first selected
+        for entry in self.library.refresh():
+            self._all_workflows[entry["name"]] = None
 
         # Build UI
         self._setup_styles()
@@ -411,6 +435,15 @@ class AutoPromptGUI:
         )
         enabled_cb.pack(side=tk.RIGHT, padx=(4, 0))
 
+        cacheable_var = tk.BooleanVar(value=step.cacheable)
+        tk.Checkbutton(
+            header, text="Cache", variable=cacheable_var,
+            bg=COLORS["bg_input"], fg=COLORS["text_dim"],
+            selectcolor=COLORS["bg_dark"], activebackground=COLORS["bg_input"],
+            font=("Segoe UI", 8),
+            command=lambda i=index, v=cacheable_var: self._toggle_step_cache(i, v.get()),
+        ).pack(side=tk.RIGHT, padx=(4, 0))
+
         # Step delay (default for new steps) hidden as it's confusing. Use global override or per-step.
         self._delay_var = tk.StringVar(value="5")
 
@@ -496,6 +529,16 @@ class AutoPromptGUI:
         )
         self._stop_btn.pack(side=tk.LEFT, padx=(0, 6))
 
+        self._save_run_btn = tk.Button(
+            ctrl_frame, text="💾 Save", font=("Segoe UI", 10),
+            bg=COLORS["bg_card"], fg=COLORS["cyan"],
+            activebackground=COLORS["cyan"], activeforeground="#000000",
+            relief="flat", bd=0, padx=14, pady=4,
+            command=self._save_run_to_disk,
+            state="disabled",
+        )
+        self._save_run_btn.pack(side=tk.LEFT, padx=(0, 6))
+
         clear_btn = tk.Button(
             ctrl_frame, text="Clear", font=("Segoe UI", 9),
             bg=COLORS["bg_card"], fg=COLORS["text_dim"],
@@ -526,6 +569,20 @@ class AutoPromptGUI:
             relief="flat", bd=0, justify="center"
         ).pack(side=tk.LEFT, ipady=2)
 
+        tk.Checkbutton(
+            loop_row, text="Skip if unchanged", variable=self._skip_unchanged_var,
+            bg=COLORS["bg_mid"], fg=COLORS["text_dim"],
+            selectcolor=COLORS["bg_dark"], activebackground=COLORS["bg_mid"],
+            font=("Segoe UI", 9)
+        ).pack(side=tk.LEFT, padx=(12, 0))
+
+        tk.Checkbutton(
+            loop_row, text="Only re-run edited steps", variable=self._incremental_var,
+            bg=COLORS["bg_mid"], fg=COLORS["text_dim"],
+            selectcolor=COLORS["bg_dark"], activebackground=COLORS["bg_mid"],
+            font=("Segoe UI", 9)
+        ).pack(side=tk.LEFT, padx=(12, 0))
+
         # Progress bar
         prog_frame = tk.Frame(exec_outer, bg=COLORS["bg_mid"])
         prog_frame.pack(fill=tk.X, padx=12, pady=(0, 4))
@@ -606,8 +663,15 @@ class AutoPromptGUI:
             )
             label.pack(fill=tk.X, padx=4)
 
+            entry = self.library.entry(name) if wf is None else None
+            if wf is not None:
+                summary = f"{len(wf.steps)} steps"
+            elif entry is not None:
+                summary = f"{entry.get('step_count', 0)} steps"
+            else:
+                summary = "built-in"
             desc = tk.Label(
-                btn_frame, text=f"     {len(wf.steps)} steps",
+                btn_frame, text=f"     {summary}",
                 font=("Segoe UI", 8), bg=btn_bg, fg=COLORS["text_muted"],
                 anchor="w",
             )
@@ -617,8 +681,30 @@ class AutoPromptGUI:
             for widget in (btn_frame, label, desc):
                 widget.bind("<Button-1>", lambda e, n=name: self._select_workflow(n))
 
+    def _find_workflow(self, name: str) -> Optional[Workflow]:
+        """Built-in or saved workflow by name (called from the engine thread)"""
+        workflow = self._all_workflows.get(name)
+        if workflow is None and name in self._all_workflows:
+            workflow = self._load_workflow(name)
+        return workflow
+
+    def _load_workflow(self, name: str) -> Optional[Workflow]:
+        """Parse a saved workflow, else build the built-in one of that name"""
+        if self.library.entry(name) is not None:
+            return self.library.get(name)
+        return self.engine.builtin_workflow(name)
+
     def _select_workflow(self, name: str):
         if name in self._all_workflows:
+            if self._all_workflows[name] is None:
+                try:
+                    self._all_workflows[name] = self._load_workflow(name)
+                except Exception as e:
+                    self._log(f"Failed to load workflow '{name}': {e}", "error")
+                    return
+                if self._all_workflows[name] is None:
+                    self._log(f"Workflow '{name}' no longer exists", "error")
+                    return
             self._active_workflow = self._all_workflows[name]
             self._wf_title_label.config(text=self._active_workflow.name)
             self._wf_desc_label.config(text=self._active_workflow.description)
@@ -691,6 +777,53 @@ class AutoPromptGUI:
         delay_entry.pack(side=tk.RIGHT, padx=(0, 2))
         delay_var.trace_add("write", lambda *a, i=index, v=delay_var: self._update_step_delay(i, v.get()))
 
+        # Step timeout (blank = no limit)
+        tk.Label(header, text="Timeout(s):", font=("Segoe UI", 8),
+                 bg=COLORS["bg_input"], fg=COLORS["text_dim"]).pack(side=tk.RIGHT, padx=(4, 0))
+        timeout_var = tk.StringVar(value=f"{step.timeout:g}" if step.timeout else "")
+        timeout_entry = tk.Entry(
+            header, textvariable=timeout_var, width=5,
+            font=("Segoe UI", 8), bg=COLORS["bg_input"],
+            fg=COLORS["text"], insertbackground=COLORS["text"],
+            relief="flat", bd=0, justify="center"
+        )
+        timeout_entry.pack(side=tk.RIGHT, padx=(0, 2))
+        timeout_var.trace_add("write", lambda *a, i=index, v=timeout_var: self._update_step_timeout(i, v.get()))
+
+        # Fan-out: list variable or glob:pattern (blank = run once)
+        tk.Label(header, text="For each:", font=("Segoe UI", 8),
+                 bg=COLORS["bg_input"], fg=COLORS["text_dim"]).pack(side=tk.RIGHT, padx=(4, 0))
+        foreach_var = tk.StringVar(value=step.foreach)
+        foreach_entry = tk.Entry(
+            header, textvariable=foreach_var, width=10,
+            font=("Segoe UI", 8), bg=COLORS["bg_input"],
+            fg=COLORS["text"], insertbackground=COLORS["text"],
+            relief="flat", bd=0, justify="center"
+        )
+        foreach_entry.pack(side=tk.RIGHT, padx=(0, 2))
+        foreach_var.trace_add("write", lambda *a, i=index, v=foreach_var: self._update_step_foreach(i, v.get()))
+
+        # Project lock scope: comma-separated paths (blank = whole project)
+        read_only_var = tk.BooleanVar(value=step.read_only)
+        tk.Checkbutton(
+            header, text="Read-only", variable=read_only_var,
+            bg=COLORS["bg_input"], fg=COLORS["text_dim"],
+            selectcolor=COLORS["bg_dark"], activebackground=COLORS["bg_input"],
+            font=("Segoe UI", 8),
+            command=lambda i=index, v=read_only_var: self._toggle_step_read_only(i, v.get()),
+        ).pack(side=tk.RIGHT, padx=(4, 0))
+        tk.Label(header, text="Touches:", font=("Segoe UI", 8),
+                 bg=COLORS["bg_input"], fg=COLORS["text_dim"]).pack(side=tk.RIGHT, padx=(4, 0))
+        touches_var = tk.StringVar(value=", ".join(step.touches or []))
+        touches_entry = tk.Entry(
+            header, textvariable=touches_var, width=10,
+            font=("Segoe UI", 8), bg=COLORS["bg_input"],
+            fg=COLORS["text"], insertbackground=COLORS["text"],
+            relief="flat", bd=0, justify="center"
+        )
+        touches_entry.pack(side=tk.RIGHT, padx=(0, 2))
+        touches_var.trace_add("write", lambda *a, i=index, v=touches_var: self._update_step_touches(i, v.get()))
+
         # Move / delete buttons
         btn_frame = tk.Frame(header, bg=COLORS["bg_input"])
         btn_frame.pack(side=tk.RIGHT, padx=(8, 0))
@@ -740,21 +873,56 @@ class AutoPromptGUI:
     def _update_step_name(self, index: int, name: str):
         if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
             self._active_workflow.steps[index].name = name
+            self._active_workflow.touch()
 
     def _update_step_prompt(self, index: int, text_widget: tk.Text):
         if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
             self._active_workflow.steps[index].prompt = text_widget.get("1.0", "end-1c")
+            self._active_workflow.touch()
 
     def _update_step_delay(self, index: int, value: str):
         if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
             try:
                 self._active_workflow.steps[index].delay_after = float(value)
+                self._active_workflow.touch()
             except ValueError:
                 pass  # Ignore invalid input while typing
 
+    def _update_step_timeout(self, index: int, value: str):
+        if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
+            value = value.strip()
+            try:
+                timeout = float(value) if value else None
+            except ValueError:
+                return  # Ignore invalid input while typing
+            self._active_workflow.steps[index].timeout = timeout if timeout and timeout > 0 else None
+            self._active_workflow.touch()
+
+    def _update_step_foreach(self, index: int, value: str):
+        if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
+            self._active_workflow.steps[index].foreach = value.strip()
+            self._active_workflow.touch()
+
+    def _update_step_touches(self, index: int, value: str):
+        if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
+            paths = [p.strip() for p in value.split(",") if p.strip()]
+            self._active_workflow.steps[index].touches = paths or None
+            self._active_workflow.touch()
+
+    def _toggle_step_read_only(self, index: int, read_only: bool):
+        if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
+            self._active_workflow.steps[index].read_only = read_only
+            self._active_workflow.touch()
+
     def _toggle_step(self, index: int, enabled: bool):
         if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
             self._active_workflow.steps[index].enabled = enabled
+            self._active_workflow.touch()
+
+    def _toggle_step_cache(self, index: int, cacheable: bool):
+        if self._active_workflow and 0 <= index < len(self._active_workflow.steps):
+            self._active_workflow.steps[index].cacheable = cacheable
+            self._active_workflow.touch()
 
     def _move_step(self, from_idx: int, to_idx: int):
         if self._active_workflow:
@@ -944,6 +1112,8 @@ class AutoPromptGUI:
         self.bridge.project_path = Path(self._project_var.get())
         self.bridge.editor = self._editor_var.get()
         self.bridge.mode = self._mode_var.get()
+        self.engine.cache_scope = f"{self.bridge.editor}:{self.bridge.mode}"
+        self.engine.dispatch_target = self.bridge.editor
 
         # Auto-set project_path variable
         self._active_workflow.variables.setdefault("project_path", self._project_var.get())
@@ -951,9 +1121,13 @@ class AutoPromptGUI:
         self._log(f"▶ Starting workflow: {self._active_workflow.name}", "info")
         self._log(f"  Editor: {self.bridge.editor_display_name}  |  Mode: {self.bridge.mode}", "dim")
 
+        for step_name, names in self._active_workflow.unresolved_placeholders().items():
+            placeholders = ", ".join(f"{{{n}}}" for n in names)
+            self._log(f"  ⚠ {step_name}: no value for {placeholders}", "warning")
+
         # Wire up the correct send function based on mode
         if self.bridge.mode == "auto_interact":
-            self.engine.send_and_wait_fn = self.bridge.send_and_wait
+            self.engine.send_and_wait_fn = self.bridge.stream_and_wait
             self.engine.send_prompt_fn = None
             self._log("  🤖 Auto-Interact: will type into editor + wait for AI completion", "info")
         else:
@@ -964,6 +1138,7 @@ class AutoPromptGUI:
         self._run_btn.config(state="disabled")
         self._pause_btn.config(state="normal")
         self._stop_btn.config(state="normal")
+        self._save_run_btn.config(state="normal")
         self._status_var.set("Running...")
 
         # Apply Global Delay Override if set
@@ -983,14 +1158,54 @@ class AutoPromptGUI:
 
         # Update loop settings
         self.engine.loop_mode = self._loop_var.get()
+        self.engine.skip_unchanged = self._skip_unchanged_var.get()
+        self.engine.incremental = self._incremental_var.get()
         try:
             mins = float(self._loop_interval_var.get())
             self.engine.loop_interval = max(0.1, mins * 60.0)
         except ValueError:
             self.engine.loop_interval = 120.0
 
+        # Offer to continue a run saved to disk (by this window or another process)
+        store = SnapshotStore(self.engine.snapshot_dir)
+        saved = store.find(self._active_workflow.name)
+        if saved and messagebox.askyesno(
+            "Continue Saved Run",
+            f"A run of '{saved.workflow_name}' was saved to disk at step "
+            f"{saved.current_step + 1} of {len(saved.steps)}.\n\n"
+            "Continue it instead of starting over?",
+        ):
+            try:
+                snapshot = store.claim(str(saved.path))
+            except (OSError, ValueError) as e:
+                self._log(f"  ⚠ Could not open the saved run: {e}", "warning")
+            else:
+                try:
+                    restored = self.engine.restore(snapshot)
+                except (OSError, RuntimeError, ValueError, KeyError) as e:
+                    self._log(f"  ⚠ Could not continue the saved run: {e}", "warning")
+                    return
+                self._log(f"  ↩ Continuing saved run {snapshot.run_id}", "info")
+                self._active_workflow = restored
+                self._all_workflows[self._active_workflow.name] = self._active_workflow
+                self._render_steps()
+                return
+
+        # Offer to continue an interrupted run instead of re-sending finished steps
+        resume = False
+        interrupted = self.engine.find_resumable(self._active_workflow)
+        if interrupted and interrupted.completed:
+            resume = messagebox.askyesno(
+                "Resume Workflow",
+                f"A previous run of '{self._active_workflow.name}' was interrupted after "
+                f"{len(interrupted.completed)} completed step(s).\n\n"
+                "Resume from where it stopped?",
+            )
+            if resume:
+                self._log(f"  ↩ Resuming run {interrupted.run_id}", "info")
+
         # Start!
-        self.engine.start(self._active_workflow)
+        self.engine.start(self._active_workflow, resume=resume)
 
     def _pause_resume(self):
         if self.engine.is_paused:
@@ -1004,12 +1219,36 @@ class AutoPromptGUI:
             self._status_var.set("Paused")
             self._log("⏸ Paused", "warning")
 
+    def _save_run_to_disk(self):
+        """Suspend the run to a snapshot after the current step; it can be
+        continued later from this window or a headless runner"""
+        self.engine.suspend_to_disk()
+        self._save_run_btn.config(state="disabled")
+        if self.engine.is_paused:
+            self._log("💾 Saving paused run to disk...", "info")
+        else:
+            self._log("💾 Run will be saved to disk after the current step...", "info")
+
     def _stop_workflow(self):
         self.engine.cancel()
         self.bridge.cancel_wait()  # also cancel any active wait-for-completion
         self._loop_var.set(False)  # stop loop on manual stop
         self._log("⏹ Cancelling...", "warning")
 
+    def _on_close(self):
+        """Stop any run and commit queued history rows before exiting"""
+        if self.engine.is_running and self.engine.is_paused and messagebox.askyesno(
+                "Save Paused Run", "Save the paused run to disk so it can be continued later?"):
+            self.engine.suspend_to_disk()
+            self.engine.wait(timeout=5.0)
+        if self.engine.is_running:
+            self.engine.cancel()
+            self.bridge.cancel_wait()
+            self.engine.wait(timeout=5.0)
+        if self.engine.history:
+            self.engine.history.close()
+        self.root.destroy()
+
     # ═══════════════════════════════════════════════════
     # ENGINE CALLBACKS (called from background thread)
     # ═══════════════════════════════════════════════════
@@ -1021,16 +1260,26 @@ class AutoPromptGUI:
         self._render_steps()
 
     def _on_step_complete(self, index: int, step: WorkflowStep, result: str):
-        self.root.after(0, self._ui_step_complete, index, step.name, result)
+        self.root.after(0, self._ui_step_complete, index, step.name, result, step.result_path)
 
-    def _ui_step_complete(self, index: int, name: str, result: str):
+    def _ui_step_complete(self, index: int, name: str, result: str, result_path: str = None):
         self._log(f"✅ Step {index + 1} complete: {name}", "success")
         if result:
             # Show first 200 chars of result
             preview = result[:200].replace("\n", " ")
             self._log(f"   → {preview}", "dim")
+        if result_path:
+            self._log(f"   📄 Full output: {result_path}", "dim")
         self._render_steps()
 
+    def _on_step_output(self, index: int, step: WorkflowStep, chunk: str):
+        self.root.after(0, self._ui_step_output, chunk)
+
+    def _ui_step_output(self, chunk: str):
+        for line in chunk.splitlines():
+            if line.strip():
+                self._log(f"   {line}", "dim")
+
     def _on_step_error(self, index: int, step: WorkflowStep, error: str):
         self.root.after(0, self._ui_step_error, index, step.name, error)
 
@@ -1046,15 +1295,45 @@ class AutoPromptGUI:
             self._log(f"🎉 Workflow '{name}' completed successfully!", "success")
         elif status == "cancelled":
             self._log(f"⏹ Workflow '{name}' was cancelled.", "warning")
+        elif status == "saved":
+            self._log(f"💾 Workflow '{name}' saved to disk. Press Run to continue it, or "
+                      f"'python -m workflow_engine resume' on any machine.", "info")
+            self._log(f"   {self.engine.last_snapshot_path}", "dim")
         elif status == "looping":
             self._log(f"🔄 Workflow '{name}' run complete. Looping...", "info")
             return  # don't reset buttons yet
+        elif status.startswith("unchanged"):
+            self._log(f"💤 No project changes — iteration skipped, {status}.", "dim")
+            return  # still looping
+        elif status.startswith("suspended"):
+            self._log(f"⛔ Workflow '{name}' {status}. Fix the editor, then press Resume.", "error")
+            self._pause_btn.config(text="▶ Resume")
+            self._status_var.set("Suspended")
+            return  # run is paused, not finished
         else:
             self._log(f"⚠ Workflow '{name}' finished with status: {status}", "error")
 
+        summary = self.engine.last_run_summary
+        if summary.get("halt_reason"):
+            self._log(f"   ⛔ Halted: {summary['halt_reason']}", "error")
+        if summary.get("retries") or summary.get("breaker_trips"):
+            self._log(f"   🔁 Retries: {summary['retries']}, breaker trips: "
+                      f"{summary['breaker_trips']}", "dim")
+        if summary.get("reused_steps"):
+            self._log(f"   ♻ {summary['reused_steps']} unchanged step(s) reused from the last run "
+                      f"(untick 'Only re-run edited steps' to send everything)", "dim")
+        if summary.get("cache_hits") or summary.get("cache_misses"):
+            self._log(f"   ♻ Result cache: {summary['cache_hits']} hit(s), "
+                      f"{summary['cache_misses']} miss(es)", "dim")
+        phases = summary.get("phase_seconds") or {}
+        if phases:
+            breakdown = ", ".join(f"{phase} {seconds:.0f}s" for phase, seconds in phases.items())
+            self._log(f"   ⏱ Time by phase: {breakdown}", "dim")
+
         self._run_btn.config(state="normal")
         self._pause_btn.config(state="disabled", text="⏸ Pause")
         self._stop_btn.config(state="disabled")
+        self._save_run_btn.config(state="disabled")
         self._progress_var.set(0)
         self._status_var.set("Ready")
         self._ai_status_var.set("")
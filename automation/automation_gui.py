@@ -13,6 +13,8 @@ from pathlib import Path
 import json
 from datetime import datetime
 
+from project_lock import ProjectLockTimeout, describe_holder, shared_lock_service
+
 # Import automation modules
 try:
     from mycircle_automation import MyCircleAutomation
@@ -48,6 +50,8 @@ class AutomationGUI:
         self.automation = None
         self.github_automation = None
         self.windsurf_integration = None
+        # Shared with workflow runs, so auto-heal never runs mid-edit
+        self.project_locks = shared_lock_service()
         
         # Setup GUI
         self.setup_styles()
@@ -712,7 +716,9 @@ class AutomationGUI:
         self.set_progress(30)
 
         try:
-            result = self.automation.auto_heal()
+            # Analyze and write the task only while no workflow is editing
+            with self._project_lock("Auto-Heal"):
+                result = self.automation.auto_heal()
             self.set_progress(100)
             
             self.log("✅ Auto-Heal task prepared!", "success")
@@ -725,6 +731,13 @@ class AutomationGUI:
         except Exception as e:
             self.log(f"Error during auto-heal: {e}", "error")
 
+    def _project_lock(self, owner, shared=False, timeout=None):
+        """Advisory lock on the project, honoured by workflow runs (see project_lock)"""
+        def on_wait(holders):
+            self.log(f"⏳ Waiting for {describe_holder(holders[0])} to finish with the project...")
+        return self.project_locks.hold(str(self.automation.project_path), f"Automation GUI: {owner}",
+                                       shared=shared, timeout=timeout, on_wait=on_wait)
+
     def generate_agent_task(self):
         """Generate a task for the IDE agent"""
         prompt = self.feature_request_var.get().strip()
@@ -803,7 +816,12 @@ class AutomationGUI:
                 try:
                     # Run a quick check
                     if self.automation:
-                        report = self.automation.run_tests()
+                        try:
+                            with self._project_lock("Watch Mode", shared=True, timeout=0):
+                                report = self.automation.run_tests()
+                        except ProjectLockTimeout:
+                            time.sleep(30)  # mid-edit results would be noise
+                            continue
                         lint = report.get("linting", {})
                         if lint.get("status") == "failed":
                             self.log("⚠️ Issues detected in Watch Mode!", "error")
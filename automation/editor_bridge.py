@@ -11,10 +11,12 @@ import time
 import shutil
 import threading
 from pathlib import Path
-from typing import Optional, List, Dict, Callable
+from typing import Optional, List, Dict, Callable, Iterator, Generator
 from datetime import datetime
 import logging
 
+from workflow_timers import CancelToken, StepCancelled
+
 logger = logging.getLogger(__name__)
 
 
@@ -71,7 +73,13 @@ class EditorBridge:
         self._completion_timeout = 300  # max seconds to wait per step
         self._poll_interval = 2.0  # seconds between completion checks
         self._post_completion_delay = 2.0  # cooldown after AI finishes
-        self._cancel_wait = threading.Event()  # to cancel waiting early
+        self._active_token: Optional[CancelToken] = None  # cancelled by cancel_wait()
+
+        # Staged by prepare() for the next send: (prompt, staged task file)
+        # and the editor window found ahead of time
+        self._staged_lock = threading.Lock()
+        self._staged_file: Optional[tuple] = None
+        self._staged_hwnd: Optional[int] = None
 
         # Status callback for GUI live updates
         self.on_status_change: Optional[Callable[[str, str], None]] = None  # (status, detail)
@@ -102,7 +110,7 @@ class EditorBridge:
         if value in ("clipboard", "file_drop", "terminal", "auto_interact"):
             self._mode = value
 
-    def send_prompt(self, prompt: str) -> str:
+    def send_prompt(self, prompt: str, token: Optional[CancelToken] = None) -> str:
         """Send a prompt to the selected editor using the configured mode"""
         timestamp = datetime.now().isoformat()
 
@@ -114,7 +122,7 @@ class EditorBridge:
             elif self._mode == "terminal":
                 result = self._send_via_terminal(prompt)
             elif self._mode == "auto_interact":
-                result = self._send_via_auto_interact(prompt)
+                result = self._send_via_auto_interact(prompt, token)
             else:
                 result = self._send_via_clipboard(prompt)
 
@@ -129,6 +137,8 @@ class EditorBridge:
 
             return result
 
+        except StepCancelled:
+            raise  # a cancelled / timed-out step is not a send failure
         except Exception as e:
             error_msg = f"Failed to send prompt: {e}"
             self._log_history.append({
@@ -141,34 +151,76 @@ class EditorBridge:
             })
             raise RuntimeError(error_msg)
 
-    def send_and_wait(self, prompt: str) -> str:
+    def prepare(self, prompt: str):
+        """Get the next send of `prompt` ready while the current step is still
+        running: file_drop writes the task file to a staging file that the
+        send only renames into place; auto_interact finds the editor window.
+        A send of any other prompt ignores what was staged."""
+        if self._mode == "file_drop":
+            task_file = self._task_file()
+            if task_file is None:
+                return
+            task_file.parent.mkdir(parents=True, exist_ok=True)
+            staged = task_file.with_name(f".{task_file.name}.staged")
+            staged.write_text(self._task_content(prompt), encoding="utf-8")
+            with self._staged_lock:
+                self._staged_file = (prompt, staged)
+        elif self._mode == "auto_interact":
+            hwnd = self._find_editor_window()
+            with self._staged_lock:
+                self._staged_hwnd = hwnd
+
+    def send_and_wait(self, prompt: str, token: Optional[CancelToken] = None) -> str:
         """Send a prompt via auto-interact and WAIT for the AI to finish responding.
-        Returns only after the conversation is confirmed done."""
-        self._cancel_wait.clear()
+        Returns only after the conversation is confirmed done. Raises
+        StepCancelled / StepTimeout if `token` is cancelled or expires."""
+        summary = ""
+        for chunk in self.stream_and_wait(prompt, token):
+            summary = chunk
+        return summary.rstrip("\n")
+
+    def stream_and_wait(self, prompt: str, token: Optional[CancelToken] = None) -> Iterator[str]:
+        """Streaming variant of send_and_wait: yields output lines as the
+        step progresses; the last chunk is the same summary send_and_wait returns."""
+        token = token or CancelToken()
+        self._active_token = token
         self._emit_status("typing", "Typing prompt into editor...")
 
         # Step 1: Send the prompt into the editor chat
-        send_result = self._send_via_auto_interact(prompt)
+        send_result = self._send_via_auto_interact(prompt, token)
+        yield f"{send_result}\n"
 
         # Step 2: Wait for the AI to finish responding
         self._emit_status("waiting", "Waiting for AI to finish...")
-        done = self._wait_for_completion()
+        done = yield from self._iter_completion(token)
 
         if done == "cancelled":
-            return f"{send_result} → ⏹ Wait cancelled"
+            self._emit_status("cancelled", "Wait cancelled")
+            token.check()  # raises StepCancelled / StepTimeout
         elif done == "timeout":
-            return f"{send_result} → ⚠️ Timed out after {self._completion_timeout}s"
+            yield f"{send_result} → ⚠️ Timed out after {self._completion_timeout}s\n"
+            return
 
         # Step 3: Post-completion cooldown
         self._emit_status("cooldown", f"AI done. Cooling down {self._post_completion_delay}s...")
-        time.sleep(self._post_completion_delay)
+        self._sleep(self._post_completion_delay, token)
 
         self._emit_status("done", "Step complete")
-        return f"{send_result} → ✅ AI conversation completed"
+        yield f"{send_result} → ✅ AI conversation completed\n"
 
     def cancel_wait(self):
-        """Cancel the current wait-for-completion"""
-        self._cancel_wait.set()
+        """Cancel the current send / wait-for-completion"""
+        token = self._active_token
+        if token is not None:
+            token.cancel()
+
+    @staticmethod
+    def _sleep(seconds: float, token: Optional[CancelToken] = None):
+        """time.sleep() that ends early (raising StepCancelled) when `token` is cancelled"""
+        if token is None:
+            time.sleep(seconds)
+        else:
+            token.sleep(seconds)
 
     def _emit_status(self, status: str, detail: str):
         """Notify the GUI of status changes"""
@@ -212,21 +264,18 @@ class EditorBridge:
             except Exception:
                 return f"⚠️ Clipboard copy failed: {e}. Prompt saved to file instead."
 
-    def _send_via_file_drop(self, prompt: str) -> str:
-        """Write prompt to a task file that the editor can pick up"""
+    def _task_file(self) -> Optional[Path]:
+        """The editor's task file for file_drop mode (None if it has none)"""
         editor_config = self.EDITORS[self._editor]
         task_dir = editor_config.get("task_dir", "")
-
         if not task_dir:
-            return self._send_via_clipboard(prompt)
-
-        full_task_dir = self.project_path / task_dir
-        full_task_dir.mkdir(parents=True, exist_ok=True)
+            return None
+        return self.project_path / task_dir / editor_config["task_file"]
 
-        task_file = full_task_dir / editor_config["task_file"]
+    def _task_content(self, prompt: str) -> str:
+        editor_config = self.EDITORS[self._editor]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        content = f"""# Auto-Prompt Task
+        return f"""# Auto-Prompt Task
 > Generated: {timestamp}
 > Editor: {editor_config['display']}
 
@@ -238,11 +287,28 @@ class EditorBridge:
 *Auto-generated by MyCircle Auto-Prompt Workflow Engine*
 """
 
-        task_file.write_text(content, encoding="utf-8")
+    def _send_via_file_drop(self, prompt: str) -> str:
+        """Write prompt to a task file that the editor can pick up"""
+        task_file = self._task_file()
+        if task_file is None:
+            return self._send_via_clipboard(prompt)
+
+        with self._staged_lock:
+            staged, self._staged_file = self._staged_file, None
+        moved = False
+        if staged and staged[0] == prompt and staged[1].parent == task_file.parent:
+            try:
+                os.replace(staged[1], task_file)  # prepared during the previous step
+                moved = True
+            except OSError:
+                pass
+        if not moved:
+            task_file.parent.mkdir(parents=True, exist_ok=True)
+            task_file.write_text(self._task_content(prompt), encoding="utf-8")
 
         # Also create a trigger file that some editors watch
-        trigger_file = full_task_dir / ".auto_prompt_trigger"
-        trigger_file.write_text(timestamp, encoding="utf-8")
+        trigger_file = task_file.parent / ".auto_prompt_trigger"
+        trigger_file.write_text(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), encoding="utf-8")
 
         return f"✅ Task written to {task_file.relative_to(self.project_path)}"
 
@@ -385,7 +451,7 @@ class EditorBridge:
     # ═══════════════════════════════════════════════════
     # AUTO-INTERACT MODE
     # ═══════════════════════════════════════════════════
-    def _send_via_auto_interact(self, prompt: str) -> str:
+    def _send_via_auto_interact(self, prompt: str, token: Optional[CancelToken] = None) -> str:
         """Focus editor, open chat panel, paste prompt, press Enter"""
         import ctypes
         from ctypes import wintypes
@@ -393,49 +459,52 @@ class EditorBridge:
         editor_config = self.EDITORS[self._editor]
         user32 = ctypes.windll.user32
 
-        # 1. Find and focus the editor window
-        hwnd = self._find_editor_window()
+        # 1. Find and focus the editor window (found by prepare() if still open)
+        with self._staged_lock:
+            hwnd, self._staged_hwnd = self._staged_hwnd, None
+        if not (hwnd and user32.IsWindow(hwnd)):
+            hwnd = self._find_editor_window()
         if not hwnd:
             # Try to launch the editor
             launched = self.launch_editor()
             if launched:
-                time.sleep(5)  # wait for editor to start
+                self._sleep(5, token)  # wait for editor to start
                 hwnd = self._find_editor_window()
             if not hwnd:
                 return self._send_via_clipboard(prompt)  # fallback
 
         # Bring window to front
         user32.ShowWindow(hwnd, 9)  # SW_RESTORE
-        time.sleep(0.2)
+        self._sleep(0.2, token)
         user32.SetForegroundWindow(hwnd)
-        time.sleep(0.5)
+        self._sleep(0.5, token)
 
         # Step A: Triple Esc reset (clear any open popups/menus/selections)
         for _ in range(3):
-            self._press_key("escape")
-            time.sleep(0.1)
+            self._press_key("escape", token)
+            self._sleep(0.1, token)
 
         # Step B: Focus Editor Group 1 (ensure we aren't stuck in a sidebar/terminal/auxiliary view)
-        self._press_hotkey("ctrl+1")
-        time.sleep(0.4)
+        self._press_hotkey("ctrl+1", token)
+        self._sleep(0.4, token)
 
         # Step C: Open/Focus chat panel with editor-specific hotkey
         chat_hotkey = editor_config.get("chat_hotkey", "")
         if chat_hotkey:
-            self._press_hotkey(chat_hotkey)
-            time.sleep(1.2)  # wait for panel to open and take focus
+            self._press_hotkey(chat_hotkey, token)
+            self._sleep(1.2, token)  # wait for panel to open and take focus
 
         # 3. Copy prompt to clipboard
         self._clipboard_set(prompt)
-        time.sleep(0.2)
+        self._sleep(0.2, token)
 
         # 4. Paste (Ctrl+V)
-        self._press_hotkey("ctrl+v")
-        time.sleep(0.5)
+        self._press_hotkey("ctrl+v", token)
+        self._sleep(0.5, token)
 
         # 5. Press Enter to submit
-        self._press_key("enter")
-        time.sleep(0.3)
+        self._press_key("enter", token)
+        self._sleep(0.3, token)
 
         return f"✅ Prompt auto-typed into {editor_config['display']} ({len(prompt)} chars)"
 
@@ -497,16 +566,28 @@ class EditorBridge:
             pass
         return ""
 
-    def _wait_for_completion(self) -> str:
+    def _wait_for_completion(self, token: Optional[CancelToken] = None) -> str:
         """Wait for the AI conversation to finish.
-        Returns: 'done', 'timeout', or 'cancelled'
+        Returns: 'done', 'timeout', or 'cancelled'"""
+        progress = self._iter_completion(token)
+        while True:
+            try:
+                next(progress)
+            except StopIteration as stop:
+                return stop.value
+
+    def _iter_completion(self, token: Optional[CancelToken] = None) -> Generator[str, None, str]:
+        """Generator behind _wait_for_completion. Yields a line whenever the
+        detected AI state changes and returns 'done', 'timeout' or 'cancelled'.
 
         Detection strategy:
         1. Check if editor window title contains 'thinking/generating' keywords
         2. Monitor editor process CPU — high CPU = still working
         3. When title stabilizes AND CPU drops, conversation is done
         4. Fallback: timeout after _completion_timeout seconds
+        Returns 'cancelled' as soon as `token` is cancelled or expires.
         """
+        token = token or CancelToken()
         editor_config = self.EDITORS[self._editor]
         thinking_keywords = editor_config.get("thinking_keywords", [])
         start_time = time.time()
@@ -514,19 +595,21 @@ class EditorBridge:
         hwnd = self._find_editor_window()
 
         # Wait a moment for the AI to start processing
-        time.sleep(3.0)
+        if token.wait(3.0):
+            return "cancelled"
 
         # Track title stability: must be stable for N consecutive checks
         stable_count = 0
         required_stable = 3  # must be stable for 3 x poll_interval
         last_title = ""
+        last_state = ""
         was_thinking = False
 
         while True:
             elapsed = time.time() - start_time
 
             # Check cancel
-            if self._cancel_wait.is_set():
+            if token.cancelled:
                 return "cancelled"
 
             # Check timeout
@@ -547,7 +630,7 @@ class EditorBridge:
                     break
 
             # Check process CPU usage
-            cpu_busy = self._is_editor_cpu_busy()
+            cpu_busy = self._is_editor_cpu_busy(token)
 
             # Status update
             detail_parts = []
@@ -555,8 +638,12 @@ class EditorBridge:
                 detail_parts.append("AI is thinking")
             if cpu_busy:
                 detail_parts.append("high CPU")
+            state = " | ".join(detail_parts) or "idle"
             detail_parts.append(f"{int(elapsed)}s elapsed")
             self._emit_status("waiting", f"🔵 {' | '.join(detail_parts)}")
+            if state != last_state:
+                last_state = state
+                yield f"🔵 {state} ({int(elapsed)}s)\n"
 
             # If NOT thinking AND CPU is low AND title is stable
             if not is_thinking and not cpu_busy:
@@ -576,10 +663,10 @@ class EditorBridge:
             last_title = current_title
 
             # Poll sleep (interruptible)
-            if self._cancel_wait.wait(timeout=self._poll_interval):
+            if token.wait(self._poll_interval):
                 return "cancelled"
 
-    def _is_editor_cpu_busy(self) -> bool:
+    def _is_editor_cpu_busy(self, token: Optional[CancelToken] = None) -> bool:
         """Check if the editor process is using significant CPU.
         Returns True if CPU usage is above threshold (suggests still working)."""
         editor_config = self.EDITORS[self._editor]
@@ -591,12 +678,11 @@ class EditorBridge:
         try:
             # Use wmic for CPU check on Windows
             for pname in process_names:
-                output = subprocess.check_output(
+                output = self._run_interruptible(
                     ["wmic", "process", "where",
                      f"name='{pname}'",
                      "get", "PercentProcessorTime"],
-                    shell=True, text=True, stderr=subprocess.DEVNULL,
-                    timeout=5,
+                    timeout=5, token=token,
                 )
                 for line in output.strip().split("\n"):
                     line = line.strip()
@@ -609,10 +695,49 @@ class EditorBridge:
 
         return False
 
+    @staticmethod
+    def _run_interruptible(cmd: List[str], timeout: float,
+                           token: Optional[CancelToken] = None) -> str:
+        """check_output() that is killed when `token` is cancelled. Runs
+        without a shell in its own process group, so a kill takes down the
+        command itself and anything it started."""
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        proc = subprocess.Popen(cmd, text=True, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, **group)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                output, _ = proc.communicate(timeout=0.05)
+                return output
+            except subprocess.TimeoutExpired:
+                if (token is not None and token.cancelled) or time.monotonic() >= deadline:
+                    EditorBridge._kill_tree(proc)
+                    proc.communicate()
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+
+    @staticmethod
+    def _kill_tree(proc: subprocess.Popen):
+        """Kill a process started by _run_interruptible and its children"""
+        try:
+            if os.name == "nt":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               timeout=5)
+            else:
+                import signal
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (OSError, subprocess.SubprocessError):
+            pass
+        if proc.poll() is None:
+            proc.kill()
+
     # ═══════════════════════════════════════════════════
     # KEYBOARD SIMULATION HELPERS
     # ═══════════════════════════════════════════════════
-    def _press_hotkey(self, hotkey: str):
+    def _press_hotkey(self, hotkey: str, token: Optional[CancelToken] = None):
         """Press a hotkey combination like 'ctrl+l' or 'ctrl+shift+i'"""
         import ctypes
 
@@ -633,21 +758,24 @@ class EditorBridge:
         keys = [k.strip().lower() for k in hotkey.split("+")]
         vk_codes = [VK_MAP.get(k, 0) for k in keys]
 
-        # Press down all keys
-        for vk in vk_codes:
-            if vk:
-                user32.keybd_event(vk, 0, 0, 0)
-                time.sleep(0.05)
-
-        # Release all keys in reverse
-        for vk in reversed(vk_codes):
-            if vk:
+        # Press down all keys; whatever was pressed is released even if
+        # the token is cancelled in between
+        pressed = []
+        try:
+            for vk in vk_codes:
+                if vk:
+                    user32.keybd_event(vk, 0, 0, 0)
+                    pressed.append(vk)
+                    self._sleep(0.05, token)
+        finally:
+            # Release all keys in reverse
+            for vk in reversed(pressed):
                 user32.keybd_event(vk, 0, KEYEVENTF_KEYUP, 0)
                 time.sleep(0.05)
 
-    def _press_key(self, key: str):
+    def _press_key(self, key: str, token: Optional[CancelToken] = None):
         """Press a single key"""
-        self._press_hotkey(key)
+        self._press_hotkey(key, token)
 
     def _clipboard_set(self, text: str):
         """Set clipboard content"""
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Project Lock — keep concurrent runs from editing the same project at once.
+
+Two engines (GUI, scheduler, CLI), or a workflow and the automation GUI's
+auto-heal, driving AI edits into one project thrash each other's changes.
+Every writer therefore takes an advisory lock on the project first:
+
+    locks = ProjectLockService()
+    with locks.hold(project_path, "auto-heal", paths=[".windsurf/tasks"]):
+        ...
+
+Locks are files in a directory outside the project (so they never show up
+in `git status` or project fingerprints), one per holder, carrying owner
+metadata: owner, pid, host, mode and paths. Holders share a lock when
+neither writes, or when their paths do not overlap; `paths=None` means the
+whole project. Callers that have to wait queue up in `.wait` files and
+are served first come, first served, so a run that releases and re-locks
+between its steps cannot starve another. A holder's file is touched every
+few seconds while held; a lock whose process is gone (same host) or whose
+heartbeat is older than `stale_after` is stale and removed by the next
+caller.
+"""
+
+import hashlib
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+from workflow_timers import CancelToken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), "mycircle_project_locks")
+SUFFIX = ".lock"
+WAIT_SUFFIX = ".wait"
+_WILDCARDS = re.compile(r"[*?\[{]")
+
+
+class ProjectLockTimeout(TimeoutError):
+    """The lock was not granted within the caller's timeout"""
+
+    def __init__(self, project_path: str, holders: List[Dict[str, Any]]):
+        self.holders = holders
+        owners = ", ".join(describe_holder(h) for h in holders) or "unknown"
+        super().__init__(f"Project {project_path} is locked by {owners}")
+
+
+def describe_holder(holder: Dict[str, Any]) -> str:
+    return f"{holder.get('owner', '?')} (pid {holder.get('pid')} on {holder.get('host')})"
+
+
+def normalize_paths(paths: Optional[List[str]]) -> Optional[List[str]]:
+    """Project-relative paths as comparable prefixes. None = whole project.
+    A glob stands for the directory before its first wildcard."""
+    if paths is None:
+        return None
+    normalized = []
+    for path in paths:
+        path = str(path).replace("\\", "/")
+        wildcard = _WILDCARDS.search(path)
+        if wildcard:
+            head = path[:wildcard.start()]
+            path = head.rsplit("/", 1)[0] if "/" in head else ""
+        parts = [p for p in path.split("/") if p not in ("", ".")]
+        if not parts:
+            return None  # the project root
+        normalized.append(os.path.normcase("/".join(parts)))
+    return normalized
+
+
+def paths_overlap(a: Optional[List[str]], b: Optional[List[str]]) -> bool:
+    if a is None or b is None:
+        return True
+    return any(x == y or x.startswith(y + "/") or y.startswith(x + "/") for x in a for y in b)
+
+
+def pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+
+class ProjectLock:
+    """A granted lock, held until release()"""
+
+    def __init__(self, service: "ProjectLockService", project_path: str, path: Path,
+                 info: Dict[str, Any]):
+        self.service = service
+        self.project_path = project_path
+        self.path = path
+        self.info = info
+        self.waited = 0.0  # seconds spent waiting for it
+
+    def release(self):
+        self.service.release(self)
+
+    @property
+    def shared(self) -> bool:
+        return self.info["mode"] == "shared"
+
+    def __repr__(self):
+        return (f"ProjectLock({self.project_path!r}, owner={self.info['owner']!r}, "
+                f"mode={self.info['mode']}, paths={self.info['paths']})")
+
+
+class ProjectLockService:
+    """Advisory, cross-process locks keyed by project path"""
+
+    def __init__(self, directory: Optional[str] = None, stale_after: float = 60.0,
+                 poll_interval: float = 0.25):
+        self.directory = Path(directory or DEFAULT_LOCK_DIR)
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.host = socket.gethostname()
+        self._held: Dict[Path, ProjectLock] = {}
+        self._lock = threading.Lock()
+        self._beating: Optional[threading.Thread] = None
+
+    # ═══════════════════════════════════════════════════════
+    # PUBLIC API
+    # ═══════════════════════════════════════════════════════
+
+    def acquire(self, project_path: str, owner: str, paths: Optional[List[str]] = None,
+                shared: bool = False, token: Optional[CancelToken] = None,
+                timeout: Optional[float] = None,
+                on_wait: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> ProjectLock:
+        """Wait until no conflicting holder (or earlier conflicting waiter)
+        remains, then take the lock. Raises StepCancelled if `token` is
+        cancelled and ProjectLockTimeout after `timeout` seconds.
+        `on_wait(holders)` is called once if the caller has to wait."""
+        paths = normalize_paths(paths)
+        info = {
+            "id": uuid.uuid4().hex,
+            "project": str(project_path),
+            "owner": owner,
+            "pid": os.getpid(),
+            "host": self.host,
+            "mode": "shared" if shared else "exclusive",
+            "paths": paths,
+        }
+        directory = self._project_dir(project_path)
+        path = directory / f"{info['id']}{SUFFIX}"
+        waiting = directory / f"{info['id']}{WAIT_SUFFIX}"
+        conflicts_with = lambda other: (not (shared and other["mode"] == "shared")
+                                        and paths_overlap(paths, other["paths"]))
+        started = time.monotonic()
+        try:
+            while True:
+                blockers = None
+                with self._guard(directory):
+                    conflicts = [h for h in self._live_holders(directory) if conflicts_with(h)]
+                    queued = [w for w in self._live_holders(directory, WAIT_SUFFIX)
+                              if w["queued_at"] < info.get("queued_at", float("inf"))
+                              and w["id"] != info["id"] and conflicts_with(w)]
+                    if not conflicts and not queued:
+                        info["acquired_at"] = time.time()
+                        path.write_text(json.dumps(info), encoding="utf-8")
+                        break
+                    if timeout is not None and time.monotonic() - started >= timeout:
+                        raise ProjectLockTimeout(str(project_path), conflicts + queued)
+                    if "queued_at" not in info:
+                        info["queued_at"] = time.time()
+                        waiting.write_text(json.dumps(info), encoding="utf-8")
+                        blockers = conflicts + queued
+                    else:
+                        os.utime(waiting)  # still waiting, not stale
+                if blockers:
+                    logger.info(f"Waiting for project lock on {project_path} behind "
+                                f"{', '.join(describe_holder(h) for h in blockers)}")
+                    if on_wait:
+                        on_wait(blockers)
+                if token is not None:
+                    token.sleep(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            if "queued_at" in info:
+                waiting.unlink(missing_ok=True)
+
+        lock = ProjectLock(self, str(project_path), path, info)
+        lock.waited = time.monotonic() - started
+        with self._lock:
+            self._held[path] = lock
+            if self._beating is None or not self._beating.is_alive():
+                self._beating = threading.Thread(target=self._heartbeat, daemon=True,
+                                                 name="project-lock-heartbeat")
+                self._beating.start()
+        return lock
+
+    def release(self, lock: ProjectLock):
+        with self._lock:
+            self._held.pop(lock.path, None)
+        try:
+            lock.path.unlink()
+        except FileNotFoundError:
+            logger.warning(f"Project lock {lock.path.name} was already removed (treated as stale?)")
+        except OSError as e:
+            logger.warning(f"Could not release project lock {lock.path}: {e}")
+
+    @contextmanager
+    def hold(self, project_path: str, owner: str, paths: Optional[List[str]] = None,
+             shared: bool = False, token: Optional[CancelToken] = None,
+             timeout: Optional[float] = None,
+             on_wait: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+             ) -> Iterator[ProjectLock]:
+        lock = self.acquire(project_path, owner, paths, shared, token, timeout, on_wait)
+        try:
+            yield lock
+        finally:
+            self.release(lock)
+
+    def holders(self, project_path: str) -> List[Dict[str, Any]]:
+        """Live holders of the project's locks (stale ones are removed)"""
+        directory = self._project_dir(project_path)
+        with self._guard(directory):
+            return self._live_holders(directory)
+
+    def release_all(self):
+        """Drop every lock this service holds (e.g. on shutdown)"""
+        with self._lock:
+            held = list(self._held.values())
+        for lock in held:
+            self.release(lock)
+
+    # ═══════════════════════════════════════════════════════
+    # LOCK FILES
+    # ═══════════════════════════════════════════════════════
+
+    def _project_dir(self, project_path: str) -> Path:
+        """One directory per project, named after its normalized real path"""
+        real = os.path.normcase(os.path.realpath(str(project_path)))
+        digest = hashlib.sha1(real.encode("utf-8")).hexdigest()[:16]
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", os.path.basename(real.rstrip("\\/")))[:40]
+        directory = self.directory / f"{name or 'root'}-{digest}"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def _live_holders(self, directory: Path, suffix: str = SUFFIX) -> List[Dict[str, Any]]:
+        """Read the lock (or wait) files, removing stale ones (guard held)"""
+        holders = []
+        for path in directory.glob(f"*{suffix}"):
+            try:
+                holder = json.loads(path.read_text(encoding="utf-8"))
+                beat = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Removing unreadable project lock {path.name}: {e}")
+                path.unlink(missing_ok=True)
+                continue
+            reason = self._stale_reason(holder, beat)
+            if reason:
+                logger.warning(f"Removing stale project lock of {describe_holder(holder)}: {reason}")
+                path.unlink(missing_ok=True)
+                continue
+            holders.append(holder)
+        return holders
+
+    def _stale_reason(self, holder: Dict[str, Any], beat: float) -> Optional[str]:
+        if holder.get("host") == self.host and not pid_alive(int(holder.get("pid") or 0)):
+            return "process has exited"
+        age = time.time() - beat
+        if age > self.stale_after:
+            return f"no heartbeat for {age:.0f}s"
+        return None
+
+    def _heartbeat(self):
+        """Touch held lock files so other hosts do not consider them stale"""
+        while True:
+            time.sleep(max(0.5, self.stale_after / 4))
+            with self._lock:
+                held = list(self._held)
+                if not held:
+                    self._beating = None
+                    return
+            for path in held:
+                try:
+                    os.utime(path)
+                except OSError as e:
+                    logger.warning(f"Project lock {path.name} lost: {e}")
+
+    @contextmanager
+    def _guard(self, directory: Path):
+        """Serialize check-and-create between processes with an OS file lock"""
+        fd = os.open(str(directory / ".guard"), os.O_RDWR | os.O_CREAT)
+        try:
+            if os.name == "nt":
+                import msvcrt
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK gives up after ~10s; keep waiting
+                try:
+                    yield
+                finally:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+_shared: Optional[ProjectLockService] = None
+_shared_lock = threading.Lock()
+
+
+def shared_lock_service() -> ProjectLockService:
+    """The process-wide lock service (default lock directory)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ProjectLockService()
+        return _shared
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Project State — cheap fingerprints of a project working tree.
+Used to key cached step results and to detect whether anything changed.
+"""
+
+import hashlib
+import os
+import subprocess
+from pathlib import Path
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _git(project_path: Path, *args: str) -> Optional[bytes]:
+    try:
+        return subprocess.check_output(
+            ["git", *args], cwd=str(project_path),
+            stderr=subprocess.DEVNULL, timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def git_tree_state(project_path: str) -> Optional[str]:
+    """Hash of HEAD's tree plus the state of every dirty path.
+
+    Dirty paths come from `git status --porcelain`; each one contributes its
+    size and mtime, so editing an already-modified file changes the hash
+    without reading file contents. Untracked directories are listed file by
+    file, so edits inside a new directory count too. Returns None if the
+    path is not a git repository.
+    """
+    path = Path(project_path)
+    tree = _git(path, "rev-parse", "HEAD^{tree}")
+    if tree is None:
+        return None
+    status = _git(path, "status", "--porcelain=v1", "-z", "--untracked-files=all") or b""
+    digest = hashlib.sha256(tree.strip())
+    entries = iter(status.split(b"\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue  # trailing separator
+        digest.update(b"\0" + entry)
+        if entry[:1] in (b"R", b"C"):
+            # Renames and copies: the original path follows, without a status
+            digest.update(b"\0" + next(entries, b""))
+        try:
+            st = (path / entry[3:].decode("utf-8", "replace")).stat()
+            digest.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+        except OSError:
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+
+def mtime_index_state(project_path: str, roots=("lib", "test")) -> Optional[str]:
+    """Hash of (path, size, mtime) for every file under `roots`.
+    Works without git; returns None if none of the roots exist."""
+    base = Path(project_path)
+    digest = hashlib.sha256()
+    found = False
+    for root in roots:
+        top = base / root
+        if not top.is_dir():
+            continue
+        found = True
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = sorted(os.scandir(current), key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                rel = os.path.relpath(entry.path, base)
+                digest.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "replace"))
+    return digest.hexdigest() if found else None
+
+
+def project_fingerprint(project_path: str, method: str = "git") -> Optional[str]:
+    """Fingerprint used for change detection.
+    method: 'git' (HEAD + dirty tree, falls back to mtime) or 'mtime'."""
+    if not project_path:
+        return None
+    if method == "git":
+        state = git_tree_state(project_path)
+        if state is not None:
+            return state
+    return mtime_index_state(project_path)
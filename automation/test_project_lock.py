@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for cross-process project locks.
+Run: python -m unittest test_project_lock   (from automation/)
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from project_lock import ProjectLockService, ProjectLockTimeout, paths_overlap
+from workflow_timers import CancelToken, StepCancelled
+
+
+class ProjectLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp(prefix="test_locks_")
+        self.project = tempfile.mkdtemp(prefix="test_locked_project_")
+        self.addCleanup(shutil.rmtree, self.lock_dir, True)
+        self.addCleanup(shutil.rmtree, self.project, True)
+        self.locks = ProjectLockService(self.lock_dir, poll_interval=0.02)
+        self.addCleanup(self.locks.release_all)
+
+    def test_exclusive_locks_conflict(self):
+        self.locks.acquire(self.project, "run A")
+        with self.assertRaises(ProjectLockTimeout) as caught:
+            self.locks.acquire(self.project, "run B", timeout=0.1)
+        self.assertEqual([h["owner"] for h in caught.exception.holders], ["run A"])
+
+    def test_shared_locks_coexist(self):
+        self.locks.acquire(self.project, "reader 1", shared=True)
+        self.locks.acquire(self.project, "reader 2", shared=True, timeout=0.1)
+        with self.assertRaises(ProjectLockTimeout):
+            self.locks.acquire(self.project, "writer", timeout=0.1)
+
+    def test_disjoint_paths_coexist(self):
+        self.locks.acquire(self.project, "heal", paths=[".windsurf/tasks"])
+        self.locks.acquire(self.project, "feature", paths=["lib/chat"], timeout=0.1)
+        with self.assertRaises(ProjectLockTimeout):
+            self.locks.acquire(self.project, "whole project", timeout=0.1)
+
+    def test_paths_overlap(self):
+        self.assertTrue(paths_overlap(None, ["lib"]))
+        self.assertTrue(paths_overlap(["lib"], ["lib/chat/view.dart"]))
+        self.assertFalse(paths_overlap(["lib/chat"], ["lib/chatbot"]))
+
+    def test_waiter_gets_the_lock_on_release(self):
+        first = self.locks.acquire(self.project, "run A")
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(self.locks.acquire(self.project, "run B")))
+        waiter.start()
+        time.sleep(0.1)
+        self.assertEqual(got, [])
+        first.release()
+        waiter.join(2)
+        self.assertEqual(got[0].info["owner"], "run B")
+        self.assertGreater(got[0].waited, 0.05)
+
+    def test_cancelled_waiter_gives_up(self):
+        self.locks.acquire(self.project, "run A")
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+        with self.assertRaises(StepCancelled):
+            self.locks.acquire(self.project, "run B", token=token)
+        self.assertEqual([h["owner"] for h in self.locks.holders(self.project)], ["run A"])
+
+    def test_lock_of_exited_process_is_removed(self):
+        held = self.locks.acquire(self.project, "crashed run")
+        self.locks.release_all()  # forget it here, but leave a file behind for a dead pid
+        dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                              capture_output=True, text=True).stdout.strip()
+        held.info["pid"] = int(dead)
+        held.path.write_text(json.dumps(held.info), encoding="utf-8")
+        self.locks.acquire(self.project, "next run", timeout=0.1)
+        self.assertFalse(held.path.exists())
+
+    def test_lock_without_heartbeat_is_removed(self):
+        held = self.locks.acquire(self.project, "other host")
+        self.locks.release_all()
+        held.info["host"] = "elsewhere"  # its pid cannot be checked from here
+        held.path.write_text(json.dumps(held.info), encoding="utf-8")
+        old = time.time() - 5
+        os.utime(held.path, (old, old))
+        with self.assertRaises(ProjectLockTimeout):
+            self.locks.acquire(self.project, "patient run", timeout=0.1)
+        impatient = ProjectLockService(self.lock_dir, stale_after=1, poll_interval=0.02)
+        impatient.acquire(self.project, "next run", timeout=0.1).release()
+        self.assertFalse(held.path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
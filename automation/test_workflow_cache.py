@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for project fingerprints and the step result cache.
+Run: python -m unittest test_workflow_cache   (from automation/)
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+from project_state import git_tree_state, mtime_index_state
+from workflow_cache import StepResultCache
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class GitTreeStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = tempfile.mkdtemp(prefix="test_tree_state_")
+        self.addCleanup(shutil.rmtree, self.repo, True)
+        _write(os.path.join(self.repo, "lib", "main.dart"), "void main() {}")
+        _git(self.repo, "init", "-q")
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-qm", "initial")
+
+    def _edit(self, relative, text):
+        time.sleep(0.01)  # a distinct mtime even on coarse clocks
+        _write(os.path.join(self.repo, relative), text)
+
+    def test_edit_inside_untracked_directory_changes_state(self):
+        self._edit("lib/chat/view.dart", "a")
+        before = git_tree_state(self.repo)
+        self._edit("lib/chat/view.dart", "ab")
+        self.assertNotEqual(before, git_tree_state(self.repo))
+
+    def test_edit_of_renamed_file_changes_state(self):
+        _git(self.repo, "mv", "lib/main.dart", "lib/app.dart")
+        before = git_tree_state(self.repo)
+        self._edit("lib/app.dart", "void main() { run(); }")
+        self.assertNotEqual(before, git_tree_state(self.repo))
+
+    def test_unchanged_tree_keeps_state(self):
+        self._edit("lib/chat/view.dart", "a")
+        self.assertEqual(git_tree_state(self.repo), git_tree_state(self.repo))
+
+    def test_not_a_repository(self):
+        plain = tempfile.mkdtemp(prefix="test_not_git_")
+        self.addCleanup(shutil.rmtree, plain, True)
+        self.assertIsNone(git_tree_state(plain))
+
+
+class MtimeIndexTest(unittest.TestCase):
+
+    def test_none_without_roots(self):
+        empty = tempfile.mkdtemp(prefix="test_mtime_")
+        self.addCleanup(shutil.rmtree, empty, True)
+        self.assertIsNone(mtime_index_state(empty))
+
+    def test_edit_under_lib_changes_state(self):
+        project = tempfile.mkdtemp(prefix="test_mtime_")
+        self.addCleanup(shutil.rmtree, project, True)
+        _write(os.path.join(project, "lib", "a.dart"), "a")
+        before = mtime_index_state(project)
+        _write(os.path.join(project, "lib", "a.dart"), "ab")
+        self.assertNotEqual(before, mtime_index_state(project))
+
+
+class EngineResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.project = tempfile.mkdtemp(prefix="test_cache_project_")
+        self.cache_dir = tempfile.mkdtemp(prefix="test_cache_")
+        self.addCleanup(shutil.rmtree, self.project, True)
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        _write(os.path.join(self.project, "lib", "a.dart"), "a")
+
+    def _run(self, project_path):
+        engine = WorkflowEngine()
+        engine.fingerprint_method = "mtime"
+        engine.result_cache = StepResultCache(self.cache_dir)
+        sent = []
+        engine.send_prompt_fn = lambda prompt: sent.append(prompt) or "result"
+        workflow = Workflow("cache test")
+        if project_path:
+            workflow.variables["project_path"] = project_path
+        workflow.add_step(WorkflowStep("analyze", "Analyze", delay_after=0, cacheable=True))
+        engine.start(workflow)
+        engine.wait()
+        return sent, engine.last_run_summary
+
+    def test_hit_while_project_unchanged(self):
+        self._run(self.project)
+        sent, summary = self._run(self.project)
+        self.assertEqual(sent, [])
+        self.assertEqual(summary["cache_hits"], 1)
+
+    def test_miss_after_project_changed(self):
+        self._run(self.project)
+        _write(os.path.join(self.project, "lib", "a.dart"), "changed")
+        sent, summary = self._run(self.project)
+        self.assertEqual(sent, ["Analyze"])
+        self.assertEqual(summary["cache_misses"], 1)
+
+    def test_no_caching_without_project_state(self):
+        self._run(None)
+        sent, summary = self._run(None)
+        self.assertEqual(sent, ["Analyze"])
+        self.assertEqual((summary["cache_hits"], summary["cache_misses"]), (0, 0))
+
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class LoopSkipTest(unittest.TestCase):
+
+    def test_unchanged_iterations_are_skipped_until_an_untracked_file_changes(self):
+        project = tempfile.mkdtemp(prefix="test_loop_project_")
+        self.addCleanup(shutil.rmtree, project, True)
+        _write(os.path.join(project, "lib", "main.dart"), "void main() {}")
+        _git(project, "init", "-q")
+        _git(project, "add", ".")
+        _git(project, "commit", "-qm", "initial")
+        _write(os.path.join(project, "lib", "chat", "view.dart"), "new screen")  # untracked
+
+        engine = WorkflowEngine()
+        engine.loop_mode = True
+        engine.loop_interval = 0.1
+        engine.max_loop_backoff = 0.1
+        engine.skip_unchanged = True
+        sent = []
+        engine.send_prompt_fn = lambda prompt: sent.append(prompt) or "ok"
+        workflow = Workflow("loop test")
+        workflow.variables["project_path"] = project
+        workflow.add_step(WorkflowStep("improve", "Improve", delay_after=0))
+        engine.start(workflow)
+        self.addCleanup(engine.wait, 2)
+        self.addCleanup(engine.cancel)
+
+        time.sleep(0.45)
+        self.assertEqual(sent, ["Improve"])
+        self.assertGreaterEqual(engine.run_summary()["skipped_iterations"], 2)
+
+        _write(os.path.join(project, "lib", "chat", "view.dart"), "new screen, edited")
+        time.sleep(0.3)
+        self.assertEqual(sent[:2], ["Improve", "Improve"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for running steps with explicit dependencies.
+Run: python -m unittest test_workflow_dag   (from automation/)
+"""
+
+import threading
+import time
+import unittest
+
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+
+
+def _dag(*edges):
+    """Workflow whose steps are (name, depends_on) pairs; the prompt is the name"""
+    workflow = Workflow("dag test")
+    for name, depends_on in edges:
+        workflow.add_step(WorkflowStep(name, name, delay_after=0, depends_on=depends_on))
+    return workflow
+
+
+class _Editor:
+    """send_prompt_fn that records overlap and can fail chosen prompts"""
+
+    def __init__(self, hold=0.1, fail=()):
+        self.hold = hold
+        self.fail = set(fail)
+        self.sent = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.sent.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.hold)
+            if prompt in self.fail:
+                raise RuntimeError(f"{prompt} broke")
+            return "ok"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class DagTest(unittest.TestCase):
+
+    def _run(self, workflow, editor, max_parallel=4):
+        engine = WorkflowEngine()
+        engine.max_parallel_steps = max_parallel
+        engine.send_prompt_fn = editor
+        engine.start(workflow)
+        engine.wait()
+        return {s.name: s.status for s in workflow.steps}
+
+    def test_independent_steps_overlap(self):
+        workflow = _dag(("root", []), ("a", ["root"]), ("b", ["root"]), ("c", ["root"]))
+        editor = _Editor()
+        statuses = self._run(workflow, editor)
+        self.assertEqual(set(statuses.values()), {"completed"})
+        self.assertEqual(editor.sent[0], "root")
+        self.assertEqual(editor.peak, 3)
+
+    def test_parallelism_is_bounded(self):
+        workflow = _dag(*[(f"s{n}", []) for n in range(5)])
+        editor = _Editor()
+        self._run(workflow, editor, max_parallel=2)
+        self.assertEqual(len(editor.sent), 5)
+        self.assertEqual(editor.peak, 2)
+
+    def test_dependents_wait_for_all_dependencies(self):
+        workflow = _dag(("a", []), ("b", []), ("join", ["a", "b"]))
+        editor = _Editor()
+        self._run(workflow, editor)
+        self.assertEqual(editor.sent[-1], "join")
+        self.assertEqual(editor.peak, 2)
+
+    def test_dependents_of_failed_step_are_skipped(self):
+        workflow = _dag(("a", []), ("b", ["a"]), ("c", ["b"]), ("side", []))
+        editor = _Editor(hold=0.01, fail={"a"})
+        statuses = self._run(workflow, editor)
+        self.assertEqual(statuses, {"a": "failed", "b": "skipped",
+                                    "c": "skipped", "side": "completed"})
+        self.assertNotIn("b", editor.sent)
+
+    def test_unknown_dependency_and_cycle_are_rejected(self):
+        with self.assertRaises(ValueError):
+            _dag(("a", ["missing"])).dependency_graph()
+        with self.assertRaises(ValueError):
+            _dag(("a", ["b"]), ("b", ["a"])).dependency_graph()
+
+
+if __name__ == "__main__":
+    unittest.main()
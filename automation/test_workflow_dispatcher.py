@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for editor turn arbitration.
+Run: python -m unittest test_workflow_dispatcher   (from automation/)
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from workflow_dispatcher import (PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_URGENT,
+                                 PromptDispatcher)
+from workflow_timers import CancelToken, StepCancelled
+
+EDITOR = "editor"
+
+
+class DispatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = PromptDispatcher(reserve_grace=0.0, lock_dir=None)
+        self.order = []
+
+    def _waiter(self, workflow, priority=PRIORITY_NORMAL, owner=None):
+        """Thread that takes one turn, records it and hands the editor back"""
+        def run():
+            self.dispatcher.acquire(EDITOR, workflow, priority=priority, owner=owner)
+            self.order.append((workflow, time.monotonic()))
+            self.dispatcher.release(EDITOR, workflow, priority, owner=owner)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def _wait_for_depth(self, depth):
+        deadline = time.monotonic() + 2
+        while self.dispatcher.queue_depth(EDITOR) < depth and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.dispatcher.queue_depth(EDITOR), depth)
+
+    def test_more_urgent_requests_go_first(self):
+        self.dispatcher.acquire(EDITOR, "holder")
+        threads = [self._waiter("low", PRIORITY_LOW)]
+        self._wait_for_depth(1)
+        threads.append(self._waiter("normal", PRIORITY_NORMAL))
+        self._wait_for_depth(2)
+        threads.append(self._waiter("urgent", PRIORITY_URGENT))
+        self._wait_for_depth(3)
+        self.dispatcher.release(EDITOR, "holder")
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual([name for name, _ in self.order], ["urgent", "normal", "low"])
+
+    def test_reservation_belongs_to_the_run_not_the_workflow_name(self):
+        self.dispatcher.acquire(EDITOR, "nightly", owner="run-1")
+        self.dispatcher.release(EDITOR, "nightly", reserve=0.4, owner="run-1")
+        other = self._waiter("nightly", owner="run-2")
+        time.sleep(0.1)
+        self.assertEqual(self.order, [])  # same name, different run: waits
+        waited = self.dispatcher.acquire(EDITOR, "nightly", owner="run-1")
+        self.assertLess(waited, 0.05)  # the owner goes straight in
+        self.dispatcher.release(EDITOR, "nightly", owner="run-1")
+        other.join(2)
+        self.assertEqual([name for name, _ in self.order], ["nightly"])
+
+    def test_reservation_expires(self):
+        self.dispatcher.acquire(EDITOR, "feature", owner="run-1")
+        self.dispatcher.release(EDITOR, "feature", reserve=0.3, owner="run-1")
+        released = time.monotonic()
+        self._waiter("other").join(2)
+        self.assertGreaterEqual(self.order[0][1] - released, 0.25)
+
+    def test_more_urgent_request_preempts_reservation(self):
+        self.dispatcher.acquire(EDITOR, "feature", owner="run-1")
+        self.dispatcher.release(EDITOR, "feature", PRIORITY_LOW, reserve=5, owner="run-1")
+        released = time.monotonic()
+        self._waiter("heal", PRIORITY_URGENT).join(2)
+        self.assertLess(self.order[0][1] - released, 1)
+        self.assertEqual(self.dispatcher.stats()[EDITOR]["preemptions"], 1)
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        self.dispatcher.acquire(EDITOR, "holder")
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+        with self.assertRaises(StepCancelled):
+            self.dispatcher.acquire(EDITOR, "waiter", token=token)
+        self.assertEqual(self.dispatcher.queue_depth(EDITOR), 0)
+        self.assertEqual(self.dispatcher.stats()[EDITOR]["cancelled"], 1)
+
+
+_HOLD_IN_CHILD = """
+import sys, time
+from workflow_dispatcher import PromptDispatcher
+dispatcher = PromptDispatcher(lock_dir=sys.argv[1])
+dispatcher.acquire("editor", "other process")
+print("held", flush=True)
+time.sleep(0.5)
+dispatcher.release("editor", "other process")
+"""
+
+
+class CrossProcessTest(unittest.TestCase):
+
+    def test_turn_waits_for_another_process(self):
+        lock_dir = tempfile.mkdtemp(prefix="test_dispatch_")
+        self.addCleanup(shutil.rmtree, lock_dir, True)
+        child = subprocess.Popen([sys.executable, "-c", _HOLD_IN_CHILD, lock_dir],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 stdout=subprocess.PIPE, text=True)
+        self.addCleanup(child.wait)
+        self.assertEqual(child.stdout.readline().strip(), "held")
+        dispatcher = PromptDispatcher(lock_dir=lock_dir)
+        waited = dispatcher.acquire(EDITOR, "this process")
+        dispatcher.release(EDITOR, "this process")
+        child.stdout.close()
+        self.assertGreaterEqual(waited, 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for queued event dispatch.
+Run: python -m unittest test_workflow_events   (from automation/)
+"""
+
+import threading
+import time
+import unittest
+
+from workflow_events import EventBus
+
+
+class EventBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EventBus(max_pending=5)
+        self.addCleanup(self.bus.close)
+        self.gate = threading.Event()
+        self.seen = []
+
+    def _slow(self, *args):
+        self.gate.wait(2)
+        self.seen.append(args)
+
+    def test_events_are_delivered_in_order(self):
+        self.bus.subscribe("step_start", lambda i: self.seen.append(("start", i)))
+        self.bus.subscribe("step_complete", lambda i: self.seen.append(("done", i)))
+        for i in range(3):
+            self.bus.publish("step_start", i)
+            self.bus.publish("step_complete", i)
+        self.assertTrue(self.bus.flush(2))
+        self.assertEqual(self.seen, [(kind, i) for i in range(3) for kind in ("start", "done")])
+
+    def test_progress_is_coalesced_behind_a_slow_subscriber(self):
+        self.bus.subscribe("progress", self._slow)
+        self.bus.publish("progress", 0)
+        time.sleep(0.05)  # the first value is being delivered
+        for value in range(1, 50):
+            self.bus.publish("progress", value)
+        self.gate.set()
+        self.bus.flush(2)
+        self.assertEqual(self.seen, [(0,), (49,)])
+        self.assertEqual(self.bus.stats()["coalesced"], 48)
+
+    def test_lossy_events_are_dropped_when_full(self):
+        self.bus.subscribe("step_output", self._slow)
+        for n in range(10):
+            self.bus.publish("step_output", n)
+        self.gate.set()
+        self.bus.flush(2)
+        stats = self.bus.stats()
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(stats["delivered"] + stats["dropped"], 10)
+
+    def test_lifecycle_events_wait_instead_of_dropping(self):
+        self.bus.subscribe("step_complete", self._slow)
+        publisher = threading.Thread(target=lambda: [self.bus.publish("step_complete", n)
+                                                     for n in range(10)])
+        publisher.start()
+        time.sleep(0.2)
+        self.assertTrue(publisher.is_alive())  # blocked: the queue is full
+        self.gate.set()
+        publisher.join(2)
+        self.bus.flush(2)
+        self.assertEqual(self.seen, [(n,) for n in range(10)])
+        self.assertEqual(self.bus.stats()["dropped"], 0)
+
+    def test_handler_errors_are_counted_and_do_not_stop_delivery(self):
+        def broken(i):
+            raise ValueError("boom")
+        self.bus.subscribe("step_start", broken)
+        self.bus.subscribe("step_start", lambda i: self.seen.append(i))
+        for i in range(3):
+            self.bus.publish("step_start", i)
+        self.bus.flush(2)
+        self.assertEqual(self.seen, [0, 1, 2])
+        self.assertEqual(self.bus.stats()["handler_errors"], 3)
+
+    def test_thread_restarts_after_close(self):
+        self.bus.subscribe("step_start", lambda i: self.seen.append(i))
+        self.bus.publish("step_start", 1)
+        self.bus.close()
+        self.bus.publish("step_start", 2)
+        self.bus.flush(2)
+        self.assertEqual(self.seen, [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
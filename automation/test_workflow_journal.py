@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for run journals and resuming interrupted runs.
+Run: python -m unittest test_workflow_journal   (from automation/)
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+from workflow_journal import JournalStore, prompt_hash, safe_file_name
+
+
+class SafeFileNameTest(unittest.TestCase):
+
+    def test_unsafe_characters_are_replaced(self):
+        self.assertEqual(safe_file_name('Fix: "auth" <v2>/login?'), "fix___auth___v2__login_")
+        self.assertEqual(safe_file_name("tabs\tand [brackets]"), "tabs_and__brackets_")
+
+    def test_reserved_and_empty_names(self):
+        self.assertEqual(safe_file_name("CON"), "con_")
+        self.assertEqual(safe_file_name("lpt1"), "lpt1_")
+        self.assertEqual(safe_file_name(""), "_")
+        self.assertEqual(safe_file_name("release..."), "release")
+
+
+class ResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_journal_")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.workflow = Workflow("Nightly: build")
+        self.workflow.add_step(WorkflowStep("a", "first", delay_after=0))
+        self.workflow.add_step(WorkflowStep("b", "second", delay_after=0))
+        # A run that crashed after step 'a'
+        journal = JournalStore(self.dir).open_run(self.workflow.name)
+        journal.record("run_start", durable=True, workflow=self.workflow.name, steps=["a", "b"])
+        journal.record("step_start", index=0, name="a", prompt_hash=prompt_hash("first"))
+        journal.record("step_end", durable=True, index=0, name="a", status="completed",
+                       result="did first", prompt_hash=prompt_hash("first"))
+        journal.record("step_start", index=1, name="b", prompt_hash=prompt_hash("second"))
+        journal.detach()
+
+    def _engine(self, sent):
+        engine = WorkflowEngine()
+        engine.journal_dir = self.dir
+        engine.send_prompt_fn = lambda prompt: sent.append(prompt) or f"did {prompt}"
+        return engine
+
+    def test_resume_skips_completed_steps(self):
+        self.assertEqual(set(JournalStore(self.dir).find_resumable(self.workflow.name).completed),
+                         {"a"})
+        sent = []
+        engine = self._engine(sent)
+        engine.start(self.workflow, resume=True)
+        engine.wait()
+        self.assertEqual(sent, ["second"])
+        self.assertEqual(self.workflow.steps[0].result, "did first")
+        self.assertIsNone(JournalStore(self.dir).find_resumable(self.workflow.name))
+
+    def test_edited_step_is_not_restored(self):
+        self.workflow.steps[0].prompt = "first, differently"
+        sent = []
+        engine = self._engine(sent)
+        engine.start(self.workflow, resume=True)
+        engine.wait()
+        self.assertEqual(sent, ["first, differently", "second"])
+
+    def test_failed_launch_keeps_the_run_resumable(self):
+        engine = self._engine([])
+        with mock.patch.object(engine, "_launch", side_effect=RuntimeError("no thread")):
+            with self.assertRaises(RuntimeError):
+                engine.start(self.workflow, resume=True)
+        self.assertIsNotNone(JournalStore(self.dir).find_resumable(self.workflow.name))
+        self.assertFalse(engine.is_running)
+
+
+if __name__ == "__main__":
+    unittest.main()
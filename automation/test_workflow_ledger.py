@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the step ledger and incremental re-runs.
+Run: python -m unittest test_workflow_ledger   (from automation/)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+from workflow_ledger import StepLedger
+
+
+class StepLedgerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_ledger_")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+
+    def test_steps_with_the_same_name_are_kept_apart(self):
+        ledger = StepLedger(self.dir)
+        ledger.record("wf", 0, "review", "fp0", "first review")
+        ledger.record("wf", 3, "review", "fp3", "second review")
+        reloaded = StepLedger(self.dir)
+        self.assertEqual(reloaded.lookup("wf", 0, "review", "fp0")["result"], "first review")
+        self.assertEqual(reloaded.lookup("wf", 3, "review", "fp3")["result"], "second review")
+        self.assertIsNone(reloaded.lookup("wf", 0, "review", "fp3"))
+
+    def test_workflow_names_unsafe_on_windows(self):
+        ledger = StepLedger(self.dir)
+        ledger.record("Fix: auth/login?", 0, "a", "fp", "done")
+        self.assertEqual(os.listdir(self.dir), ["fix__auth_login_.json"])
+        self.assertEqual(StepLedger(self.dir).lookup("Fix: auth/login?", 0, "a", "fp")["result"],
+                         "done")
+
+    def test_forget(self):
+        ledger = StepLedger(self.dir)
+        ledger.record("wf", 0, "a", "fp", "done")
+        ledger.forget("wf")
+        self.assertIsNone(StepLedger(self.dir).lookup("wf", 0, "a", "fp"))
+
+    def _run(self, workflow):
+        engine = WorkflowEngine()
+        engine.step_ledger = StepLedger(self.dir)
+        engine.incremental = True
+        sent = []
+        engine.send_prompt_fn = lambda prompt: sent.append(prompt) or f"did {prompt}"
+        engine.start(workflow)
+        engine.wait()
+        return sent, engine.last_run_summary["reused_steps"]
+
+    def test_rerun_sends_only_changed_steps(self):
+        workflow = Workflow("incremental")
+        for name, prompt in (("review", "review the API"), ("fix", "fix it"),
+                             ("review", "review the UI"), ("ship", "ship it")):
+            workflow.add_step(WorkflowStep(name, prompt, delay_after=0))
+        self._run(workflow)
+
+        sent, reused = self._run(workflow)
+        self.assertEqual((sent, reused), ([], 4))
+
+        workflow.steps[2].prompt = "review the UI again"
+        sent, reused = self._run(workflow)
+        self.assertEqual(sent, ["review the UI again", "ship it"])  # and its dependent
+        self.assertEqual(reused, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed workflow library.
+Run: python -m unittest test_workflow_library   (from automation/)
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from workflow_library import WorkflowLibrary
+
+
+class WorkflowLibraryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_library_")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+
+    def _save(self, fname, name, steps=1, age=0.0):
+        path = os.path.join(self.dir, fname)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"name": name, "description": f"about {name}",
+                       "steps": [{"name": f"s{n}", "prompt": "p"} for n in range(steps)]}, f)
+        if age:
+            old = time.time() - age
+            os.utime(path, (old, old))
+        return path
+
+    def test_manifest_lists_workflows_and_loads_them_lazily(self):
+        self._save("workflow_a.json", "Alpha", steps=2)
+        self._save("workflow_b.json", "Beta", steps=3)
+        self._save("notes.json", "Not a workflow")
+        library = WorkflowLibrary(self.dir)
+        library.refresh()
+        self.assertEqual(library.names(), ["Alpha", "Beta"])
+        self.assertEqual(library.entry("Beta")["step_count"], 3)
+        workflow = library.get("Alpha")
+        self.assertEqual([s.name for s in workflow.steps], ["s0", "s1"])
+        self.assertIs(library.get("Alpha"), workflow)
+
+    def test_unchanged_files_are_not_reread(self):
+        self._save("workflow_a.json", "Alpha", age=60)
+        WorkflowLibrary(self.dir).refresh()
+        library = WorkflowLibrary(self.dir)
+        with mock.patch.object(library, "_index_file", wraps=library._index_file) as index:
+            library.refresh()
+        self.assertEqual(index.call_count, 0)
+        self.assertEqual(library.names(), ["Alpha"])
+
+    def test_same_size_rewrite_with_unchanged_mtime_is_noticed(self):
+        path = self._save("workflow_a.json", "Alpha")
+        library = WorkflowLibrary(self.dir)
+        library.refresh()
+        st = os.stat(path)
+        self._save("workflow_a.json", "Gamma")  # same length as "Alpha"
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(os.stat(path).st_size, st.st_size)
+        library.refresh()
+        self.assertEqual(library.names(), ["Gamma"])
+
+    def test_changed_and_deleted_files(self):
+        self._save("workflow_a.json", "Alpha", age=60)
+        self._save("workflow_b.json", "Beta", age=60)
+        library = WorkflowLibrary(self.dir)
+        library.refresh()
+        self._save("workflow_a.json", "Alpha v2", steps=4)
+        os.remove(os.path.join(self.dir, "workflow_b.json"))
+        library.refresh()
+        self.assertEqual(library.names(), ["Alpha v2"])
+        self.assertEqual(library.entry("Alpha v2")["step_count"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
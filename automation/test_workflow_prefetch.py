@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for preparing the next step while the current one runs.
+Run: python -m unittest test_workflow_prefetch   (from automation/)
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def _engine(self, send):
+        engine = WorkflowEngine()
+        engine.speculate = True
+        engine.send_prompt_fn = send
+        return engine
+
+    def test_prompt_edited_in_place_is_sent(self):
+        workflow = Workflow("edit during run")
+        workflow.add_step(WorkflowStep("a", "first", delay_after=0.2))
+        workflow.add_step(WorkflowStep("b", "OLD prompt", delay_after=0))
+        sent = []
+
+        def send(prompt):
+            if prompt == "first":
+                time.sleep(0.2)  # the next step is prefetched meanwhile
+                workflow.steps[1].prompt = "NEW prompt"  # as the GUI does, without touch()
+            sent.append(prompt)
+            return "ok"
+
+        engine = self._engine(send)
+        engine.start(workflow)
+        engine.wait()
+        self.assertEqual(sent, ["first", "NEW prompt"])
+
+    def test_prefetched_prompt_is_used(self):
+        workflow = Workflow("unchanged")
+        workflow.variables["feature"] = "search"
+        for n in range(3):
+            workflow.add_step(WorkflowStep(f"s{n}", f"step {n} of {{feature}}", delay_after=0))
+        sent = []
+        engine = self._engine(lambda prompt: sent.append(prompt) or "ok")
+        engine.start(workflow)
+        engine.wait()
+        self.assertEqual(sent, [f"step {n} of search" for n in range(3)])
+        self.assertEqual(engine.last_run_summary["prefetch_hits"], 2)
+
+    def test_guard_sees_files_written_during_cooldown(self):
+        project = tempfile.mkdtemp(prefix="test_prefetch_")
+        self.addCleanup(shutil.rmtree, project, True)
+        os.makedirs(os.path.join(project, "lib"))
+        workflow = Workflow("guard")
+        workflow.variables["project_path"] = project
+        workflow.add_step(WorkflowStep("write tests", "make tests", delay_after=0.6))
+        workflow.add_step(WorkflowStep("run tests", "run tests", delay_after=0,
+                                       condition='probe("has_tests")'))
+
+        def write_later():
+            time.sleep(0.2)  # the AI is still working during the cooldown
+            os.makedirs(os.path.join(project, "test"), exist_ok=True)
+            with open(os.path.join(project, "test", "a_test.dart"), "w") as f:
+                f.write("test")
+
+        def send(prompt):
+            if prompt == "make tests":
+                threading.Thread(target=write_later).start()
+            return "ok"
+
+        engine = self._engine(send)
+        engine.fingerprint_method = "mtime"
+        engine.start(workflow)
+        engine.wait()
+        self.assertEqual([s.status for s in workflow.steps], ["completed", "completed"])
+        self.assertEqual(engine.last_run_summary["prefetch_stale"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite step queue and its leases.
+Run: python -m unittest test_workflow_queue   (from automation/)
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+from workflow_queue import QueueWorker, StepQueue, WorkerLost
+from workflow_timers import CancelToken, StepCancelled
+
+
+class StepQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_queue_")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+
+    def _queue(self, **kwargs):
+        kwargs.setdefault("poll_interval", 0.02)
+        return StepQueue(os.path.join(self.dir, "steps.db"), **kwargs)
+
+    def test_publish_claim_finish(self):
+        queue = self._queue()
+        task_id = queue.publish("run", "wf", "step", "do it")
+        task = queue.claim("w1")
+        self.assertEqual((task["id"], task["prompt"]), (task_id, "do it"))
+        self.assertIsNone(queue.claim("w2"))  # leased tasks are not handed out twice
+        self.assertTrue(queue.finish(task_id, "w1", "completed", "done"))
+        self.assertEqual(queue.wait_result(task_id), "done")
+
+    def test_most_urgent_task_first_and_targets_respected(self):
+        queue = self._queue()
+        queue.publish("run", "wf", "later", "p", priority=90)
+        queue.publish("run", "wf", "windsurf only", "p", target="windsurf", priority=0)
+        urgent = queue.publish("run", "wf", "urgent", "p", priority=10)
+        self.assertEqual(queue.claim("w1", ["antigravity"])["id"], urgent)
+        self.assertEqual(queue.claim("w2", ["windsurf"])["step"], "windsurf only")
+
+    def test_worker_failure_is_raised(self):
+        queue = self._queue()
+        task_id = queue.publish("run", "wf", "step", "p")
+        queue.claim("w1")
+        queue.finish(task_id, "w1", "failed", "editor crashed")
+        with self.assertRaisesRegex(RuntimeError, "editor crashed"):
+            queue.wait_result(task_id)
+
+    def test_expired_lease_is_requeued_then_fails(self):
+        queue = self._queue(lease_seconds=0.05, max_leases=2)
+        task_id = queue.publish("run", "wf", "step", "p")
+        self.assertIsNotNone(queue.claim("w1"))
+        time.sleep(0.1)
+        task = queue.claim("w2")  # w1 stopped heartbeating
+        self.assertEqual(task["id"], task_id)
+        self.assertFalse(queue.heartbeat(task_id, "w1"))
+        self.assertFalse(queue.finish(task_id, "w1", "completed", "late result"))
+        time.sleep(0.1)
+        with self.assertRaises(WorkerLost):
+            queue.wait_result(task_id)
+
+    def test_heartbeat_keeps_the_lease(self):
+        queue = self._queue(lease_seconds=0.1)
+        task_id = queue.publish("run", "wf", "step", "p")
+        queue.claim("w1")
+        for _ in range(4):
+            time.sleep(0.05)
+            self.assertTrue(queue.heartbeat(task_id, "w1"))
+        self.assertIsNone(queue.claim("w2"))
+
+    def test_cancelled_wait_cancels_the_task(self):
+        queue = self._queue()
+        task_id = queue.publish("run", "wf", "step", "p")
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel).start()
+        with self.assertRaises(StepCancelled):
+            queue.wait_result(task_id, token)
+        self.assertIsNone(queue.claim("w1"))
+        self.assertEqual(queue.stats()["tasks"], {"cancelled": 1})
+
+    def test_engine_runs_steps_through_worker(self):
+        queue = self._queue()
+        worker = QueueWorker(queue, lambda prompt, token: f"did {prompt}", idle_interval=0.02)
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 2)
+        self.addCleanup(worker.stop)
+
+        workflow = Workflow("queued")
+        workflow.add_step(WorkflowStep("a", "first", delay_after=0))
+        workflow.add_step(WorkflowStep("b", "second", delay_after=0))
+        engine = WorkflowEngine()
+        engine.step_queue = queue
+        engine.start(workflow)
+        engine.wait()
+        self.assertEqual([s.result for s in workflow.steps], ["did first", "did second"])
+        self.assertEqual(worker.stats["completed"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
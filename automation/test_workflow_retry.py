@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for step retries and the circuit breaker.
+Run: python -m unittest test_workflow_retry   (from automation/)
+"""
+
+import time
+import unittest
+
+from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+from workflow_retry import CircuitBreaker, RetryPolicy
+
+
+def _workflow(steps=3):
+    workflow = Workflow("retry test")
+    for n in range(steps):
+        workflow.add_step(WorkflowStep(f"s{n}", f"p{n}", delay_after=0))
+    return workflow
+
+
+class _FlakyEditor:
+    """Fails the first `failures` sends"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("editor not responding")
+        return "ok"
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_backoff_grows_and_is_capped(self):
+        policy = RetryPolicy(max_attempts=5, backoff=1, multiplier=2, max_backoff=3, jitter=0)
+        self.assertEqual([policy.delay(n) for n in range(1, 5)], [1, 2, 3, 3])
+
+    def test_round_trip(self):
+        policy = RetryPolicy(max_attempts=4, backoff=0.5)
+        self.assertEqual(RetryPolicy.from_dict(policy.to_dict()).to_dict(), policy.to_dict())
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(2)
+        self.assertFalse(breaker.record_failure())
+        breaker.record_success()
+        self.assertFalse(breaker.record_failure())
+        self.assertTrue(breaker.record_failure())
+        self.assertTrue(breaker.is_open)
+
+
+class EngineRetryTest(unittest.TestCase):
+
+    def _engine(self, editor, breaker_threshold=2):
+        engine = WorkflowEngine()
+        engine.send_prompt_fn = editor
+        engine.breaker_threshold = breaker_threshold
+        return engine
+
+    def test_step_succeeds_after_retries(self):
+        engine = self._engine(_FlakyEditor(failures=2), breaker_threshold=3)
+        engine.retry_policy = RetryPolicy(max_attempts=3, backoff=0, jitter=0)
+        workflow = _workflow(1)
+        engine.start(workflow)
+        engine.wait()
+        self.assertEqual((workflow.steps[0].status, workflow.steps[0].attempts), ("completed", 3))
+        self.assertEqual(engine.last_run_summary["retries"], 2)
+
+    def test_breaker_halts_the_run(self):
+        engine = self._engine(_FlakyEditor(failures=100))
+        workflow = _workflow(4)
+        engine.start(workflow)
+        engine.wait()
+        self.assertEqual([s.status for s in workflow.steps],
+                         ["failed", "failed", "skipped", "skipped"])
+        self.assertEqual(engine.last_run_summary["status"], "halted")
+        self.assertEqual(engine.last_run_summary["breaker_trips"], 1)
+
+    def test_breaker_suspends_until_resumed(self):
+        editor = _FlakyEditor(failures=2)
+        engine = self._engine(editor)
+        engine.breaker_action = "suspend"
+        workflow = _workflow(4)
+        engine.start(workflow)
+        self.addCleanup(engine.wait, 2)
+        self.addCleanup(engine.cancel)
+        time.sleep(0.2)
+        self.assertTrue(engine.is_paused)
+        self.assertEqual(editor.calls, 2)
+        engine.resume()
+        self.assertTrue(engine.wait(2))
+        self.assertEqual([s.status for s in workflow.steps],
+                         ["failed", "failed", "completed", "completed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for schedules and misfire handling.
+Run: python -m unittest test_workflow_scheduler   (from automation/)
+"""
+
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from workflow_engine import Workflow
+from workflow_scheduler import CronSchedule, IntervalSchedule, WorkflowScheduler
+
+
+def _next(expression, after):
+    return datetime.fromtimestamp(CronSchedule(expression).next_after(after.timestamp()))
+
+
+class ScheduleTest(unittest.TestCase):
+    START = datetime(2026, 1, 1, 0, 0)  # a Thursday
+
+    def test_interval_is_anchored_to_previous_due_time(self):
+        schedule = IntervalSchedule(10)
+        self.assertEqual(schedule.next_after(100.0), 110.0)
+        self.assertEqual(schedule.next_after(135.0, previous=110.0), 140.0)
+
+    def test_steps_and_ranges(self):
+        self.assertEqual(_next("*/30 9-18 * * 1-5", self.START), datetime(2026, 1, 1, 9, 0))
+        self.assertEqual(_next("*/30 9-18 * * 1-5", datetime(2026, 1, 1, 18, 30)),
+                         datetime(2026, 1, 2, 9, 0))
+
+    def test_starred_day_of_week_does_not_restrict(self):
+        self.assertEqual(_next("0 9 13 * */1", self.START), datetime(2026, 1, 13, 9, 0))
+
+    def test_full_range_day_of_month_does_not_restrict(self):
+        self.assertEqual(_next("0 9 1-31 * 5", self.START), datetime(2026, 1, 2, 9, 0))
+
+    def test_both_day_fields_restricted_match_either(self):
+        self.assertEqual(_next("0 9 13 * 5", self.START), datetime(2026, 1, 2, 9, 0))
+
+    def test_invalid_expressions(self):
+        for expression in ("* * * *", "60 * * * *", "* * 0 * *", "*/0 * * * *"):
+            with self.assertRaises(ValueError):
+                CronSchedule(expression)
+
+
+class _Events:
+    def close(self):
+        pass
+
+
+class _FakeEngine:
+    """Stands in for WorkflowEngine; the 'slow' workflow blocks its first run"""
+
+    def __init__(self, started, release):
+        self.events = _Events()
+        self.last_run_summary = {}
+        self._started = started
+        self._release = release
+
+    def start(self, workflow):
+        self._started.append((workflow.name, time.time()))
+        self._workflow = workflow
+
+    def wait(self):
+        if self._workflow.name == "slow" and not self._release.is_set():
+            self._release.wait(5)
+        self.last_run_summary = {"status": "completed", "steps": {}}
+
+
+class MisfireTest(unittest.TestCase):
+
+    def _run(self, misfire):
+        """One worker: 'slow' holds it while 'quick' fires and waits past the grace period"""
+        started, release = [], threading.Event()
+        scheduler = WorkflowScheduler(lambda: _FakeEngine(started, release),
+                                      max_concurrent=1, misfire_grace=0.2)
+        scheduler.add("slow", Workflow("slow"), interval=0.05)
+        scheduler.add("quick", Workflow("quick"), interval=0.05, misfire=misfire)
+        scheduler.start()
+        try:
+            time.sleep(0.6)
+            released_at = time.time()
+            release.set()
+            time.sleep(0.05)
+        finally:
+            scheduler.stop()
+        quick_after = [t for name, t in started if name == "quick" and t >= released_at]
+        return scheduler.stats, quick_after
+
+    def test_skip_drops_firing_that_waited_for_a_worker(self):
+        stats, _ = self._run("skip")
+        self.assertGreaterEqual(stats["missed_skipped"], 1)
+        self.assertEqual(stats["caught_up"], 0)
+
+    def test_catch_up_runs_firing_that_waited_for_a_worker(self):
+        stats, quick_after = self._run("catch_up")
+        self.assertGreaterEqual(stats["caught_up"], 1)
+        self.assertEqual(stats["missed_skipped"], 0)
+        self.assertTrue(quick_after)
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            WorkflowScheduler().add("x", Workflow("x"), interval=1, misfire="sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
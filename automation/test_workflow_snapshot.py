@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for suspended-run snapshots and their claims.
+Run: python -m unittest test_workflow_snapshot   (from automation/)
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from workflow_snapshot import RunSnapshot, SnapshotStore
+
+_CLAIM_AND_CRASH = """
+import os, sys
+from workflow_snapshot import SnapshotStore
+SnapshotStore(sys.argv[1]).claim(sys.argv[2])
+os._exit(1)
+"""
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_snapshots_")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.store = SnapshotStore(self.dir)
+        self.snapshot = RunSnapshot("run1", {"name": "Fix: login?", "steps": []}, [])
+        self.store.save(self.snapshot)
+
+    def test_saved_snapshot_is_listed_and_found(self):
+        self.assertEqual([s.run_id for s in self.store.list()], ["run1"])
+        self.assertEqual(self.store.find("Fix: login?").run_id, "run1")
+
+    def test_claim_is_exclusive(self):
+        claimed = self.store.claim("run1")
+        self.assertEqual(self.store.list(), [])  # this process is alive: not recovered
+        with self.assertRaises(FileNotFoundError):
+            self.store.claim("run1")
+        SnapshotStore.unclaim(claimed)
+        self.assertEqual([s.run_id for s in self.store.list()], ["run1"])
+
+    def test_release_deletes_the_claim(self):
+        SnapshotStore.release(self.store.claim("run1"))
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_claim_of_crashed_process_is_recovered(self):
+        crashed = subprocess.run([sys.executable, "-c", _CLAIM_AND_CRASH, self.dir, "run1"],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(crashed.returncode, 1)
+        self.assertTrue(os.listdir(self.dir)[0].endswith(".claimed"))
+        self.assertEqual([s.run_id for s in self.store.list()], ["run1"])
+        self.assertEqual(self.store.claim("run1").run_id, "run1")
+
+
+if __name__ == "__main__":
+    unittest.main()
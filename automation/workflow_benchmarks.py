@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Workflow Engine Benchmarks
+Micro-benchmarks for the engine's hot paths. Run one suite at a time:
+
+    python workflow_benchmarks.py timers --workflows 24 --seconds 5
+    python workflow_benchmarks.py templates
+    python workflow_benchmarks.py library --count 1000
+    python workflow_benchmarks.py events --updates 10000 --handler-ms 20
+    python workflow_benchmarks.py scheduler --schedules 5000 --seconds 5
+    python workflow_benchmarks.py handoff --steps 10 --probe-ms 200
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from workflow_templates import PromptTemplate
+from workflow_timers import RunClock
+
+
+# ═══════════════════════════════════════════════════
+# TIMERS — wakeups per minute & cancel latency
+# ═══════════════════════════════════════════════════
+class _LegacyWaiter:
+    """Reproduces the pre-RunClock sleep-polling countdown loop"""
+
+    def __init__(self):
+        self.cancel_requested = False
+        self.wakeups = 0
+
+    def countdown(self, duration: float, on_tick):
+        countdown = duration
+        while countdown > 0:
+            if self.cancel_requested:
+                break
+            on_tick(countdown)
+            sleep_time = min(1.0, countdown)
+            time.sleep(sleep_time)
+            self.wakeups += 1
+            countdown -= sleep_time
+
+    def cancel(self):
+        self.cancel_requested = True
+
+
+class _ClockWaiter:
+    """Countdown driven by RunClock, as used by WorkflowEngine"""
+
+    def __init__(self, tick_interval: float):
+        self.cancel_requested = False
+        self.clock = RunClock()
+        self.tick_interval = tick_interval
+
+    @property
+    def wakeups(self) -> int:
+        return self.clock.wakeups
+
+    def countdown(self, duration: float, on_tick):
+        self.clock.countdown(
+            duration,
+            interrupted=lambda: self.cancel_requested,
+            on_tick=on_tick,
+            tick_interval=self.tick_interval,
+        )
+
+    def cancel(self):
+        self.cancel_requested = True
+        self.clock.notify()
+
+
+def _run_waiters(waiters, seconds: float) -> Dict[str, float]:
+    ticks = [0]
+    tick_lock = threading.Lock()
+
+    def on_tick(_remaining):
+        with tick_lock:
+            ticks[0] += 1
+
+    cancel_seen: List[float] = []
+    threads = []
+    for w in waiters:
+        def run(w=w):
+            w.countdown(3600.0, on_tick)
+            cancel_seen.append(time.perf_counter())
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        threads.append(t)
+
+    time.sleep(seconds)
+    cancelled_at = time.perf_counter()
+    for w in waiters:
+        w.cancel()
+    for t in threads:
+        t.join(timeout=5)
+
+    latencies = [max(0.0, seen - cancelled_at) * 1000 for seen in cancel_seen]
+    minutes = seconds / 60.0
+    return {
+        "wakeups_per_min": sum(w.wakeups for w in waiters) / minutes,
+        "callbacks_per_min": ticks[0] / minutes,
+        "cancel_ms_p50": statistics.median(latencies) if latencies else float("nan"),
+        "cancel_ms_max": max(latencies) if latencies else float("nan"),
+    }
+
+
+def bench_timers(workflows: int, seconds: float, tick_interval: float):
+    print(f"⏱  Timers: {workflows} looping workflows, {seconds}s each run")
+    legacy = _run_waiters([_LegacyWaiter() for _ in range(workflows)], seconds)
+    clock = _run_waiters([_ClockWaiter(tick_interval) for _ in range(workflows)], seconds)
+    silent = _run_waiters([_ClockWaiter(0) for _ in range(workflows)], seconds)
+
+    rows = [
+        ("legacy sleep-poll (1s)", legacy),
+        (f"RunClock (tick {tick_interval}s)", clock),
+        ("RunClock (no ticks)", silent),
+    ]
+    print(f"   {'variant':<26}{'wakeups/min':>14}{'callbacks/min':>16}"
+          f"{'cancel p50 ms':>16}{'cancel max ms':>16}")
+    for label, r in rows:
+        print(f"   {label:<26}{r['wakeups_per_min']:>14.0f}{r['callbacks_per_min']:>16.0f}"
+              f"{r['cancel_ms_p50']:>16.2f}{r['cancel_ms_max']:>16.2f}")
+
+
+# ═══════════════════════════════════════════════════
+# TEMPLATES — legacy str.replace loop vs compiled render
+# ═══════════════════════════════════════════════════
+def _legacy_resolve(prompt: str, variables: Dict[str, str]) -> str:
+    for key, value in variables.items():
+        prompt = prompt.replace(f"{{{key}}}", value)
+    return prompt
+
+
+def _time_per_call(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def bench_templates(repeat: int):
+    cases = []
+
+    # 10k variables, ordinary prompt using a handful of them
+    many_vars = {f"var_{n}": f"value {n}" for n in range(10_000)}
+    prompt = "Analyze {project_path} and build {var_1} / {var_500} / {var_9999}. " * 4
+    cases.append(("10k variables, 300 B prompt", prompt, {**many_vars, "project_path": "C:/proj"}))
+
+    # 100 KB prompt (large preamble) with a few variables
+    preamble = ("You are acting as an Enterprise Software Architect. "
+                "Enforce scalability, security and maintainability. ") * 1000
+    big_prompt = preamble[:100_000] + "\nAnalyze {project_path} for '{feature_name}'."
+    few_vars = {"project_path": "C:/proj", "feature_name": "Chat", "file_path": "lib/main.dart",
+                "bug_description": "crash on start"}
+    cases.append(("100 KB prompt, 4 variables", big_prompt, few_vars))
+
+    # Both at once
+    cases.append(("100 KB prompt, 10k variables", big_prompt, {**many_vars, **few_vars}))
+
+    print(f"🧩 Templates ({repeat} renders each, ms per resolve)")
+    print(f"   {'case':<30}{'str.replace':>14}{'compile':>12}{'render':>12}{'speedup':>10}")
+    for label, source, variables in cases:
+        legacy_ms = _time_per_call(lambda: _legacy_resolve(source, variables), repeat)
+        compile_ms = _time_per_call(lambda: PromptTemplate(source), repeat)
+        template = PromptTemplate(source)
+        assert template.render(variables) == _legacy_resolve(source, variables)
+        render_ms = _time_per_call(lambda: template.render(variables), repeat)
+        print(f"   {label:<30}{legacy_ms:>14.3f}{compile_ms:>12.3f}{render_ms:>12.4f}"
+              f"{legacy_ms / max(render_ms, 1e-9):>9.0f}x")
+
+
+# ═══════════════════════════════════════════════════
+# LIBRARY — startup time with many saved workflows
+# ═══════════════════════════════════════════════════
+def bench_library(count: int):
+    from workflow_engine import WorkflowEngine
+    from workflow_library import WorkflowLibrary
+
+    engine = WorkflowEngine()
+    template = engine.builtin_workflows["Enterprise Solution Architect"].to_dict()
+    save_dir = tempfile.mkdtemp(prefix="wf_library_")
+    try:
+        for n in range(count):
+            data = dict(template, name=f"Workflow {n:04d}")
+            with open(os.path.join(save_dir, f"workflow_{n:04d}.json"), "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+
+        def timed(fn):
+            started = time.perf_counter()
+            result = fn()
+            return (time.perf_counter() - started) * 1000, result
+
+        legacy_ms, loaded = timed(lambda: engine.load_all_saved(save_dir))
+        cold_ms, entries = timed(lambda: WorkflowLibrary(save_dir).refresh())
+        warm_ms, _ = timed(lambda: WorkflowLibrary(save_dir).refresh())
+
+        # Touch 1% of the files, then refresh incrementally
+        for n in range(0, count, 100):
+            path = os.path.join(save_dir, f"workflow_{n:04d}.json")
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        library = WorkflowLibrary(save_dir)
+        incremental_ms, _ = timed(library.refresh)
+        select_ms, _ = timed(lambda: library.get("Workflow 0500"))
+
+        print(f"📚 Library: {count} saved workflows ({len(loaded)} loaded, {len(entries)} indexed)")
+        print(f"   load_all_saved (parse everything)   {legacy_ms:>9.1f} ms")
+        print(f"   WorkflowLibrary cold (build index)  {cold_ms:>9.1f} ms")
+        print(f"   WorkflowLibrary warm (stat only)    {warm_ms:>9.1f} ms")
+        print(f"   WorkflowLibrary 1% files changed    {incremental_ms:>9.1f} ms")
+        print(f"   select one workflow (lazy parse)    {select_ms:>9.2f} ms")
+    finally:
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+
+# ═══════════════════════════════════════════════════
+# EVENTS — publisher cost with a slow subscriber
+# ═══════════════════════════════════════════════════
+def bench_events(updates: int, handler_ms: float):
+    from workflow_events import EventBus
+
+    def slow_handler(*_args):
+        time.sleep(handler_ms / 1000)
+
+    # Inline delivery: what the engine did before the bus
+    inline_updates = min(updates, 50)
+    started = time.perf_counter()
+    for n in range(inline_updates):
+        slow_handler(n, updates, n / updates * 100)
+    inline_ms = (time.perf_counter() - started) * 1000 / inline_updates
+
+    bus = EventBus()
+    bus.subscribe("progress", slow_handler)
+    bus.subscribe("step_complete", slow_handler)
+    started = time.perf_counter()
+    for n in range(updates):
+        bus.publish("progress", n, updates, n / updates * 100)
+        if n % 1000 == 0:
+            bus.publish("step_complete", n, None, "")
+    publish_us = (time.perf_counter() - started) * 1e6 / updates
+    drained = bus.flush(timeout=60)
+    stats = bus.stats()
+
+    print(f"📨 Events: {updates} progress updates, subscriber takes {handler_ms:.0f} ms")
+    print(f"   inline callback cost per update     {inline_ms:>9.2f} ms")
+    print(f"   EventBus publish cost per update    {publish_us:>9.2f} µs")
+    print(f"   delivered / coalesced / dropped     "
+          f"{stats['delivered']} / {stats['coalesced']} / {stats['dropped']}"
+          f"{'' if drained else ' (not drained)'}")
+
+
+# ═══════════════════════════════════════════════════
+# SCHEDULER — idle cost of many registered schedules
+# ═══════════════════════════════════════════════════
+def bench_scheduler(schedules: int, seconds: float):
+    from workflow_engine import Workflow, WorkflowStep
+    from workflow_scheduler import WorkflowScheduler
+
+    workflow = Workflow("bench", steps=[WorkflowStep("noop", "noop", delay_after=0)])
+    scheduler = WorkflowScheduler(max_concurrent=4)
+    started = time.perf_counter()
+    for n in range(schedules):
+        if n % 2:
+            scheduler.add(f"interval-{n}", workflow, interval=3600 + n, jitter=30)
+        else:
+            scheduler.add(f"cron-{n}", workflow, cron=f"{n % 60} {n % 24} * * *")
+    register_ms = (time.perf_counter() - started) * 1000
+
+    threads_before = threading.active_count()
+    scheduler.start()
+    cpu_started = time.process_time()
+    time.sleep(seconds)
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+    threads = threading.active_count() - threads_before
+    scheduler.stop()
+
+    print(f"⏰ Scheduler: {schedules} schedules idle for {seconds:.0f}s")
+    print(f"   register all schedules              {register_ms:>9.1f} ms")
+    print(f"   timer wakeups while idle            {scheduler.stats['wakeups']:>9}")
+    print(f"   CPU time while idle                 {cpu_ms:>9.1f} ms")
+    print(f"   threads held (vs {schedules} looping engines) {threads:>5}")
+
+
+# ═══════════════════════════════════════════════════
+# HANDOFF — step-to-step latency with and without prefetch
+# ═══════════════════════════════════════════════════
+def bench_handoff(steps: int, wait_ms: float, probe_ms: float):
+    import workflow_conditions
+    from editor_bridge import EditorBridge
+    from workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+
+    # A guard probe as slow as a `git status` on a large checkout
+    workflow_conditions.PROBES["bench_slow"] = lambda _path: time.sleep(probe_ms / 1000) or True
+
+    print(f"🔁 Handoff: {steps} file_drop steps, AI wait {wait_ms:.0f} ms, "
+          f"guard probe {probe_ms:.0f} ms")
+    for speculate in (False, True):
+        project = tempfile.mkdtemp(prefix="bench_handoff_")
+        os.makedirs(os.path.join(project, "lib"))  # something to fingerprint
+        try:
+            bridge = EditorBridge(project_path=project, editor="windsurf")
+            bridge.mode = "file_drop"
+
+            def send(prompt: str) -> str:
+                result = bridge.send_prompt(prompt)
+                time.sleep(wait_ms / 1000)  # the AI working
+                return result
+
+            engine = WorkflowEngine()
+            engine.speculate = speculate
+            engine.send_prompt_fn = send
+            engine.prepare_prompt_fn = bridge.prepare
+            workflow = Workflow("bench")
+            workflow.variables = {"feature": "search", "project_path": project}
+            for n in range(steps):
+                workflow.add_step(WorkflowStep(f"step {n}", f"Step {n} of {{feature}}: " + "x" * 2000,
+                                               delay_after=0.05, condition='probe("bench_slow")'))
+            engine.start(workflow)
+            engine.wait()
+            summary = engine.last_run_summary
+            label = "with prefetch   " if speculate else "without prefetch"
+            print(f"   {label} handoff avg / max  "
+                  f"{summary.get('handoff_avg_s', 0) * 1000:>7.1f} / "
+                  f"{summary.get('handoff_max_s', 0) * 1000:.1f} ms"
+                  f"  (prefetch hits {summary['prefetch_hits']})")
+        finally:
+            shutil.rmtree(project, ignore_errors=True)
+    workflow_conditions.PROBES.pop("bench_slow", None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workflow Engine benchmarks")
+    sub = parser.add_subparsers(dest="suite", required=True)
+
+    p_timers = sub.add_parser("timers", help="Countdown wakeups and cancel latency")
+    p_timers.add_argument("--workflows", type=int, default=24)
+    p_timers.add_argument("--seconds", type=float, default=5.0)
+    p_timers.add_argument("--tick", type=float, default=5.0,
+                          help="countdown callback interval for the RunClock variant")
+
+    p_templates = sub.add_parser("templates", help="Prompt variable substitution")
+    p_templates.add_argument("--repeat", type=int, default=20)
+
+    p_library = sub.add_parser("library", help="Startup time for a large workflow directory")
+    p_library.add_argument("--count", type=int, default=1000)
+
+    p_events = sub.add_parser("events", help="Callback dispatch with a slow subscriber")
+    p_events.add_argument("--updates", type=int, default=10000)
+    p_events.add_argument("--handler-ms", type=float, default=20.0)
+
+    p_scheduler = sub.add_parser("scheduler", help="Idle cost of thousands of schedules")
+    p_scheduler.add_argument("--schedules", type=int, default=5000)
+    p_scheduler.add_argument("--seconds", type=float, default=5.0)
+
+    p_handoff = sub.add_parser("handoff", help="Step-to-step latency with speculative prefetch")
+    p_handoff.add_argument("--steps", type=int, default=10)
+    p_handoff.add_argument("--wait-ms", type=float, default=300.0)
+    p_handoff.add_argument("--probe-ms", type=float, default=200.0)
+
+    args = parser.parse_args()
+    if args.suite == "timers":
+        bench_timers(args.workflows, args.seconds, args.tick)
+    elif args.suite == "templates":
+        bench_templates(args.repeat)
+    elif args.suite == "library":
+        bench_library(args.count)
+    elif args.suite == "events":
+        bench_events(args.updates, args.handler_ms)
+    elif args.suite == "scheduler":
+        bench_scheduler(args.schedules, args.seconds)
+    elif args.suite == "handoff":
+        bench_handoff(args.steps, args.wait_ms, args.probe_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Step Result Cache — on-disk memoization of workflow step results.
+Keyed by the resolved prompt, the editor/mode scope and the project tree
+state, with size-bounded LRU eviction.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StepResultCache:
+    """Directory of cached results plus an index.json with size / last use"""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: Dict[str, dict] = self._load_index()
+
+    @staticmethod
+    def make_key(prompt: str, scope: str, tree_state: Optional[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (prompt, scope, tree_state or ""):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["size"] for entry in self._index.values())
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                try:
+                    data = json.loads((self.directory / f"{key}.json").read_text(encoding="utf-8"))
+                    entry["last_used"] = time.time()
+                    self._save_index()
+                    self.hits += 1
+                    return data["result"]
+                except (OSError, ValueError, KeyError):
+                    self._index.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: str):
+        payload = json.dumps({"result": result, "stored_at": time.time()}, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # never worth evicting everything for one entry
+        with self._lock:
+            self._atomic_write(self.directory / f"{key}.json", payload)
+            self._index[key] = {"size": size, "last_used": time.time()}
+            self._evict()
+            self._save_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+    def _evict(self):
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self._index.pop(key, None)
+        try:
+            (self.directory / f"{key}.json").unlink()
+        except OSError:
+            pass
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            return json.loads((self.directory / self.INDEX_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        self._atomic_write(self.directory / self.INDEX_FILE, json.dumps(self._index))
+
+    @staticmethod
+    def _atomic_write(path: Path, text: str):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Workflow CLI — run workflows headless (cron, CI agents) without the Tk GUI.
+
+    python -m workflow_engine run workflows/workflow_release.json --var feature_name=Search
+    python -m workflow_engine run "Full Feature Dev" --editor windsurf --mode file_drop
+    python -m workflow_engine run "Analyze, Fix & Sync" "Bug Fix & Test" --var bug_description=...
+    python -m workflow_engine schedule schedules.json --mode file_drop
+    python -m workflow_engine list
+    python -m workflow_engine worker --queue steps.db --editor windsurf --mode auto_interact
+    python -m workflow_engine history slowest --days 7
+    python -m workflow_engine resume 20250212-101500-123456 --mode file_drop
+
+Progress is written to stdout as JSON lines, one event per line. Exit codes:
+0 all steps completed, 1 a step failed or the run errored, 2 bad arguments
+or workflow file, 130 interrupted (Ctrl+C / SIGINT). With --snapshot-dir,
+the first Ctrl+C saves the run to disk after the current step instead of
+cancelling it; `resume` continues it later, here or on another machine.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from project_lock import ProjectLockService, shared_lock_service
+from workflow_dispatcher import shared_dispatcher
+from workflow_engine import Workflow, WorkflowEngine
+from workflow_history import RunHistory, main as history_main
+from workflow_ledger import StepLedger
+from workflow_queue import QueueWorker, StepQueue
+from workflow_snapshot import SnapshotStore
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+MODES = ("clipboard", "file_drop", "terminal", "auto_interact", "dry_run")
+
+
+class JsonLinesReporter:
+    """Subscribes to the engine's event bus and prints one JSON object per event"""
+
+    def __init__(self, stream=None, include_output: bool = True):
+        self.stream = stream or sys.stdout
+        self.include_output = include_output
+        self._lock = threading.Lock()
+
+    def attach(self, engine: WorkflowEngine):
+        subscribe = engine.events.subscribe
+        subscribe("step_start", lambda i, step: self.emit("step_start", index=i, step=step.name))
+        subscribe("step_complete", lambda i, step, result: self.emit(
+            "step_complete", index=i, step=step.name, result=result[:500],
+            result_path=step.result_path))
+        subscribe("error", lambda i, step, error: self.emit(
+            "step_failed", index=i, step=step.name, error=error))
+        subscribe("progress", lambda current, total, pct: self.emit(
+            "progress", current=current, total=total, percent=round(pct, 1)))
+        subscribe("loop_wait", lambda remaining: self.emit("loop_wait", remaining=round(remaining, 1)))
+        subscribe("workflow_done", lambda workflow, status: self.emit(
+            "workflow_status", workflow=workflow.name, status=status))
+        if self.include_output:
+            subscribe("step_output", lambda i, step, chunk: self.emit(
+                "step_output", index=i, step=step.name, chunk=chunk))
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"event": event, "ts": round(time.time(), 3), **fields},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+# ═══════════════════════════════════════════════════
+# ARGUMENTS
+# ═══════════════════════════════════════════════════
+def parse_vars(pairs: List[str]) -> Dict[str, str]:
+    variables = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"--var expects key=value, got '{pair}'")
+        variables[key.strip()] = value
+    return variables
+
+
+def load_workflow(source: str, engine: WorkflowEngine) -> Workflow:
+    """A path to a workflow JSON file, or the name of a built-in workflow"""
+    if os.path.isfile(source):
+        return engine.load_workflow(source)
+    workflow = engine.builtin_workflow(source)
+    if workflow is not None:
+        return workflow
+    raise ValueError(f"No workflow file or built-in workflow named '{source}'")
+
+
+def connect_bridge(engine: WorkflowEngine, editor: str, mode: str, project: str):
+    """Point the engine's send functions at an EditorBridge (None for dry runs)"""
+    if mode == "dry_run":
+        return None
+    from editor_bridge import EditorBridge
+    bridge = EditorBridge(project_path=project, editor=editor)
+    bridge.mode = mode
+    if mode == "auto_interact":
+        engine.send_and_wait_fn = bridge.stream_and_wait
+    else:
+        engine.send_prompt_fn = bridge.send_prompt
+    engine.prepare_prompt_fn = bridge.prepare
+    engine.dispatcher = shared_dispatcher()
+    engine.dispatch_target = editor
+    return bridge
+
+
+def _engine_options() -> argparse.ArgumentParser:
+    """Options shared by 'run' and 'resume'"""
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--editor", default="antigravity",
+                         help="antigravity | windsurf | cursor | clipboard")
+    options.add_argument("--mode", default="clipboard", choices=MODES)
+    options.add_argument("--project", default=None,
+                         help="project directory (default: project_path variable or cwd)")
+    options.add_argument("--journal-dir", default=None)
+    options.add_argument("--trace-dir", default=None)
+    options.add_argument("--metrics", default=None, help="Prometheus text file to write")
+    options.add_argument("--history", default=None, metavar="DB",
+                         help="SQLite run history database to record into")
+    options.add_argument("--queue", default=None, metavar="DB",
+                         help="publish steps to this work queue for 'worker' processes")
+    options.add_argument("--queue-editor", default=None,
+                         help="only workers owning this editor may take the steps")
+    options.add_argument("--no-output", action="store_true",
+                         help="do not stream step output chunks")
+    options.add_argument("--no-project-lock", action="store_true",
+                         help="do not wait for other runs editing the same project")
+    return options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m workflow_engine",
+                                     description="Run auto-prompt workflows without the GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", parents=[_engine_options()],
+                           help="Run a workflow and stream progress as JSON lines")
+    p_run.add_argument("workflow", nargs="+",
+                       help="workflow JSON file or built-in workflow name; several run "
+                            "back to back, sharing identical leading steps")
+    p_run.add_argument("--var", action="append", default=[], metavar="KEY=VALUE",
+                       help="set a workflow variable (repeatable)")
+    p_run.add_argument("--priority", type=int, default=None,
+                       help="editor queue priority, 0 (urgent) to 90 (low); default 50")
+    p_run.add_argument("--loop", action="store_true", help="repeat until interrupted")
+    p_run.add_argument("--interval", type=float, default=120.0,
+                       help="seconds between loop iterations")
+    p_run.add_argument("--resume", action="store_true",
+                       help="resume the last interrupted run (needs --journal-dir)")
+    p_run.add_argument("--incremental", default=None, metavar="DIR",
+                       help="step ledger directory: steps unchanged since their last run "
+                            "(definition, inputs, upstream) reuse that run's result")
+    p_run.add_argument("--snapshot-dir", default=None, metavar="DIR",
+                       help="on Ctrl+C, save the run here after the current step "
+                            "(continue it with 'resume')")
+
+    p_resume = sub.add_parser("resume", parents=[_engine_options()],
+                              help="Continue a run saved to disk (or list saved runs)")
+    p_resume.add_argument("snapshot", nargs="?",
+                          help="run id or snapshot file; omit to list saved runs")
+    p_resume.add_argument("--snapshot-dir", default=os.path.join("workflows", "suspended"),
+                          metavar="DIR", help="where saved runs are kept (default: %(default)s)")
+
+    p_schedule = sub.add_parser("schedule", help="Run workflows on interval/cron schedules")
+    p_schedule.add_argument("config", help="JSON file with a 'jobs' list")
+    p_schedule.add_argument("--editor", default="antigravity")
+    p_schedule.add_argument("--mode", default="clipboard", choices=MODES)
+    p_schedule.add_argument("--max-concurrent", type=int, default=None,
+                            help="override the config's max_concurrent")
+    p_schedule.add_argument("--history", default=None, metavar="DB",
+                            help="SQLite run history database to record into")
+    p_schedule.add_argument("--no-project-lock", action="store_true",
+                            help="do not wait for other runs editing the same project")
+
+    sub.add_parser("list", help="List built-in workflows")
+
+    p_worker = sub.add_parser("worker", help="Run queued steps with this machine's editor")
+    p_worker.add_argument("--queue", required=True, metavar="DB", help="work queue database")
+    p_worker.add_argument("--editor", default="antigravity")
+    p_worker.add_argument("--mode", default="auto_interact", choices=MODES)
+    p_worker.add_argument("--project", default=None, help="project directory (default: cwd)")
+    p_worker.add_argument("--worker-id", default=None, help="default: hostname:pid")
+    p_worker.add_argument("--lease", type=float, default=60.0,
+                          help="seconds a claimed step stays leased without a heartbeat")
+    p_worker.add_argument("--max-tasks", type=int, default=None,
+                          help="exit after this many steps")
+
+    p_history = sub.add_parser("history", add_help=False,
+                               help="Query run history (slowest | failures | runs | steps)")
+    p_history.add_argument("args", nargs=argparse.REMAINDER)
+    return parser
+
+
+def project_locks(args: argparse.Namespace) -> Optional[ProjectLockService]:
+    """The process-wide project lock service, unless disabled or a dry run"""
+    if args.no_project_lock or args.mode == "dry_run":
+        return None
+    return shared_lock_service()
+
+
+# ═══════════════════════════════════════════════════
+# COMMANDS
+# ═══════════════════════════════════════════════════
+def cmd_list(engine: WorkflowEngine) -> int:
+    for name, wf in engine.builtin_workflows.items():
+        print(json.dumps({"name": name, "steps": len(wf.steps), "description": wf.description},
+                         ensure_ascii=False))
+    return EXIT_OK
+
+
+def cmd_run(args: argparse.Namespace, engine: WorkflowEngine) -> int:
+    reporter = JsonLinesReporter(include_output=not args.no_output)
+    try:
+        variables = parse_vars(args.var)
+        workflows = [load_workflow(source, engine) for source in args.workflow]
+        if len(workflows) == 1:
+            workflow = workflows[0]
+            workflow.variables.update(variables)
+        else:
+            for wf in workflows:
+                engine.workflow_registry[wf.name] = wf
+            workflow = Workflow.compose(" + ".join(wf.name for wf in workflows),
+                                        workflows, variables)
+    except (OSError, ValueError, KeyError) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    project = args.project or workflow.variables.get("project_path") or os.getcwd()
+    workflow.variables.setdefault("project_path", project)
+    if args.priority is not None:
+        workflow.priority = args.priority
+    engine.loop_mode = args.loop
+    engine.loop_interval = max(0.1, args.interval)
+    if args.incremental:
+        engine.step_ledger = StepLedger(args.incremental)
+        engine.incremental = True
+    return drive_run(args, engine, reporter, project, workflow.name, len(workflow.steps),
+                     lambda: engine.start(workflow, resume=args.resume))
+
+
+def cmd_resume(args: argparse.Namespace, engine: WorkflowEngine) -> int:
+    reporter = JsonLinesReporter(include_output=not args.no_output)
+    store = SnapshotStore(args.snapshot_dir)
+    if not args.snapshot:
+        for snapshot in store.list():
+            reporter.emit("saved_run", run_id=snapshot.run_id, workflow=snapshot.workflow_name,
+                          step=snapshot.current_step, steps=len(snapshot.steps),
+                          iteration=snapshot.iteration, saved_at=snapshot.suspended_at,
+                          path=str(snapshot.path))
+        return EXIT_OK
+    try:
+        snapshot = store.claim(args.snapshot)
+    except (OSError, ValueError, KeyError) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    project = (args.project or snapshot.workflow.get("variables", {}).get("project_path")
+               or os.getcwd())
+    return drive_run(args, engine, reporter, project, snapshot.workflow_name,
+                     len(snapshot.steps), lambda: engine.restore(snapshot))
+
+
+def drive_run(args: argparse.Namespace, engine: WorkflowEngine, reporter: JsonLinesReporter,
+              project: str, name: str, steps: int, start) -> int:
+    """Configure the engine from the shared options, start the run and
+    report it until it ends"""
+    bridge = None if args.queue else connect_bridge(engine, args.editor, args.mode, project)
+    engine.journal_dir = args.journal_dir
+    engine.trace_dir = args.trace_dir
+    engine.metrics_path = args.metrics
+    if args.queue:
+        engine.step_queue = StepQueue(args.queue)
+        engine.queue_target = args.queue_editor
+    history = RunHistory(args.history) if args.history else None
+    engine.history = history
+    reporter.attach(engine)
+    run_errors: List[str] = []
+    engine.events.subscribe("workflow_done", lambda workflow, status: (
+        run_errors.append(status) if status.startswith("error") else None))
+
+    engine.snapshot_dir = args.snapshot_dir
+    engine.project_locks = project_locks(args)
+    reporter.emit("run_start", workflow=name, steps=steps, editor=args.editor, mode=args.mode)
+    try:
+        start()
+    except (OSError, RuntimeError, ValueError, KeyError) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    interrupted = False
+    try:
+        engine.wait()
+    except KeyboardInterrupt:
+        interrupted = True
+        saving = bool(engine.snapshot_dir)
+        if saving:
+            engine.suspend_to_disk()
+            reporter.emit("suspending", workflow=name, step=engine.current_step_index)
+            try:
+                engine.wait()
+            except KeyboardInterrupt:
+                saving = False  # a second Ctrl+C cancels the current step
+        if not saving:
+            engine.cancel()
+            if bridge:
+                bridge.cancel_wait()
+            engine.wait()
+
+    engine.events.flush(timeout=5.0)
+    if history:
+        history.close()
+    summary = engine.last_run_summary
+    reporter.emit("summary", **summary)
+
+    if interrupted:
+        return EXIT_INTERRUPTED
+    if run_errors or summary.get("status") != "completed" or summary.get("steps", {}).get("failed"):
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def cmd_schedule(args: argparse.Namespace, engine: WorkflowEngine) -> int:
+    """Config format:
+    {"max_concurrent": 2, "jobs": [{"name": "nightly", "workflow": "Full Feature Dev",
+      "cron": "0 2 * * *", "jitter": 60, "misfire": "catch_up", "priority": 90,
+      "vars": {...}}, ...]}"""
+    from workflow_scheduler import WorkflowScheduler
+
+    reporter = JsonLinesReporter()
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        max_concurrent = args.max_concurrent or config.get("max_concurrent", 4)
+        history = RunHistory(args.history) if args.history else None
+
+        def make_engine() -> WorkflowEngine:
+            scheduled = WorkflowEngine()
+            scheduled.history = history  # one writer thread shared by all runs
+            connect_bridge(scheduled, args.editor, args.mode, os.getcwd())
+            scheduled.project_locks = project_locks(args)
+            return scheduled
+
+        scheduler = WorkflowScheduler(make_engine, max_concurrent=max_concurrent)
+        for spec in config.get("jobs", []):
+            workflow = load_workflow(spec["workflow"], engine)
+            scheduler.add(spec.get("name", workflow.name), workflow,
+                          interval=spec.get("interval"), cron=spec.get("cron"),
+                          jitter=spec.get("jitter", 0.0), misfire=spec.get("misfire", "skip"),
+                          variables=spec.get("vars"), priority=spec.get("priority"))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    scheduler.on_job_done = lambda job, status: reporter.emit(
+        "job_done", job=job.name, status=status, next_run=job.next_run)
+    for job in scheduler.jobs():
+        reporter.emit("scheduled", job=job.name, schedule=repr(job.schedule), next_run=job.next_run)
+
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop(wait=False)
+    if history:
+        history.close()
+    reporter.emit("summary", **scheduler.stats, editors=shared_dispatcher().stats())
+    return EXIT_INTERRUPTED
+
+
+def cmd_worker(args: argparse.Namespace) -> int:
+    reporter = JsonLinesReporter()
+    queue = StepQueue(args.queue, lease_seconds=args.lease)
+    if args.mode == "dry_run":
+        send_fn = lambda prompt, token: f"[Dry Run] Prompt queued: {prompt[:80]}..."
+    else:
+        from editor_bridge import EditorBridge
+        bridge = EditorBridge(project_path=args.project or os.getcwd(), editor=args.editor)
+        bridge.mode = args.mode
+        send = bridge.stream_and_wait if args.mode == "auto_interact" else bridge.send_prompt
+        send_fn = lambda prompt, token: send(prompt, token=token)
+
+    worker = QueueWorker(queue, send_fn, args.worker_id, targets=[args.editor])
+    worker.on_task = lambda task, status, result: reporter.emit(
+        "task_done", task=task["id"], workflow=task["workflow"], step=task["step"],
+        status=status, result=result[:500])
+    reporter.emit("worker_start", worker=worker.worker_id, editor=args.editor, mode=args.mode)
+    try:
+        worker.run(args.max_tasks)
+    except KeyboardInterrupt:
+        # A step in progress keeps its lease until it expires, then is re-queued
+        reporter.emit("summary", worker=worker.worker_id, **worker.stats)
+        return EXIT_INTERRUPTED
+    reporter.emit("summary", worker=worker.worker_id, **worker.stats)
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["history"]:  # its options belong to the history CLI
+        history_main(argv[1:], prog="python -m workflow_engine history")
+        return EXIT_OK
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr,
+                        format="%(levelname)s %(name)s: %(message)s")
+    if args.command == "worker":
+        return cmd_worker(args)
+    engine = WorkflowEngine()
+    if args.command == "list":
+        return cmd_list(engine)
+    if args.command == "schedule":
+        return cmd_schedule(args, engine)
+    if args.command == "resume":
+        return cmd_resume(args, engine)
+    return cmd_run(args, engine)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Step Conditions — a small, safe expression language for WorkflowStep.condition.
+
+Expressions use Python syntax but only a whitelisted subset: literals,
+`and` / `or` / `not`, comparisons (including `in`), and calls to the
+functions below. Bare names resolve to workflow variables.
+
+    completed("1. Analyze Needs") and probe("flutter_analyze_errors")
+    feature_name != "" and not contains(result("2. Design Feature"), "no changes")
+    status("3. Write Regression Test") == "failed" or probe("git_dirty")
+
+Conditions are compiled once into closures; `and` / `or` short-circuit, so
+an expensive probe on the right-hand side only runs when it matters.
+"""
+
+import ast
+import operator
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConditionError(ValueError):
+    """Raised for conditions that use unsupported syntax or functions"""
+
+
+# ═══════════════════════════════════════════════════
+# PROJECT PROBES
+# ═══════════════════════════════════════════════════
+def _probe_flutter_analyze_errors(project_path: str) -> bool:
+    """True if `flutter analyze` reports at least one error"""
+    try:
+        proc = subprocess.run(
+            ["flutter", "analyze", "--no-pub", "--no-fatal-infos", "--no-fatal-warnings"],
+            cwd=project_path, capture_output=True, text=True, timeout=300,
+            shell=(os.name == "nt"),  # flutter is a .bat on Windows
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        raise RuntimeError(f"flutter analyze failed to run: {e}")
+    return proc.returncode != 0 or " error " in proc.stdout.lower()
+
+
+def _probe_git_dirty(project_path: str) -> bool:
+    """True if the working tree has uncommitted changes"""
+    try:
+        out = subprocess.check_output(
+            ["git", "status", "--porcelain"], cwd=project_path,
+            text=True, stderr=subprocess.DEVNULL, timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        raise RuntimeError(f"git status failed: {e}")
+    return bool(out.strip())
+
+
+def _probe_has_tests(project_path: str) -> bool:
+    """True if test/ contains at least one *_test.dart file"""
+    test_dir = Path(project_path) / "test"
+    return test_dir.is_dir() and next(test_dir.rglob("*_test.dart"), None) is not None
+
+
+PROBES: Dict[str, Callable[[str], Any]] = {
+    "flutter_analyze_errors": _probe_flutter_analyze_errors,
+    "git_dirty": _probe_git_dirty,
+    "has_tests": _probe_has_tests,
+}
+
+
+# ═══════════════════════════════════════════════════
+# EVALUATION CONTEXT
+# ═══════════════════════════════════════════════════
+class ConditionContext:
+    """What a condition can see: variables, earlier steps and project probes.
+    Probe results are cached until `invalidate_probes()` (called after each
+    step, since a step may change the project)."""
+
+    def __init__(self, variables: Dict[str, Any], steps: List[Any],
+                 project_path: Optional[str] = None):
+        self.variables = variables
+        self.steps = steps
+        self.project_path = project_path or ""
+        self._probe_cache: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.probe_runs = 0
+
+    def _step(self, name: str):
+        for step in self.steps:
+            if step.name == name:
+                return step
+        return None
+
+    def status(self, name: str) -> str:
+        step = self._step(name)
+        return step.status if step else "pending"
+
+    def result(self, name: str) -> str:
+        step = self._step(name)
+        return step.result if step else ""
+
+    def probe(self, name: str) -> Any:
+        with self._lock:
+            if name in self._probe_cache:
+                return self._probe_cache[name]
+        fn = PROBES.get(name)
+        if fn is None:
+            raise ConditionError(f"Unknown probe '{name}'")
+        value = fn(self.project_path)
+        with self._lock:
+            self._probe_cache[name] = value
+            self.probe_runs += 1
+        return value
+
+    def invalidate_probes(self):
+        with self._lock:
+            self._probe_cache.clear()
+
+
+def _contains(text: Any, needle: Any) -> bool:
+    return str(needle).lower() in str(text).lower()
+
+
+def _exists(ctx: ConditionContext, relative_path: str) -> bool:
+    return (Path(ctx.project_path) / relative_path).exists()
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "status": lambda ctx, name: ctx.status(name),
+    "result": lambda ctx, name: ctx.result(name),
+    "completed": lambda ctx, name: ctx.status(name) == "completed",
+    "failed": lambda ctx, name: ctx.status(name) == "failed",
+    "var": lambda ctx, name, default="": ctx.variables.get(name, default),
+    "probe": lambda ctx, name: ctx.probe(name),
+    "exists": _exists,
+    "contains": lambda ctx, text, needle: _contains(text, needle),
+    "len": lambda ctx, value: len(value),
+}
+
+
+# ═══════════════════════════════════════════════════
+# COMPILER
+# ═══════════════════════════════════════════════════
+_COMPARE_OPS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b,
+}
+
+Evaluator = Callable[[ConditionContext], Any]
+
+
+def _compile_node(node: ast.AST) -> Evaluator:
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, (str, int, float, bool, type(None))):
+            raise ConditionError(f"Unsupported literal: {node.value!r}")
+        value = node.value
+        return lambda ctx: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda ctx: ctx.variables.get(name, "")
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            def all_of(ctx):
+                value = True
+                for part in parts:
+                    value = part(ctx)
+                    if not value:
+                        return value
+                return value
+            return all_of
+
+        def any_of(ctx):
+            value = False
+            for part in parts:
+                value = part(ctx)
+                if value:
+                    return value
+            return value
+        return any_of
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda ctx: not operand(ctx)
+        if isinstance(node.op, ast.USub):
+            return lambda ctx: -operand(ctx)
+        raise ConditionError(f"Unsupported operator: {type(node.op).__name__}")
+
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left)
+        ops = []
+        for op, comparator in zip(node.ops, node.comparators):
+            fn = _COMPARE_OPS.get(type(op))
+            if fn is None:
+                raise ConditionError(f"Unsupported comparison: {type(op).__name__}")
+            ops.append((fn, _compile_node(comparator)))
+
+        def compare(ctx):
+            current = left(ctx)
+            for fn, right in ops:
+                other = right(ctx)
+                if not fn(current, other):
+                    return False
+                current = other
+            return True
+        return compare
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ConditionError(f"Unknown function: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise ConditionError("Keyword arguments are not supported")
+        if (node.func.id == "probe" and node.args and isinstance(node.args[0], ast.Constant)
+                and node.args[0].value not in PROBES):
+            raise ConditionError(f"Unknown probe '{node.args[0].value}'")
+        fn = FUNCTIONS[node.func.id]
+        args = [_compile_node(a) for a in node.args]
+        return lambda ctx: fn(ctx, *(a(ctx) for a in args))
+
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_compile_node(e) for e in node.elts]
+        return lambda ctx: [item(ctx) for item in items]
+
+    raise ConditionError(f"Unsupported syntax: {type(node).__name__}")
+
+
+class CompiledCondition:
+    """A condition parsed and compiled once; empty source always passes"""
+
+    __slots__ = ("source", "_evaluate")
+
+    def __init__(self, source: str):
+        self.source = source
+        expression = source.strip()
+        if not expression:
+            self._evaluate: Optional[Evaluator] = None
+            return
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError as e:
+            raise ConditionError(f"Invalid condition '{expression}': {e.msg}")
+        self._evaluate = _compile_node(tree.body)
+
+    def evaluate(self, ctx: ConditionContext) -> bool:
+        if self._evaluate is None:
+            return True
+        return bool(self._evaluate(ctx))
+
+
+class ConditionCache:
+    """Compiled conditions for one workflow, keyed by step identity"""
+
+    def __init__(self):
+        self._entries: Dict[int, CompiledCondition] = {}
+
+    def get(self, key: int, source: str) -> CompiledCondition:
+        compiled = self._entries.get(key)
+        if compiled is None or compiled.source != source:
+            compiled = CompiledCondition(source)
+            self._entries[key] = compiled
+        return compiled
+
+    def invalidate(self):
+        self._entries.clear()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Prompt Dispatcher — arbitration for editor windows shared by several runs.
+
+Each editor target ("antigravity", "windsurf", ...) has one turn to give
+out at a time. Engines ask for a turn before every send and hand it back
+when the step's output is in. Waiting requests are ordered by
+
+  1. effective priority: the requested priority (lower = more urgent),
+     improved by one level every `aging_seconds` of waiting, so low-priority
+     work is never starved;
+  2. fairness: the workflow that has held the editor for the least time
+     so far goes first;
+  3. arrival order.
+
+After a step, its run keeps a short reservation (its cooldown) so the
+next step lands in the same conversation. Only a strictly more urgent
+request may take the editor during that reservation (preemption between
+steps; a step that is typing or waiting for the AI is never interrupted).
+
+One dispatcher arbitrates the engines of one process (GUI, scheduler,
+CLI). Use `shared_dispatcher()` for the process-wide instance. Turns and
+reservations belong to an `owner`, a per-run id, so two runs of workflows
+with the same name never release each other's turn; fairness is tracked
+per workflow name. Between
+processes (two GUIs, a GUI and a CLI run) a turn is also backed by an OS
+file lock per editor in `lock_dir`, so only one process sends at a time;
+priorities, fairness and reservations apply within a process only.
+"""
+
+import itertools
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import logging
+
+from workflow_timers import CancelToken
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_URGENT = 0     # auto-heal, broken builds
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 90       # long background feature work
+
+_POLL = 0.25  # cancellation check interval while queued
+
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), "mycircle_editor_locks")
+
+
+class _Request:
+    __slots__ = ("seq", "owner", "workflow", "step", "priority", "enqueued", "granted",
+                 "granted_at")
+
+    def __init__(self, seq: int, owner: str, workflow: str, step: str, priority: int):
+        self.seq = seq
+        self.owner = owner
+        self.workflow = workflow
+        self.step = step
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.granted_at = 0.0
+
+
+class _Target:
+    """Queue and bookkeeping for one editor"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.waiting: List[_Request] = []
+        self.holder: Optional[_Request] = None
+        self.reserved_for: Optional[str] = None  # owner
+        self.reserved_name: Optional[str] = None  # its workflow, for stats and logs
+        self.reserved_priority = PRIORITY_NORMAL
+        self.reserved_until = 0.0
+        self.held_seconds: Dict[str, float] = {}  # per workflow, for fairness
+        self.os_lock: Optional[int] = None  # fd holding the cross-process lock
+        self.stats = {"granted": 0, "preemptions": 0, "cancelled": 0,
+                      "wait_total": 0.0, "wait_max": 0.0, "max_depth": 0}
+
+
+class PromptDispatcher:
+    """Priority queue with aging, fairness and step-boundary preemption
+    for each editor target"""
+
+    def __init__(self, aging_seconds: float = 60.0, reserve_grace: float = 0.5,
+                 lock_dir: Optional[str] = DEFAULT_LOCK_DIR):
+        self.aging_seconds = aging_seconds
+        self.reserve_grace = reserve_grace  # added to the caller's cooldown
+        self.lock_dir = lock_dir  # None = arbitrate within this process only
+        self._targets: Dict[str, _Target] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def _target(self, name: str) -> _Target:
+        target = self._targets.get(name)
+        if target is None:
+            target = self._targets[name] = _Target(name)
+        return target
+
+    def _effective(self, request: _Request, now: float) -> float:
+        if self.aging_seconds <= 0:
+            return request.priority
+        levels = int((now - request.enqueued) // self.aging_seconds)
+        return request.priority - levels * PRIORITY_HIGH
+
+    # ═══════════════════════════════════════════════════
+    # TURNS
+    # ═══════════════════════════════════════════════════
+    @contextmanager
+    def turn(self, target: str, workflow: str, step: str = "",
+             priority: int = PRIORITY_NORMAL, token: Optional[CancelToken] = None,
+             reserve: float = 0.0, owner: Optional[str] = None) -> Iterator[float]:
+        """Hold the editor `target` for one send; yields the seconds spent
+        queued. On exit, the owner keeps the editor for `reserve` seconds
+        (plus reserve_grace) unless something more urgent is waiting.
+        `owner` identifies the run (default: the workflow name)."""
+        waited = self.acquire(target, workflow, step, priority, token, owner)
+        try:
+            yield waited
+        finally:
+            self.release(target, workflow, priority, reserve, owner)
+
+    def acquire(self, target: str, workflow: str, step: str = "",
+                priority: int = PRIORITY_NORMAL, token: Optional[CancelToken] = None,
+                owner: Optional[str] = None) -> float:
+        """Block until it is this request's turn; returns the seconds waited.
+        Raises StepCancelled / StepTimeout if `token` ends first."""
+        with self._cond:
+            t = self._target(target)
+            request = _Request(next(self._seq), owner or workflow, workflow, step, priority)
+            t.waiting.append(request)
+            t.stats["max_depth"] = max(t.stats["max_depth"], len(t.waiting))
+            self._grant(t)
+            try:
+                while not request.granted:
+                    if token is not None and token.cancelled:
+                        token.check()
+                    self._cond.wait(self._wait_timeout(t, token))
+                    self._grant(t)
+            except BaseException:
+                if request.granted:
+                    t.holder = None
+                else:
+                    t.waiting.remove(request)
+                t.stats["cancelled"] += 1
+                self._grant(t)
+                self._cond.notify_all()
+                raise
+        try:
+            self._lock_across_processes(t, workflow, token)
+        except BaseException:
+            with self._cond:
+                t.stats["cancelled"] += 1
+            self.release(target, workflow, priority, owner=owner)
+            raise
+        with self._cond:
+            waited = time.monotonic() - request.enqueued
+            t.stats["wait_total"] += waited
+            t.stats["wait_max"] = max(t.stats["wait_max"], waited)
+        if waited > 1.0:
+            logger.info(f"'{workflow}' waited {waited:.1f}s for {target}")
+        return waited
+
+    def release(self, target: str, workflow: str, priority: int = PRIORITY_NORMAL,
+                reserve: float = 0.0, owner: Optional[str] = None):
+        owner = owner or workflow
+        with self._cond:
+            t = self._target(target)
+            holder = t.holder
+            if holder is not None and holder.owner == owner:
+                held = time.monotonic() - holder.granted_at
+                t.held_seconds[workflow] = t.held_seconds.get(workflow, 0.0) + held
+                t.holder = None
+                if t.os_lock is not None:
+                    _unlock_file(t.os_lock)
+                    t.os_lock = None
+            if reserve > 0:
+                t.reserved_for = owner
+                t.reserved_name = workflow
+                t.reserved_priority = priority
+                t.reserved_until = time.monotonic() + reserve + self.reserve_grace
+            self._grant(t)
+            self._cond.notify_all()
+
+    def end_reservation(self, target: str, workflow: str, owner: Optional[str] = None):
+        """The run is done with the editor (it finished)"""
+        with self._cond:
+            t = self._target(target)
+            if t.reserved_for == (owner or workflow):
+                t.reserved_for = None
+                self._grant(t)
+                self._cond.notify_all()
+
+    def _lock_across_processes(self, t: _Target, workflow: str,
+                               token: Optional[CancelToken]):
+        """Take the editor's OS file lock for the turn just granted, waiting
+        while another process holds it (the in-process turn is held)"""
+        if self.lock_dir is None:
+            return
+        os.makedirs(self.lock_dir, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", t.name) or "editor"
+        fd = os.open(os.path.join(self.lock_dir, f"{name}.lock"), os.O_RDWR | os.O_CREAT)
+        try:
+            logged = False
+            while not _try_lock_file(fd):
+                if not logged:
+                    logger.info(f"'{workflow}' waiting for {t.name}, in use by another process")
+                    logged = True
+                if token is not None:
+                    token.sleep(_POLL)
+                else:
+                    time.sleep(_POLL)
+        except BaseException:
+            os.close(fd)
+            raise
+        with self._cond:
+            t.os_lock = fd
+
+    @staticmethod
+    def _wait_timeout(t: _Target, token: Optional[CancelToken]) -> Optional[float]:
+        """Waiters wake on every release; beyond that only to notice a
+        cancelled token or the end of a reservation. Aging needs no timer:
+        ranks are computed when the editor is handed out."""
+        timeout = _POLL if token is not None else None
+        if t.reserved_for is not None:
+            remaining = max(0.0, t.reserved_until - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _grant(self, t: _Target):
+        """Give the editor to the best waiting request, if it is free (lock held)"""
+        if t.holder is not None or not t.waiting:
+            return
+        now = time.monotonic()
+        best = min(t.waiting, key=lambda r: (self._effective(r, now),
+                                             t.held_seconds.get(r.workflow, 0.0), r.seq))
+        if t.reserved_for is not None:
+            if now >= t.reserved_until:
+                t.reserved_for = None
+            elif best.owner != t.reserved_for:
+                own = [r for r in t.waiting if r.owner == t.reserved_for]
+                if self._effective(best, now) < t.reserved_priority:
+                    t.stats["preemptions"] += 1
+                    logger.info(f"'{best.workflow}' preempts '{t.reserved_name}' on {t.name}")
+                elif own:
+                    best = own[0]
+                else:
+                    return  # keep the editor for the reserved workflow
+            t.reserved_for = None
+        t.waiting.remove(best)
+        best.granted = True
+        best.granted_at = now
+        t.holder = best
+        t.stats["granted"] += 1
+        self._cond.notify_all()
+
+    # ═══════════════════════════════════════════════════
+    # METRICS
+    # ═══════════════════════════════════════════════════
+    def queue_depth(self, target: str) -> int:
+        with self._cond:
+            t = self._targets.get(target)
+            return len(t.waiting) if t else 0
+
+    def stats(self) -> Dict[str, dict]:
+        """Per target: depth, holder, grants, preemptions and wait times"""
+        with self._cond:
+            result = {}
+            for name, t in self._targets.items():
+                granted = t.stats["granted"]
+                result[name] = {
+                    "depth": len(t.waiting),
+                    "holder": t.holder.workflow if t.holder else None,
+                    "reserved_for": t.reserved_name if t.reserved_for else None,
+                    **t.stats,
+                    "wait_avg": round(t.stats["wait_total"] / granted, 3) if granted else 0.0,
+                    "wait_total": round(t.stats["wait_total"], 3),
+                    "wait_max": round(t.stats["wait_max"], 3),
+                    "held_seconds": {k: round(v, 3) for k, v in t.held_seconds.items()},
+                }
+            return result
+
+    def render_prometheus(self) -> str:
+        """Queue gauges and counters in the Prometheus text format"""
+        lines = ["# HELP workflow_editor_queue_depth Prompts waiting for an editor.",
+                 "# TYPE workflow_editor_queue_depth gauge"]
+        stats = self.stats()
+        for name, s in sorted(stats.items()):
+            lines.append(f'workflow_editor_queue_depth{{editor="{name}"}} {s["depth"]}')
+        for metric, key, kind, text in (
+                ("workflow_editor_grants_total", "granted", "counter", "Editor turns granted."),
+                ("workflow_editor_preemptions_total", "preemptions", "counter",
+                 "Reservations broken by more urgent prompts."),
+                ("workflow_editor_wait_seconds_total", "wait_total", "counter",
+                 "Total seconds prompts spent queued."),
+                ("workflow_editor_wait_seconds_max", "wait_max", "gauge",
+                 "Longest time a prompt spent queued.")):
+            lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+            for name, s in sorted(stats.items()):
+                lines.append(f'{metric}{{editor="{name}"}} {s[key]}')
+        return "\n".join(lines) + "\n"
+
+
+def _try_lock_file(fd: int) -> bool:
+    """Non-blocking exclusive OS lock on an open file"""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_file(fd: int):
+    """Release a lock taken by _try_lock_file and close the file"""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    except OSError as e:
+        logger.warning(f"Could not unlock editor lock: {e}")
+    finally:
+        os.close(fd)
+
+
+_shared: Optional[PromptDispatcher] = None
+_shared_lock = threading.Lock()
+
+
+def shared_dispatcher() -> PromptDispatcher:
+    """The process-wide dispatcher"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PromptDispatcher()
+        return _shared
@@ -8,38 +8,120 @@ import json
 import time
 import threading
 import copy
+import inspect
 import os
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Callable, Any
+from collections import ChainMap
+from typing import Dict, List, Mapping, Optional, Callable, Any
 from datetime import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from project_lock import ProjectLock, ProjectLockService
+from project_state import project_fingerprint
+from workflow_cache import StepResultCache
+from workflow_conditions import CompiledCondition, ConditionCache, ConditionContext
+from workflow_dispatcher import PRIORITY_NORMAL, PromptDispatcher
+from workflow_events import EventBus
+from workflow_fanout import FanoutError, aggregate_results, expand_items, item_variables
+from workflow_history import RunHistory
+from workflow_ledger import StepLedger, step_fingerprint
+from workflow_metrics import MetricsRegistry, RunTracer
+from workflow_output import StepOutput, split_chunks
+from workflow_prefetch import StepPrefetch, next_sequential_step
+from workflow_queue import StepQueue
+from workflow_retry import CircuitBreaker, RetryPolicy
+from workflow_snapshot import RunSnapshot, SnapshotStore
+from workflow_journal import JournalStore, ResumeState, RunJournal, prompt_hash, safe_file_name
+from workflow_templates import PromptTemplate, TemplateCache
+from workflow_timers import CancelToken, RunClock, StepCancelled, StepTimeout
 
 logger = logging.getLogger(__name__)
 
 
+def _accepts_token(fn: Callable) -> bool:
+    """True if `fn` takes a `token` keyword (e.g. EditorBridge.send_and_wait)"""
+    try:
+        params = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+    return "token" in params or any(p.kind is inspect.Parameter.VAR_KEYWORD
+                                    for p in params.values())
+
+
 class WorkflowStep:
     """A single step in a workflow"""
 
     def __init__(self, name: str, prompt: str, delay_after: float = 3.0,
-                 condition: str = "", enabled: bool = True):
+                 condition: str = "", enabled: bool = True,
+                 depends_on: Optional[List[str]] = None, cacheable: bool = False,
+                 retry: Optional[RetryPolicy] = None, timeout: Optional[float] = None,
+                 foreach: str = "", max_parallel: int = 1, workflow: str = "",
+                 workflow_vars: Optional[Dict[str, Any]] = None,
+                 touches: Optional[List[str]] = None, read_only: bool = False):
         self.name = name
         self.prompt = prompt
         self.delay_after = delay_after  # seconds to wait after this step
         self.condition = condition  # optional condition string
         self.enabled = enabled
+        # Names of steps that must finish first. None = "the previous step"
+        # (plain list order); [] = no dependencies. Any non-None value turns
+        # the workflow into a DAG whose ready steps run in parallel.
+        self.depends_on = depends_on
+        # Reuse a stored result when prompt, editor and project tree are unchanged
+        self.cacheable = cacheable
+        self.retry = retry  # overrides the workflow / engine retry policy
+        self.timeout = timeout  # seconds per attempt; None = no limit
+        # Fan-out: run the prompt once per item of a list variable or
+        # "glob:pattern" (see workflow_fanout), max_parallel at a time
+        self.foreach = foreach
+        self.max_parallel = max(1, int(max_parallel))
+        # Sub-workflow: run another workflow (by name or JSON path) as this
+        # step. It sees its own variables, the caller's project_path and
+        # workflow_vars, whose values may use the caller's {placeholders}.
+        self.workflow = workflow
+        self.workflow_vars: Dict[str, Any] = dict(workflow_vars or {})
+        # Project lock scope: paths (relative to project_path, {placeholders}
+        # allowed) the step may change; None = the whole project. read_only
+        # steps share the lock with other readers.
+        self.touches = list(touches) if touches is not None else None
+        self.read_only = read_only
+        self.children: List["WorkflowStep"] = []  # child invocations of the last run
+        self.attempts = 0
         self.status = "pending"  # pending | running | completed | failed | skipped
         self.result = ""
+        self.result_path: Optional[str] = None  # full output, when spilled to disk
         self.started_at: Optional[datetime] = None
         self.completed_at: Optional[datetime] = None
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "name": self.name,
             "prompt": self.prompt,
             "delay_after": self.delay_after,
             "condition": self.condition,
             "enabled": self.enabled,
+            "cacheable": self.cacheable,
         }
+        if self.depends_on is not None:
+            data["depends_on"] = list(self.depends_on)
+        if self.retry is not None:
+            data["retry"] = self.retry.to_dict()
+        if self.timeout:
+            data["timeout"] = self.timeout
+        if self.foreach:
+            data["foreach"] = self.foreach
+            data["max_parallel"] = self.max_parallel
+        if self.workflow:
+            data["workflow"] = self.workflow
+            data["workflow_vars"] = dict(self.workflow_vars)
+        if self.touches is not None:
+            data["touches"] = list(self.touches)
+        if self.read_only:
+            data["read_only"] = True
+        return data
 
     @classmethod
     def from_dict(cls, data: dict) -> "WorkflowStep":
@@ -49,6 +131,16 @@ class WorkflowStep:
             delay_after=data.get("delay_after", 3.0),
             condition=data.get("condition", ""),
             enabled=data.get("enabled", True),
+            depends_on=data.get("depends_on"),
+            cacheable=data.get("cacheable", False),
+            retry=RetryPolicy.from_dict(data.get("retry")),
+            timeout=data.get("timeout"),
+            foreach=data.get("foreach", ""),
+            max_parallel=data.get("max_parallel", 1),
+            workflow=data.get("workflow", ""),
+            workflow_vars=data.get("workflow_vars"),
+            touches=data.get("touches"),
+            read_only=data.get("read_only", False),
         )
 
 
@@ -59,29 +151,47 @@ class Workflow:
         self.name = name
         self.description = description
         self.steps: List[WorkflowStep] = steps or []
-        self.variables: Dict[str, str] = {}
+        self.variables: Dict[str, Any] = {}  # strings, or lists for fan-out steps
+        self.retry: Optional[RetryPolicy] = None  # default for steps without their own
+        self.priority: Optional[int] = None  # editor queue priority; None = the engine's
         self.created_at = datetime.now().isoformat()
+        self.revision = 0  # bumped on structural edits; invalidates compiled templates
+        self._templates = TemplateCache()
+        self._conditions = ConditionCache()
+        self._compiled_revision = 0
+
+    def touch(self):
+        """Mark the workflow as edited"""
+        self.revision += 1
 
     def add_step(self, step: WorkflowStep):
         self.steps.append(step)
+        self.touch()
 
     def remove_step(self, index: int):
         if 0 <= index < len(self.steps):
             self.steps.pop(index)
+            self.touch()
 
     def move_step(self, from_idx: int, to_idx: int):
         if 0 <= from_idx < len(self.steps) and 0 <= to_idx < len(self.steps):
             step = self.steps.pop(from_idx)
             self.steps.insert(to_idx, step)
+            self.touch()
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "name": self.name,
             "description": self.description,
             "steps": [s.to_dict() for s in self.steps],
             "variables": self.variables,
             "created_at": self.created_at,
         }
+        if self.retry is not None:
+            data["retry"] = self.retry.to_dict()
+        if self.priority is not None:
+            data["priority"] = self.priority
+        return data
 
     @classmethod
     def from_dict(cls, data: dict) -> "Workflow":
@@ -91,37 +201,264 @@ class Workflow:
         )
         wf.variables = data.get("variables", {})
         wf.created_at = data.get("created_at", datetime.now().isoformat())
+        wf.retry = RetryPolicy.from_dict(data.get("retry"))
+        wf.priority = data.get("priority")
         for step_data in data.get("steps", []):
             wf.add_step(WorkflowStep.from_dict(step_data))
         return wf
 
-    def resolve_prompt(self, step: WorkflowStep) -> str:
-        """Replace template variables in prompt text"""
-        prompt = step.prompt
-        for key, value in self.variables.items():
-            prompt = prompt.replace(f"{{{key}}}", value)
-        return prompt
+    def copy(self) -> "Workflow":
+        """An independent copy (steps, variables and retry policy)"""
+        clone = Workflow.from_dict(copy.deepcopy(self.to_dict()))
+        clone.revision = self.revision
+        return clone
+
+    @classmethod
+    def compose(cls, name: str, workflows: List["Workflow"],
+                variables: Optional[Dict[str, Any]] = None) -> "Workflow":
+        """A workflow that runs `workflows` one after another as sub-workflows,
+        each receiving `variables`"""
+        composed = cls(name, description=" → ".join(wf.name for wf in workflows))
+        composed.variables = dict(variables or {})
+        for wf in workflows:
+            passthrough = {key: "{" + key + "}" for key in composed.variables}
+            composed.add_step(WorkflowStep(wf.name, prompt="", delay_after=0, workflow=wf.name,
+                                           workflow_vars=passthrough))
+        return composed
+
+    def execution_order(self) -> List[int]:
+        """Step indices in an order that respects dependencies"""
+        if not self.is_dag:
+            return list(range(len(self.steps)))
+        deps = self.dependency_graph()
+        order: List[int] = []
+        placed: set = set()
+        while len(order) < len(self.steps):
+            for i in range(len(self.steps)):
+                if i not in placed and all(d in placed for d in deps[i]):
+                    order.append(i)
+                    placed.add(i)
+        return order
+
+    @property
+    def is_dag(self) -> bool:
+        """True if any step declares explicit dependencies"""
+        return any(s.depends_on is not None for s in self.steps)
+
+    def dependency_graph(self) -> Dict[int, List[int]]:
+        """Map each step index to the indices it depends on.
+        Raises ValueError for unknown step names or dependency cycles."""
+        index_by_name = {s.name: i for i, s in enumerate(self.steps)}
+        graph: Dict[int, List[int]] = {}
+        for i, step in enumerate(self.steps):
+            if step.depends_on is None:
+                graph[i] = [i - 1] if i > 0 else []
+                continue
+            deps = []
+            for name in step.depends_on:
+                if name not in index_by_name:
+                    raise ValueError(f"Step '{step.name}' depends on unknown step '{name}'")
+                deps.append(index_by_name[name])
+            graph[i] = deps
+
+        # Cycle check (iterative DFS)
+        state = [0] * len(self.steps)  # 0 = new, 1 = visiting, 2 = done
+        for root in range(len(self.steps)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(graph[root]))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    state[node] = 2
+                    stack.pop()
+                elif state[child] == 1:
+                    raise ValueError(f"Dependency cycle involving step '{self.steps[child].name}'")
+                elif state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(graph[child])))
+        return graph
+
+    def _check_revision(self):
+        if self._compiled_revision != self.revision:
+            self._templates.invalidate()
+            self._conditions.invalidate()
+            self._compiled_revision = self.revision
+
+    def compiled_prompt(self, step: WorkflowStep) -> PromptTemplate:
+        """The step's prompt parsed into segments, cached per revision"""
+        self._check_revision()
+        return self._templates.get(id(step), step.prompt)
+
+    def compiled_condition(self, step: WorkflowStep) -> CompiledCondition:
+        """The step's guard compiled to a closure tree, cached per revision.
+        Raises ConditionError for invalid expressions."""
+        self._check_revision()
+        return self._conditions.get(id(step), step.condition)
+
+    def compile_conditions(self):
+        """Compile every step guard up front so errors surface before a run"""
+        for step in self.steps:
+            self.compiled_condition(step)
+
+    def resolve_prompt(self, step: WorkflowStep, extra: Optional[Mapping[str, Any]] = None) -> str:
+        """Replace template variables in prompt text; `extra` (e.g. a
+        fan-out item) takes precedence over the workflow variables"""
+        variables = ChainMap(extra, self.variables) if extra else self.variables
+        return self.compiled_prompt(step).render(variables)
+
+    def unresolved_placeholders(self) -> Dict[str, List[str]]:
+        """Map step name -> placeholders with no matching variable"""
+        missing = {}
+        for step in self.steps:
+            names = self.compiled_prompt(step).missing(self.variables)
+            if step.foreach:
+                names = [n for n in names if n not in item_variables("", 0, 0)]
+            if step.workflow:
+                names = []  # a sub-workflow's prompt is unused
+            if names:
+                missing[step.name] = names
+        return missing
 
 
 class WorkflowEngine:
     """Engine that executes workflows step by step"""
 
+    EVENTS = ("step_start", "step_complete", "workflow_done", "error",
+              "progress", "loop_wait", "step_output")
+
+    # Built-in preset workflows: name -> builder, each built on first use
+    BUILTIN_WORKFLOWS = {
+        "Full Feature Dev": "_builtin_full_feature_dev",
+        "Bug Fix & Test": "_builtin_bug_fix_test",
+        "Code Review & Refactor": "_builtin_code_review_refactor",
+        "Analyze, Fix & Sync": "_builtin_analyze_fix_sync",
+        "Autonomous Feature Architect": "_builtin_autonomous_feature_architect",
+        "The Executive Developer": "_builtin_the_executive_developer",
+        "Enterprise Solution Architect": "_builtin_enterprise_solution_architect",
+    }
+
     def __init__(self):
         self._current_workflow: Optional[Workflow] = None
         self._current_step_index: int = -1
         self._running = False
         self._paused = False
         self._cancel_requested = False
+        # Parent of every step's CancelToken; cancel() cancels in-flight sends
+        self._run_token = CancelToken()
+        self._dispatch_owner = uuid.uuid4().hex  # renewed per run
         self._lock = threading.Lock()
-        self._pause_event = threading.Event()
-        self._pause_event.set()  # not paused initially
+        self._clock = RunClock()  # wakes waits on cancel / pause / resume
         self._thread: Optional[threading.Thread] = None
 
         # Looping state
-        self.loop_mode = False
+        self._loop_mode = False
         self.loop_interval = 120.0  # default 2 mins
         self._loop_countdown = 0.0
 
+        # DAG mode: max steps executing at the same time
+        self.max_parallel_steps = 4
+
+        # Prompts in flight at once for the connected editor (DAG steps and
+        # fan-out children alike). None = no limit beyond the above.
+        self.max_concurrent_sends: Optional[int] = None
+        self._send_slots: Optional[threading.BoundedSemaphore] = None
+
+        # Editor arbitration between runs: with a dispatcher set, every send
+        # waits for its turn on dispatch_target (usually the editor name) at
+        # the workflow's priority, else engine.priority (lower = sooner).
+        self.dispatcher: Optional[PromptDispatcher] = None
+        self.dispatch_target = "editor"
+        self.priority = PRIORITY_NORMAL
+
+        # Work-queue mode: prompts are published to step_queue and run by
+        # worker processes (see workflow_queue) instead of the local bridge.
+        # queue_target restricts tasks to workers owning that editor.
+        self.step_queue: Optional[StepQueue] = None
+        self.queue_target: Optional[str] = None
+        self._extra_units = 0  # child invocations beyond one per step, this iteration
+
+        # Sub-workflows: workflow_registry / workflow_resolver(name) are
+        # consulted before the built-ins and JSON paths (see resolve_workflow)
+        self.workflow_registry: Dict[str, Workflow] = {}
+        self.workflow_resolver: Optional[Callable[[str], Optional[Workflow]]] = None
+        self._prefix_results: Dict[str, str] = {}  # prefix chain hash -> result, this iteration
+
+        # Failure handling: steps without their own (or a workflow) retry
+        # policy use retry_policy. After breaker_threshold consecutive send
+        # failures the run is halted ("halt") or paused until resumed
+        # ("suspend"). breaker_threshold=0 disables the breaker.
+        self.retry_policy = RetryPolicy()
+        self.breaker_threshold = 3
+        self.breaker_action = "halt"  # halt | suspend
+        self._breaker = CircuitBreaker(self.breaker_threshold)
+        self._halt_reason: Optional[str] = None
+
+        # Speculative preparation (sequential runs): while a step waits for
+        # the AI, the next step's prompt, guard probes and cache key are
+        # prepared on a background thread, and prepare_prompt_fn (e.g.
+        # EditorBridge.prepare) stages its payload. The time from one step
+        # being done to the next being sent is reported as 'handoff'.
+        self.speculate = True
+        self.prepare_prompt_fn: Optional[Callable[[str], Any]] = None
+        self._handoff_from: Optional[float] = None
+
+        # Guard evaluation context for the current loop iteration
+        self._conditions: Optional[ConditionContext] = None
+
+        # Crash-safe run journal (None = disabled)
+        self.journal_dir: Optional[str] = None
+        self._journal: Optional[RunJournal] = None
+        self._resumed: set = set()  # step indices restored from a journal
+        self._iteration = 0
+
+        # Suspend-to-disk: suspend_to_disk() ends the run at the next step
+        # boundary and saves a RunSnapshot in snapshot_dir; restore() continues
+        # it, in this process or another one.
+        self.snapshot_dir: Optional[str] = None
+        self.last_snapshot_path: Optional[str] = None
+        self._suspend_requested = False
+        self._restored: Optional[RunSnapshot] = None  # claimed snapshot being continued
+        self._resumes = 0
+
+        # Step result cache for steps marked cacheable (None = disabled).
+        # cache_scope identifies the editor/model so results never cross editors.
+        self.result_cache: Optional[StepResultCache] = None
+        self.cache_scope = ""
+
+        # Incremental re-runs: with a step_ledger, each completed step is
+        # recorded under a fingerprint of its definition, resolved inputs and
+        # upstream steps. With incremental=True a step whose fingerprint is
+        # unchanged gets its recorded result instead of being sent again
+        # (never in loop mode, where each iteration acts on a changed project).
+        self.step_ledger: Optional[StepLedger] = None
+        self.incremental = False
+        self._fingerprints: Dict[int, str] = {}  # step index -> fingerprint, this iteration
+
+        # Project locks: with project_locks set, a step that goes to the editor
+        # first locks the workflow's project_path (its `touches` paths, or the
+        # whole project; shared if read_only) and keeps it through its
+        # cooldown. Runs in this or other processes with overlapping paths wait.
+        self.project_locks: Optional[ProjectLockService] = None
+        self._step_locks: Dict[int, ProjectLock] = {}  # step index -> held lock
+
+        # Counters for the current run, reported by run_summary()
+        self._stats: Dict[str, Any] = {}
+        self._run_started = 0.0
+        self.last_run_summary: Dict[str, Any] = {}
+
+        # Loop change detection: skip iterations while the project is unchanged,
+        # doubling the wait each time up to max_loop_backoff seconds.
+        self.skip_unchanged = False
+        self.fingerprint_method = "git"  # git | mtime
+        self.max_loop_backoff = 3600.0
+
+        # How often (seconds) on_loop_wait countdown updates are emitted.
+        # 0 = only announce the start of each wait.
+        self.countdown_interval = 1.0
+
         # Callbacks
         self.on_step_start: Optional[Callable[[int, WorkflowStep], None]] = None
         self.on_step_complete: Optional[Callable[[int, WorkflowStep, str], None]] = None
@@ -137,8 +474,63 @@ class WorkflowEngine:
 
         self.on_loop_wait: Optional[Callable[[float], None]] = None
 
-        # Built-in workflows
-        self.builtin_workflows = self._create_builtin_workflows()
+        # Streaming output: send functions may return an iterator of text chunks.
+        # Each chunk (split to max_output_chunk chars) goes to on_step_output;
+        # results larger than result_spill_chars are written to output_dir.
+        self.on_step_output: Optional[Callable[[int, WorkflowStep, str], None]] = None
+        self.max_output_chunk = 4096
+        self.result_spill_chars = 64 * 1024
+        self.output_dir: Optional[str] = None
+
+        # Callbacks are delivered through the event bus on its own thread, so
+        # a slow handler never stalls the run. Extra subscribers may use
+        # engine.events.subscribe("progress", fn) etc.
+        self.events = EventBus()
+        for event in self.EVENTS:
+            self.events.subscribe(event, self._callback_forwarder(event))
+
+        # Tracing: every run records phase spans (resolve, send, wait,
+        # cooldown, loop_wait). Finished runs are written to trace_dir as
+        # JSONL and folded into `metrics`, rendered to metrics_path.
+        self.metrics = MetricsRegistry()
+        self.trace_dir: Optional[str] = None
+        self.metrics_path: Optional[str] = None
+        self._tracer: Optional[RunTracer] = None
+
+        # Run history: every run and step is queued to a SQLite store
+        # (written by its own thread) when set. None = disabled.
+        self.history: Optional[RunHistory] = None
+
+        # Built-in workflows built so far (see builtin_workflow)
+        self._builtin_cache: Dict[str, Workflow] = {}
+
+    def _callback_forwarder(self, event: str) -> Callable[..., None]:
+        """Subscriber that calls the matching on_<event> attribute, if set"""
+        def forward(*args):
+            callback = getattr(self, f"on_{event}")
+            if callback:
+                callback(*args)
+        return forward
+
+    def _emit(self, event: str, *args):
+        self.events.publish(event, *args)
+
+    @property
+    def builtin_workflow_names(self) -> List[str]:
+        return list(self.BUILTIN_WORKFLOWS)
+
+    def builtin_workflow(self, name: str) -> Optional[Workflow]:
+        """The built-in workflow `name`, built on first use (None if unknown)"""
+        workflow = self._builtin_cache.get(name)
+        if workflow is None and name in self.BUILTIN_WORKFLOWS:
+            workflow = getattr(self, self.BUILTIN_WORKFLOWS[name])()
+            self._builtin_cache[name] = workflow
+        return workflow
+
+    @property
+    def builtin_workflows(self) -> Dict[str, Workflow]:
+        """Every built-in workflow (builds those not built yet)"""
+        return {name: self.builtin_workflow(name) for name in self.BUILTIN_WORKFLOWS}
 
     @property
     def is_running(self) -> bool:
@@ -152,207 +544,1242 @@ class WorkflowEngine:
     def current_step_index(self) -> int:
         return self._current_step_index
 
-    def start(self, workflow: Workflow):
-        """Start executing a workflow in a background thread"""
+    @property
+    def loop_mode(self) -> bool:
+        return self._loop_mode
+
+    @loop_mode.setter
+    def loop_mode(self, value: bool):
+        self._loop_mode = bool(value)
+        self._clock.notify()  # end a pending loop countdown right away
+
+    def find_resumable(self, workflow: Workflow) -> Optional[ResumeState]:
+        """Journal state of an interrupted run of this workflow, if any"""
+        if not self.journal_dir:
+            return None
+        return JournalStore(self.journal_dir).find_resumable(workflow.name)
+
+    def start(self, workflow: Workflow, resume: bool = False):
+        """Start executing a workflow in a background thread.
+        With resume=True, steps that completed in an interrupted run
+        (per the journal) are skipped and their results restored."""
+        self._prepare_run(workflow)
+        try:
+            if self.journal_dir:
+                self._open_journal(workflow, resume)
+            elif resume:
+                logger.warning("resume=True ignored: journal_dir is not set")
+            self._launch()
+        except Exception:
+            self._abandon_run()
+            raise
+
+    def restore(self, snapshot: RunSnapshot) -> Workflow:
+        """Continue a suspended run from its snapshot (see workflow_snapshot)
+        in a background thread. Steps that already ran keep their status and
+        result; the run keeps its id, iteration, counters and loop settings.
+        Returns the restored workflow. If the run cannot be started, a
+        claimed snapshot is given back (SnapshotStore.unclaim) and the error
+        re-raised."""
+        try:
+            workflow = Workflow.from_dict(snapshot.workflow)
+            self._prepare_run(workflow, run_id=snapshot.run_id)
+        except Exception:
+            SnapshotStore.unclaim(snapshot)
+            raise
+        try:
+            if self.journal_dir:
+                self._open_journal(workflow, resume=False)
+            snapshot.apply_steps(workflow.steps)
+            self._resumed = {i for i, step in enumerate(workflow.steps)
+                             if step.status != "pending"}
+            self._iteration = snapshot.iteration
+            self._stats.update(snapshot.stats)
+            self._run_started -= snapshot.elapsed
+            self._resumes = snapshot.resumes + 1
+            self._restored = snapshot
+            self.loop_mode = snapshot.loop_mode
+            self.loop_interval = snapshot.loop_interval
+            self.skip_unchanged = snapshot.skip_unchanged
+            logger.info(f"Restoring run {snapshot.run_id} of '{workflow.name}' at step "
+                        f"{snapshot.current_step + 1}/{len(workflow.steps)}")
+            self._launch()
+        except Exception:
+            self._restored = None
+            self._abandon_run()
+            SnapshotStore.unclaim(snapshot)
+            raise
+        return workflow
+
+    def suspend_to_disk(self):
+        """End the run at the next step boundary (a step in progress finishes
+        first; a paused run stops right away) and save it to snapshot_dir.
+        The path is reported as workflow_done "saved: <path>" and kept in
+        last_snapshot_path. A run suspended during the loop wait starts its
+        next iteration when restored."""
+        if not self.snapshot_dir:
+            raise RuntimeError("snapshot_dir is not set")
+        with self._lock:
+            if not self._running:
+                return
+            self._suspend_requested = True
+            self._paused = False
+        self._clock.notify()
+
+    def _stopping(self) -> bool:
+        """True once no further step should start (cancelled or suspending)"""
+        return self._cancel_requested or self._suspend_requested
+
+    def _prepare_run(self, workflow: Workflow, run_id: Optional[str] = None):
+        """Reset the engine and the workflow's steps for a new run"""
         if self._running:
             raise RuntimeError("A workflow is already running")
+        if workflow.is_dag:
+            workflow.dependency_graph()  # validate before spawning the thread
+        workflow.compile_conditions()
+        for step_name, names in workflow.unresolved_placeholders().items():
+            logger.warning(f"Step '{step_name}' has unresolved placeholders: {', '.join(names)}")
 
         self._current_workflow = workflow
         self._current_step_index = -1
         self._running = True
         self._paused = False
         self._cancel_requested = False
-        self._pause_event.set()
+        self._suspend_requested = False
+        self._restored = None
+        self._resumes = 0
+        self.last_snapshot_path = None
+        self._run_token = CancelToken()
+        self._dispatch_owner = uuid.uuid4().hex  # this run's turns at the editor
+        self._send_slots = (threading.BoundedSemaphore(self.max_concurrent_sends)
+                            if self.max_concurrent_sends else None)
+        self._extra_units = 0
+        self._prefix_results = {}
+        self._fingerprints = {}
 
         # Reset all step statuses
         for step in workflow.steps:
             step.status = "pending"
             step.result = ""
+            step.result_path = None
+            step.children = []
+            step.attempts = 0
             step.started_at = None
             step.completed_at = None
 
+        self._resumed = set()
+        self._iteration = 0
+        self._journal = None
+        self._journal_reopened = False
+        self._stats = {"cache_hits": 0, "cache_misses": 0, "guard_skips": 0,
+                       "skipped_iterations": 0, "retries": 0, "breaker_trips": 0,
+                       "prefix_reuses": 0, "prefetch_hits": 0, "prefetch_misses": 0,
+                       "prefetch_stale": 0,
+                       "handoffs": 0, "handoff_s": 0.0, "handoff_max_s": 0.0, "reused_steps": 0,
+                       "lock_waits": 0, "lock_wait_s": 0.0}
+        self._breaker = CircuitBreaker(self.breaker_threshold)
+        self._halt_reason = None
+        self._conditions: Optional[ConditionContext] = None
+        self._run_started = time.monotonic()
+        self._tracer = RunTracer(workflow.name, run_id)
+        if self.history:
+            self.history.record_run_start(self._tracer.run_id, workflow.name)
+
+    def _launch(self):
         self._thread = threading.Thread(target=self._run_workflow, daemon=True)
         self._thread.start()
 
+    def _abandon_run(self):
+        """Undo _prepare_run for a run that could not be started (e.g. the
+        journal directory is unusable), so the engine can start another.
+        A reopened journal stays open-ended, so the run can still be resumed."""
+        if self._journal:
+            if self._journal_reopened:
+                self._journal.detach()
+            else:
+                self._journal.close("error")
+            self._journal = None
+        if self.history:
+            self.history.record_run_end(self._tracer.run_id, "error")
+        self._running = False
+        self._current_step_index = -1
+        self._clock.notify()
+
+    def start_batch(self, workflows: List[Workflow], name: str = "",
+                    variables: Optional[Dict[str, Any]] = None) -> Workflow:
+        """Run several workflows back to back as one run (each as a
+        sub-workflow). Leading steps they share run only once."""
+        for wf in workflows:
+            self.workflow_registry[wf.name] = wf
+        batch = Workflow.compose(name or " + ".join(wf.name for wf in workflows),
+                                 workflows, variables)
+        self.start(batch)
+        return batch
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the current run finishes. Returns False on timeout."""
+        return self._clock.wait_for(lambda: not self._running, timeout)
+
+    def _open_journal(self, workflow: Workflow, resume: bool):
+        store = JournalStore(self.journal_dir)
+        state = store.find_resumable(workflow.name) if resume else None
+        if state is None:
+            self._journal = store.open_run(workflow.name)
+            self._journal.record("run_start", durable=True, workflow=workflow.name,
+                                 steps=[s.name for s in workflow.steps])
+            return
+
+        # Only restore a step if its resolved prompt is unchanged since it ran
+        for i, step in enumerate(workflow.steps):
+            entry = state.completed.get(step.name)
+            if entry and entry["prompt_hash"] == prompt_hash(workflow.resolve_prompt(step)):
+                step.status = "completed"
+                step.result = entry["result"]
+                self._resumed.add(i)
+        self._iteration = state.iteration
+        self._journal = store.reopen(state)
+        self._journal_reopened = True
+        self._journal.record("run_resumed", durable=True,
+                             skipped=[workflow.steps[i].name for i in sorted(self._resumed)])
+        logger.info(f"Resuming run {state.run_id}: {len(self._resumed)} step(s) already completed")
+
+    def _bump(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._stats[counter] = self._stats.get(counter, 0) + amount
+
+    def _observe_handoff(self, step: WorkflowStep, since: float):
+        """Time from the previous step being done to this step's first send"""
+        now = time.monotonic()
+        self._trace(step.name, "handoff", since, now)
+        with self._lock:
+            self._stats["handoffs"] += 1
+            self._stats["handoff_s"] += now - since
+            self._stats["handoff_max_s"] = max(self._stats["handoff_max_s"], now - since)
+
+    def run_summary(self) -> Dict[str, Any]:
+        """Step outcome counts, timings and counters for the current/last run"""
+        workflow = self._current_workflow
+        if workflow is None:
+            return dict(self.last_run_summary)
+        counts: Dict[str, int] = {}
+        for step in workflow.steps:
+            counts[step.status] = counts.get(step.status, 0) + 1
+        with self._lock:
+            stats = dict(self._stats)
+        if stats.get("handoffs"):
+            stats["handoff_avg_s"] = round(stats["handoff_s"] / stats["handoffs"], 3)
+        for key in ("handoff_s", "handoff_max_s", "lock_wait_s"):
+            if key in stats:
+                stats[key] = round(stats[key], 3)
+        return {
+            "workflow": workflow.name,
+            "iterations": self._iteration + 1,
+            "steps": counts,
+            "elapsed_s": round(time.monotonic() - self._run_started, 3),
+            **stats,
+        }
+
+    def _journal_record(self, event: str, durable: bool = False, **fields):
+        if self._journal:
+            try:
+                self._journal.record(event, durable=durable, **fields)
+            except Exception as e:
+                logger.debug(f"Journal write failed: {e}")
+
     def pause(self):
         """Pause the current workflow"""
         with self._lock:
             if self._running and not self._paused:
                 self._paused = True
-                self._pause_event.clear()
+        self._clock.notify()
 
     def resume(self):
         """Resume a paused workflow"""
         with self._lock:
             if self._running and self._paused:
                 self._paused = False
-                self._pause_event.set()
+        self._clock.notify()
 
     def cancel(self):
         """Cancel the current workflow"""
         with self._lock:
             self._cancel_requested = True
-            self.loop_mode = False  # disable loop on cancel
+            self._loop_mode = False  # disable loop on cancel
             self._paused = False
-            self._pause_event.set()  # unblock if paused
+        self._run_token.cancel()  # interrupt the bridge mid-send
+        self._clock.notify()  # unblock any wait immediately
+
+    def _wait_while_paused(self):
+        """Block while paused; returns as soon as resumed or cancelled"""
+        self._clock.wait_for(lambda: self._cancel_requested or not self._paused)
+
+    def _countdown(self, duration: float, interrupted: Callable[[], bool]) -> bool:
+        """Deadline wait that reports progress through on_loop_wait.
+        Returns False if interrupted before the duration elapsed."""
+        return self._clock.countdown(
+            duration,
+            interrupted=interrupted,
+            paused=lambda: self._paused,
+            on_tick=lambda remaining: self._emit("loop_wait", remaining),
+            tick_interval=self.countdown_interval,
+        )
 
     def _run_workflow(self):
         """Main workflow execution loop (runs in background thread)"""
         workflow = self._current_workflow
         
         while True:
-            total_steps = len(workflow.steps)
-            
             try:
-                for i, step in enumerate(workflow.steps):
-                    # Check cancel
-                    if self._cancel_requested:
-                        step.status = "skipped"
-                        continue
-
-                    # Wait if paused
-                    self._pause_event.wait()
-
-                    if self._cancel_requested:
-                        step.status = "skipped"
-                        continue
+                self._conditions = ConditionContext(
+                    workflow.variables, workflow.steps, workflow.variables.get("project_path")
+                )
+                if workflow.is_dag:
+                    self._run_dag(workflow)
+                else:
+                    self._run_sequential(workflow)
+
+                if self._suspending() and any(s.status == "pending" for s in workflow.steps):
+                    if self._save_snapshot(workflow):
+                        break
+                    continue  # could not save: stay paused in memory
 
-                    # Skip disabled steps
-                    if not step.enabled:
-                        step.status = "skipped"
-                        continue
-
-                    # Start step
-                    self._current_step_index = i
-                    step.status = "running"
-                    step.started_at = datetime.now()
-
-                    if self.on_step_start:
-                        try:
-                            self.on_step_start(i, step)
-                        except Exception:
-                            pass
-
-                    # Progress callback
-                    if self.on_progress:
-                        progress = ((i) / total_steps) * 100
-                        try:
-                            self.on_progress(i, total_steps, progress)
-                        except Exception:
-                            pass
-
-                    # Execute the prompt
-                    resolved_prompt = workflow.resolve_prompt(step)
-
-                    try:
-                        if self.send_and_wait_fn:
-                            # Auto-interact: send prompt AND wait for AI to finish
-                            result = self.send_and_wait_fn(resolved_prompt)
-                        elif self.send_prompt_fn:
-                            result = self.send_prompt_fn(resolved_prompt)
-                        else:
-                            result = f"[Dry Run] Prompt queued: {resolved_prompt[:80]}..."
-
-                        step.status = "completed"
-                        step.result = result or "Done"
-                        step.completed_at = datetime.now()
-
-                        if self.on_step_complete:
-                            try:
-                                self.on_step_complete(i, step, result)
-                            except Exception:
-                                pass
-
-                    except Exception as e:
-                        step.status = "failed"
-                        step.result = str(e)
-                        step.completed_at = datetime.now()
-
-                        if self.on_error:
-                            try:
-                                self.on_error(i, step, str(e))
-                            except Exception:
-                                pass
-
-                    # Delay between steps (cooldown)
-                    # Always apply if delay_after > 0, regardless of send_and_wait_fn status
-                    if i < total_steps - 1 and step.delay_after > 0:
-                        delay_end = time.time() + step.delay_after
-                        while time.time() < delay_end:
-                            if self._cancel_requested:
-                                break
-                            
-                            # Update countdown if callback exists
-                            remaining = max(0, delay_end - time.time())
-                            if self.on_loop_wait:
-                                self.on_loop_wait(remaining)
-                                
-                            time.sleep(0.5)
-                            self._pause_event.wait()
-                
                 # Workflow loop run complete
                 if not self.loop_mode or self._cancel_requested:
                     break
                 
                 # Handle Looping
-                if self.on_workflow_done:
-                    try:
-                        self.on_workflow_done(workflow, "looping")
-                    except Exception:
-                        pass
+                self._emit("workflow_done", workflow, "looping")
+                self._flush_trace()
                 
                 # Reset steps for next run
                 for step in workflow.steps:
                     step.status = "pending"
+                self._resumed.clear()
+                self._extra_units = 0
+                self._prefix_results.clear()
+                self._fingerprints.clear()
+                self._iteration += 1
+                self._journal_record("iteration", n=self._iteration)
                 
-                # Wait for interval
-                self._loop_countdown = self.loop_interval
-                while self._loop_countdown > 0:
-                    if self._cancel_requested or not self.loop_mode:
+                # Wait for interval (longer while nothing changes)
+                self._wait_for_next_iteration(workflow)
+
+                if self._suspending():
+                    if self._save_snapshot(workflow):
                         break
-                    
-                    if self.on_loop_wait:
-                        self.on_loop_wait(self._loop_countdown)
-                    
-                    sleep_time = min(1.0, self._loop_countdown)
-                    time.sleep(sleep_time)
-                    self._loop_countdown -= sleep_time
-                
+                    continue
+
                 if self._cancel_requested or not self.loop_mode:
                     break
 
             except Exception as e:
                 logger.error(f"Workflow execution error: {e}")
-                if self.on_workflow_done:
-                    try:
-                        self.on_workflow_done(workflow, f"error: {e}")
-                    except Exception:
-                        pass
+                self._emit("workflow_done", workflow, f"error: {e}")
                 break
 
-        # Final completion
-        status = "cancelled" if self._cancel_requested else "completed"
-        if self.on_progress:
-            try:
-                self.on_progress(len(workflow.steps), len(workflow.steps), 100)
-            except Exception:
-                pass
+        self._unlock_project()  # steps cut short by an engine error
 
-        if self.on_workflow_done:
-            try:
-                self.on_workflow_done(workflow, status)
-            except Exception:
-                pass
+        # Final completion
+        if self._halt_reason:
+            status = "halted"
+        elif self._cancel_requested:
+            status = "cancelled"
+        else:
+            status = "saved" if self.last_snapshot_path else "completed"
+        self.last_run_summary = {**self.run_summary(), "status": status,
+                                 "phase_seconds": self._tracer.phase_totals()}
+        if self._halt_reason:
+            self.last_run_summary["halt_reason"] = self._halt_reason
+        if self.last_snapshot_path:
+            self.last_run_summary["snapshot"] = self.last_snapshot_path
+        if self._restored:
+            SnapshotStore.release(self._restored)  # superseded by this run's outcome
+            self._restored = None
+        self._finish_trace(status)
+        if self.dispatcher:
+            self.dispatcher.end_reservation(self.dispatch_target, workflow.name,
+                                            self._dispatch_owner)
+        if self.history:
+            self.history.record_run_end(self._tracer.run_id, status, self.last_run_summary)
+        logger.info(f"Workflow '{workflow.name}' {status}: {self.last_run_summary}")
+        logger.debug(f"Event bus: {self.events.stats()}")
+        if self._journal:
+            self._journal.close(status)
+            self._journal = None
+
+        if status != "saved":
+            units = len(workflow.steps) + self._extra_units
+            self._emit("progress", units, units, 100)
+
+        self._emit("workflow_done", workflow, status)
+        self.events.close(wait=False)  # its thread exits once these are delivered
 
         self._running = False
         self._paused = False
         self._current_step_index = -1
+        self._clock.notify()  # wake wait()
+
+    def _suspending(self) -> bool:
+        return self._suspend_requested and not self._cancel_requested
+
+    def _save_snapshot(self, workflow: Workflow) -> bool:
+        """Write the run to snapshot_dir. If that fails the run stays in
+        memory, paused, and continues from the same step when resumed."""
+        snapshot = RunSnapshot(
+            run_id=self._tracer.run_id,
+            workflow=workflow.to_dict(),
+            steps=[RunSnapshot.step_state(step) for step in workflow.steps],
+            iteration=self._iteration,
+            stats=dict(self._stats),
+            elapsed=time.monotonic() - self._run_started,
+            loop_mode=self.loop_mode,
+            loop_interval=self.loop_interval,
+            skip_unchanged=self.skip_unchanged,
+            resumes=self._resumes,
+        )
+        try:
+            path = SnapshotStore(self.snapshot_dir).save(snapshot)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Could not save run of '{workflow.name}' to disk: {e}")
+            with self._lock:
+                self._suspend_requested = False
+                self._paused = True
+            self._resumed = {i for i, step in enumerate(workflow.steps)
+                             if step.status != "pending"}
+            self._emit("workflow_done", workflow, f"suspended: could not save to disk ({e})")
+            return False
+        self.last_snapshot_path = str(path)
+        logger.info(f"Run {snapshot.run_id} of '{workflow.name}' saved to {path}")
+        return True
+
+    def _wait_for_next_iteration(self, workflow: Workflow):
+        """Loop countdown. With skip_unchanged, iterations whose project
+        fingerprint matches the end of the last run are skipped and the
+        interval backs off exponentially. The fingerprint is the one result
+        caching uses (git state including every untracked file, else the
+        mtime index), so edits in a new directory count as a change."""
+        stopped = lambda: self._stopping() or not self._loop_mode
+        baseline = self._tree_state(workflow) if self.skip_unchanged else None
+
+        interval = self.loop_interval
+        consecutive = 0
+        while True:
+            self._loop_countdown = interval
+            with self._span("", "loop_wait"):
+                self._countdown(interval, stopped)
+            self._loop_countdown = 0.0
+            if stopped() or baseline is None:
+                return
+            if self._tree_state(workflow) != baseline:
+                return
+
+            consecutive += 1
+            self._bump("skipped_iterations")
+            interval = min(self.max_loop_backoff, self.loop_interval * (2 ** consecutive))
+            logger.info(f"Project unchanged; skipping iteration, next check in {interval:.0f}s")
+            self._emit("workflow_done", workflow,
+                       f"unchanged ({self._stats['skipped_iterations']} skipped)")
+
+    def _run_sequential(self, workflow: Workflow):
+        """Run the steps one after another in list order"""
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="workflow-prefetch") as pool:
+            self._run_steps_in_order(workflow, pool)
+
+    def _run_steps_in_order(self, workflow: Workflow, pool: ThreadPoolExecutor):
+        total_steps = len(workflow.steps)
+        prefetch: Optional[StepPrefetch] = None
+        self._handoff_from = None
+
+        for i, step in enumerate(workflow.steps):
+            # Restored from the journal on resume
+            if i in self._resumed:
+                continue
+
+            # Check cancel
+            if self._cancel_requested:
+                step.status = "skipped"
+                continue
+
+            # Wait if paused (paused time is not handoff time)
+            if self._paused:
+                self._wait_while_paused()
+                if self._handoff_from is not None:
+                    self._handoff_from = time.monotonic()
+
+            if self._cancel_requested:
+                step.status = "skipped"
+                continue
+            if self._suspend_requested:
+                break  # remaining steps stay pending in the snapshot
+
+            # Skip disabled steps
+            if not step.enabled:
+                step.status = "skipped"
+                continue
+
+            # Work prepared while the previous step ran (warms the guard's probes)
+            prepared = None
+            if prefetch is not None:
+                prefetch.settle()
+                if prefetch.matches(workflow, i):
+                    prepared = prefetch
+                    self._check_warmed(workflow, prepared)
+                self._bump("prefetch_hits" if prepared else "prefetch_misses")
+                prefetch = None
+
+            if not self._guard_passes(workflow, i, step):
+                continue
+
+            if self.speculate:
+                prefetch = self._prefetch_after(pool, workflow, i)
+            self._execute_step(workflow, i, step, i, total_steps, prepared)
+            if prefetch is not None:
+                # Project-dependent preparation overlaps the cooldown; it is
+                # checked against the project state before the step uses it
+                prefetch.futures.append(pool.submit(self._prefetch_warm, workflow, prefetch))
+
+            # Delay between steps (cooldown)
+            # Applies whenever delay_after > 0, except after a failed send:
+            # there is no AI output to settle, and retries already backed off
+            if i < total_steps - 1 and step.delay_after > 0 and step.status != "failed":
+                with self._span(step.name, "cooldown"):
+                    self._countdown(step.delay_after, self._stopping)
+            self._unlock_project(i)
+            self._handoff_from = time.monotonic()
+
+    def _prefetch_after(self, pool: ThreadPoolExecutor, workflow: Workflow,
+                        index: int) -> Optional[StepPrefetch]:
+        """Start preparing the step after `index` while `index` runs"""
+        j = next_sequential_step(workflow, index, self._resumed)
+        if j is None:
+            return None
+        prefetch = StepPrefetch(j, workflow.steps[j], workflow.revision, workflow.variables)
+        prefetch.futures.append(pool.submit(self._prefetch_prepare, workflow, prefetch))
+        return prefetch
+
+    def _prefetch_prepare(self, workflow: Workflow, prefetch: StepPrefetch):
+        """Resolve the prompt, compile the guard and stage the payload"""
+        step = prefetch.step
+        with self._span(step.name, "prefetch"):
+            prefetch.prompt = workflow.resolve_prompt(step)
+            if step.condition.strip():
+                workflow.compiled_condition(step)
+            if self.prepare_prompt_fn and self.step_queue is None:
+                self.prepare_prompt_fn(prefetch.prompt)
+
+    def _prefetch_warm(self, workflow: Workflow, prefetch: StepPrefetch):
+        """Run the guard's probes and compute the cache key against the
+        project as it is while the previous step cools down. Skipped when
+        the project state cannot be fingerprinted (nothing to check it by)."""
+        step = prefetch.step
+        if prefetch.prompt is None or self._cancel_requested:
+            return
+        with self._span(step.name, "prefetch"):
+            prefetch.tree_state = self._tree_state(workflow)
+            if prefetch.tree_state is None:
+                return
+            if step.condition.strip() and self._conditions:
+                workflow.compiled_condition(step).evaluate(self._conditions)
+            prefetch.cache_key = self._cache_key(workflow, step, prefetch.prompt,
+                                                 prefetch.tree_state)
+
+    def _check_warmed(self, workflow: Workflow, prefetch: StepPrefetch):
+        """Drop warmed probes and the cache key if the project changed
+        after they were taken (the AI was still editing in the cooldown)"""
+        if prefetch.tree_state is None:
+            return
+        if self._tree_state(workflow) != prefetch.tree_state:
+            self._bump("prefetch_stale")
+            prefetch.cache_key = None
+            if self._conditions:
+                self._conditions.invalidate_probes()
+
+    def _run_dag(self, workflow: Workflow):
+        """Run steps as soon as their dependencies finish, up to
+        max_parallel_steps at a time. Dependents of a failed step are skipped."""
+        steps = workflow.steps
+        total_steps = len(steps)
+        deps = workflow.dependency_graph()
+        has_dependents = {d for ds in deps.values() for d in ds}
+
+        pending = set(range(total_steps))
+        finished: set = set()
+        blocked: set = set()  # failed, or skipped because something upstream failed
+        running: Dict[Future, int] = {}
+
+        def run_step(i: int):
+            step = steps[i]
+            if not self._guard_passes(workflow, i, step):
+                return  # guard-skipped steps do not block dependents
+            self._execute_step(workflow, i, step, len(finished), total_steps)
+            # Cooldown before dependents are released
+            if i in has_dependents and step.delay_after > 0 and step.status != "failed":
+                with self._span(step.name, "cooldown"):
+                    self._countdown(step.delay_after, self._stopping)
+            self._unlock_project(i)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_parallel_steps),
+                                thread_name_prefix="workflow-step") as pool:
+            while (pending and not self._suspend_requested) or running:
+                ready = sorted(i for i in pending if all(d in finished for d in deps[i]))
+                if ready:
+                    # Hold back new work while paused; running steps still finish
+                    self._wait_while_paused()
+                if self._suspending():
+                    ready = []  # unstarted steps stay pending in the snapshot
+
+                for i in ready:
+                    pending.discard(i)
+                    step = steps[i]
+                    if i in self._resumed:
+                        finished.add(i)
+                        # Restored failures still block their dependents
+                        if step.status == "failed" or (
+                                step.status == "skipped" and any(d in blocked for d in deps[i])):
+                            blocked.add(i)
+                    elif self._cancel_requested or any(d in blocked for d in deps[i]):
+                        step.status = "skipped"
+                        blocked.add(i)
+                        finished.add(i)
+                    elif not step.enabled:
+                        step.status = "skipped"
+                        finished.add(i)
+                    else:
+                        running[pool.submit(run_step, i)] = i
+
+                if not running:
+                    continue
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    future.result()  # surface unexpected engine errors
+                    finished.add(i)
+                    if steps[i].status == "failed":
+                        blocked.add(i)
+
+    def _guard_passes(self, workflow: Workflow, index: int, step: WorkflowStep) -> bool:
+        """Evaluate the step's condition. False means the step is skipped
+        (or failed, if the condition itself errored) without contacting the editor."""
+        if not step.condition.strip():
+            return True
+        try:
+            passed = workflow.compiled_condition(step).evaluate(self._conditions)
+        except Exception as e:
+            step.status = "failed"
+            step.result = f"Condition error: {e}"
+            step.completed_at = datetime.now()
+            self._emit("error", index, step, step.result)
+            return False
+        if not passed:
+            step.status = "skipped"
+            step.result = f"Condition not met: {step.condition.strip()}"
+            self._bump("guard_skips")
+            logger.info(f"Step '{step.name}' skipped: condition not met")
+        return passed
+
+    def _execute_step(self, workflow: Workflow, index: int, step: WorkflowStep,
+                      progress_index: int, total_steps: int,
+                      prepared: Optional[StepPrefetch] = None):
+        """Send one step's prompt and record its outcome. `prepared` holds
+        the prompt and cache key if they were prefetched."""
+        self._current_step_index = index
+        step.status = "running"
+        step.started_at = datetime.now()
+
+        self._emit("step_start", index, step)
+
+        # Progress callback (fan-out children count as units of their own)
+        done, total = progress_index + self._extra_units, total_steps + self._extra_units
+        self._emit("progress", done, total, (done / total) * 100)
+
+        # Execute the prompt
+        with self._span(step.name, "resolve"):
+            resolved_prompt = prepared.prompt if prepared else workflow.resolve_prompt(step)
+        step_hash = prompt_hash(resolved_prompt)
+        self._journal_record("step_start", index=index, name=step.name, prompt_hash=step_hash)
+
+        try:
+            fingerprint = self._fingerprint(workflow, index, step, resolved_prompt)
+            result = self._previous_result(workflow, index, step, fingerprint)
+            reused = result is not None
+            if reused:
+                cache_key = None
+            elif prepared and prepared.cache_key is not None:
+                cache_key = prepared.cache_key
+            else:
+                cache_key = self._cache_key(workflow, step, resolved_prompt)
+            if cache_key:
+                result = self.result_cache.get(cache_key)
+                self._bump("cache_hits" if result is not None else "cache_misses")
+                if result is not None:
+                    logger.info(f"Step '{step.name}' served from result cache")
+
+            if result is None:
+                self._lock_project(workflow, index, step)
+            if result is None and step.workflow:
+                result = self._run_subworkflow(workflow, index, step, progress_index, total_steps)
+            elif result is None and step.foreach:
+                result = self._run_fanout(workflow, index, step, progress_index, total_steps)
+            elif result is None:
+                result = self._send_with_retry(workflow, index, step, resolved_prompt)
+                if cache_key:
+                    self.result_cache.put(cache_key, result or "Done")
+
+            step.status = "completed"
+            step.result = result or "Done"
+            step.completed_at = datetime.now()
+            self._journal_record("step_end", durable=True, index=index, name=step.name,
+                                 status=step.status, result=step.result, prompt_hash=step_hash)
+            if fingerprint and not reused:
+                self.step_ledger.record(workflow.name, index, step.name, fingerprint,
+                                        step.result, step.result_path)
+
+            self._emit("step_complete", index, step, step.result)
+
+        except StepCancelled as e:
+            timed_out = isinstance(e, StepTimeout)
+            if not timed_out and self._suspending():
+                # A sub-workflow cut short by suspend_to_disk(): the saved
+                # run starts this step again when restored
+                step.status, step.result, step.started_at = "pending", "", None
+                return
+            step.status = "failed" if timed_out else "skipped"
+            step.result = f"Step {e}" if timed_out else "Cancelled"
+            step.completed_at = datetime.now()
+            self._journal_record("step_end", durable=True, index=index, name=step.name,
+                                 status=step.status, result=step.result, prompt_hash=step_hash)
+            if timed_out:
+                self._emit("error", index, step, step.result)
+
+        except Exception as e:
+            step.status = "failed"
+            step.result = str(e)
+            step.completed_at = datetime.now()
+            self._journal_record("step_end", durable=True, index=index, name=step.name,
+                                 status=step.status, result=step.result, prompt_hash=step_hash)
+
+            self._emit("error", index, step, str(e))
+
+        self._record_history(workflow, index, step)
+
+        # The step may have changed the project; re-run probes next time
+        if self._conditions:
+            self._conditions.invalidate_probes()
+
+    def _run_child(self, workflow: Workflow, index: int, child: WorkflowStep, prompt: str,
+                   progress_index: int = 0, total_steps: int = 1, callers: tuple = ()):
+        """Run a fan-out item or a sub-workflow step and record the outcome
+        on `child`. Children emit no step_start/step_complete events; their
+        output streams under the parent's index."""
+        child.status = "running"
+        child.started_at = datetime.now()
+        try:
+            if child.workflow:
+                result = self._run_subworkflow(workflow, index, child, progress_index,
+                                               total_steps, callers)
+            elif child.foreach:
+                result = self._run_fanout(workflow, index, child, progress_index, total_steps)
+            else:
+                cache_key = self._cache_key(workflow, child, prompt)
+                result = self.result_cache.get(cache_key) if cache_key else None
+                if cache_key:
+                    self._bump("cache_hits" if result is not None else "cache_misses")
+                if result is None:
+                    result = self._send_with_retry(workflow, index, child, prompt)
+                    if cache_key:
+                        self.result_cache.put(cache_key, result or "Done")
+            child.status, child.result = "completed", result or "Done"
+        except StepCancelled as e:
+            timed_out = isinstance(e, StepTimeout)
+            child.status = "failed" if timed_out else "skipped"
+            child.result = f"Step {e}" if timed_out else "Cancelled"
+        except Exception as e:
+            child.status, child.result = "failed", str(e)
+        child.completed_at = datetime.now()
+        self._record_history(workflow, index, child)
+
+    def _run_fanout(self, workflow: Workflow, index: int, step: WorkflowStep,
+                    progress_index: int, total_steps: int) -> str:
+        """Run the step once per foreach item, step.max_parallel at a time,
+        and return the aggregated results. Raises FanoutError if any child
+        failed, StepCancelled if the run was cancelled part-way."""
+        items = expand_items(step.foreach, workflow.variables,
+                             workflow.variables.get("project_path"))
+        count = len(items)
+        step.children = [
+            WorkflowStep(f"{step.name} [{item}]", step.prompt, delay_after=0,
+                         cacheable=step.cacheable, retry=step.retry, timeout=step.timeout)
+            for item in items
+        ]
+        if not items:
+            return f"No items for '{step.foreach}'"
+        logger.info(f"Step '{step.name}' fans out over {count} items "
+                    f"({step.max_parallel} at a time)")
+        with self._lock:
+            first_unit = progress_index + self._extra_units
+            self._extra_units += count - 1
+        finished = [0]
+
+        def run_child(k: int):
+            child = step.children[k]
+            self._wait_while_paused()
+            if self._cancel_requested:
+                child.status, child.result = "skipped", "Cancelled"
+                return
+            with self._span(child.name, "resolve"):
+                prompt = workflow.resolve_prompt(step, item_variables(items[k], k, count))
+            self._run_child(workflow, index, child, prompt)
+
+            with self._lock:
+                finished[0] += 1
+                done, total = first_unit + finished[0], total_steps + self._extra_units
+            self._emit("progress", done, total, (done / total) * 100)
+
+        with ThreadPoolExecutor(max_workers=min(step.max_parallel, count),
+                                thread_name_prefix="workflow-item") as pool:
+            list(pool.map(run_child, range(count)))
+
+        step.attempts = sum(c.attempts for c in step.children)
+        statuses = [c.status for c in step.children]
+        report = aggregate_results(items, statuses, [c.result for c in step.children])
+        failed = statuses.count("failed")
+        if failed:
+            raise FanoutError(f"{failed}/{count} items failed\n\n{report}", failed, count)
+        if "skipped" in statuses:
+            raise StepCancelled()
+        return report
+
+    def _run_subworkflow(self, workflow: Workflow, index: int, step: WorkflowStep,
+                         progress_index: int, total_steps: int, callers: tuple = ()) -> str:
+        """Run the workflow named by step.workflow with scoped variables and
+        return its aggregated results. Raises FanoutError if a step failed.
+
+        Shared prefixes: each sub-step's result is remembered under a hash of
+        every resolved prompt up to it. A later sub-workflow in the same run
+        whose leading steps resolve to the same prompts reuses those results
+        instead of sending them again."""
+        callers = callers or (workflow.name,)
+        if step.workflow in callers:
+            raise ValueError(f"Sub-workflow cycle: {' → '.join(callers + (step.workflow,))}")
+        sub = self.resolve_workflow(step.workflow)
+        sub.variables.update(self._scoped_variables(workflow, step))
+        sub.compile_conditions()
+        order = sub.execution_order()
+        deps = sub.dependency_graph() if sub.is_dag else {}
+        step.children = sub.steps
+        project_path = sub.variables.get("project_path")
+        conditions = ConditionContext(sub.variables, sub.steps, project_path)
+        logger.info(f"Step '{step.name}' runs sub-workflow '{sub.name}' ({len(sub.steps)} steps)")
 
-    def _create_builtin_workflows(self) -> Dict[str, Workflow]:
-        """Create built-in preset workflows"""
-        workflows = {}
+        with self._lock:
+            first_unit = progress_index + self._extra_units
+            self._extra_units += len(sub.steps) - 1
+        chain = ""
+        sharing = True  # still inside a prefix shared with an earlier sub-workflow
+        failed: set = set()
+        for n, i in enumerate(order):
+            child = sub.steps[i]
+            self._wait_while_paused()
+            if self._suspending():
+                break  # the caller's step stays pending in the snapshot
+            if self._cancel_requested:
+                child.status, child.result = "skipped", "Cancelled"
+                continue
+            if not child.enabled or any(d in failed for d in deps.get(i, ())):
+                child.status = "skipped"
+                if child.enabled:
+                    failed.add(i)  # blocked: its dependents are skipped too
+                continue
+            if child.condition.strip():
+                try:
+                    passed = sub.compiled_condition(child).evaluate(conditions)
+                except Exception as e:
+                    child.status, child.result = "failed", f"Condition error: {e}"
+                    failed.add(i)
+                    continue
+                if not passed:
+                    child.status = "skipped"
+                    child.result = f"Condition not met: {child.condition.strip()}"
+                    self._bump("guard_skips")
+                    continue
+
+            with self._span(child.name, "resolve"):
+                prompt = sub.resolve_prompt(child)
+            chain = prompt_hash(chain + prompt)
+            shared = self._prefix_results.get(chain) if sharing else None
+            if shared is not None:
+                child.status, child.result = "completed", shared
+                child.started_at = child.completed_at = datetime.now()
+                self._bump("prefix_reuses")
+                logger.info(f"Step '{child.name}' of '{sub.name}' reuses a shared prefix result")
+            else:
+                sharing = False
+                self._run_child(sub, index, child, prompt, first_unit + n, total_steps,
+                                callers + (sub.name,))
+                if child.status == "completed" and not child.workflow:
+                    with self._lock:
+                        self._prefix_results.setdefault(chain, child.result)
+            conditions.invalidate_probes()
+            if child.status == "failed":
+                failed.add(i)
+
+            done, total = first_unit + n + 1, total_steps + self._extra_units
+            self._emit("progress", done, total, (done / total) * 100)
+            if (shared is None and child.status == "completed" and child.delay_after > 0
+                    and n < len(order) - 1):
+                with self._span(child.name, "cooldown"):
+                    self._countdown(child.delay_after, self._stopping)
+
+        statuses = [s.status for s in sub.steps]
+        report = aggregate_results([s.name for s in sub.steps], statuses,
+                                   [s.result for s in sub.steps])
+        if failed:
+            count = statuses.count("failed")
+            raise FanoutError(f"{count}/{len(sub.steps)} steps of '{sub.name}' failed\n\n{report}",
+                              count, len(sub.steps))
+        if self._cancel_requested or self._suspending():
+            raise StepCancelled("suspended" if self._suspending() else "cancelled")
+        return report
+
+    def _scoped_variables(self, workflow: Workflow, step: WorkflowStep) -> Dict[str, Any]:
+        """The caller's project_path plus step.workflow_vars rendered against
+        the caller's variables. A value that is exactly "{name}" passes the
+        caller's value through unchanged (lists stay lists)."""
+        scoped: Dict[str, Any] = {}
+        if "project_path" in workflow.variables:
+            scoped["project_path"] = workflow.variables["project_path"]
+        for key, value in step.workflow_vars.items():
+            if isinstance(value, str):
+                name = value[1:-1] if value.startswith("{") and value.endswith("}") else None
+                if name in workflow.variables:
+                    value = workflow.variables[name]
+                else:
+                    value = PromptTemplate(value).render(workflow.variables)
+            scoped[key] = value
+        return scoped
+
+    def resolve_workflow(self, name: str) -> Workflow:
+        """A private copy of the workflow `name` refers to: one in
+        workflow_registry, one found by workflow_resolver, a built-in, or a
+        workflow JSON file path"""
+        source = self.workflow_registry.get(name)
+        if source is None and self.workflow_resolver:
+            source = self.workflow_resolver(name)
+        if source is None:
+            source = self.builtin_workflow(name)
+        if source is None and os.path.isfile(name):
+            source = self.load_workflow(name)
+        if source is None:
+            raise ValueError(f"Unknown sub-workflow '{name}'")
+        return source.copy()
+
+    def _send_with_retry(self, workflow: Workflow, index: int, step: WorkflowStep,
+                         prompt: str) -> str:
+        """Send a step, retrying with backoff per its policy. Re-raises the
+        last error once attempts run out or the circuit breaker opens.
+        Each attempt gets its own CancelToken bounded by step.timeout."""
+        policy = step.retry or workflow.retry or self.retry_policy
+        attempt = 0
+        with self._lock:
+            handoff_from, self._handoff_from = self._handoff_from, None
+        if handoff_from is not None:
+            self._observe_handoff(step, handoff_from)
+        while True:
+            attempt += 1
+            step.attempts = attempt
+            token = self._run_token.child(step.timeout)
+            try:
+                with self._send_slot(token), self._editor_turn(workflow, step):
+                    started = time.monotonic()
+                    raw = (self._send_remote(workflow, step, prompt, token) if self.step_queue
+                           else self._send(prompt, token))
+                    result = self._collect_output(index, step, raw, started, token)
+            except StepCancelled as e:
+                if not isinstance(e, StepTimeout):
+                    raise  # cancelled by the user, not a failure
+                if self._cancel_requested:
+                    raise StepCancelled() from e
+                error: Exception = e
+            except Exception as e:
+                error = e
+            else:
+                self._breaker.record_success()
+                return result
+
+            if self._breaker.record_failure():
+                self._trip_breaker(workflow, error)
+            if attempt >= policy.max_attempts or self._breaker.is_open or self._cancel_requested:
+                raise error
+            delay = policy.delay(attempt)
+            self._bump("retries")
+            logger.warning(f"Step '{step.name}' attempt {attempt} failed ({error}); "
+                           f"retrying in {delay:.1f}s")
+            self._journal_record("step_retry", index=index, name=step.name,
+                                 attempt=attempt, error=str(error))
+            with self._span(step.name, "backoff"):
+                self._clock.countdown(delay, interrupted=lambda: self._cancel_requested,
+                                      paused=lambda: self._paused)
+            if self._cancel_requested:
+                raise error
+
+    def _lock_project(self, workflow: Workflow, index: int, step: WorkflowStep):
+        """Lock the step's paths in project_path before it changes anything
+        (no-op without project_locks). Released by _unlock_project()."""
+        project_path = workflow.variables.get("project_path")
+        if self.project_locks is None or not project_path or index in self._step_locks:
+            return
+        paths = None
+        if step.touches is not None:
+            paths = [PromptTemplate(path).render(workflow.variables) for path in step.touches]
+        owner = f"{workflow.name} / {step.name}"
+        with self._span(step.name, "lock"):
+            lock = self.project_locks.acquire(project_path, owner, paths, shared=step.read_only,
+                                              token=self._run_token,
+                                              on_wait=lambda holders: self._bump("lock_waits"))
+        with self._lock:
+            self._stats["lock_wait_s"] += lock.waited
+            self._step_locks[index] = lock
+            if self._handoff_from is not None:
+                self._handoff_from += lock.waited  # waiting on another run is not handoff
 
-        # === Full Feature Development ===
+    def _unlock_project(self, index: Optional[int] = None):
+        """Release a step's project lock, or every held one"""
+        with self._lock:
+            if index is None:
+                locks = list(self._step_locks.values())
+                self._step_locks.clear()
+            else:
+                lock = self._step_locks.pop(index, None)
+                locks = [lock] if lock else []
+        for lock in locks:
+            lock.release()
+
+    @contextmanager
+    def _send_slot(self, token: CancelToken):
+        """Hold one of the editor's max_concurrent_sends slots"""
+        slots = self._send_slots
+        if slots is None:
+            yield
+            return
+        while not slots.acquire(timeout=0.25):
+            token.check()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @contextmanager
+    def _editor_turn(self, workflow: Workflow, step: WorkflowStep):
+        """Wait for this run's turn at the shared editor (see workflow_dispatcher).
+        The run keeps the editor through the step's cooldown unless
+        something more urgent is queued."""
+        if self.dispatcher is None or self.step_queue is not None:
+            yield  # queue workers own their editors
+            return
+        run = self._current_workflow or workflow  # sub-workflows queue as their caller
+        name = run.name
+        priority = run.priority if run.priority is not None else self.priority
+        with self._span(step.name, "queue"):
+            self.dispatcher.acquire(self.dispatch_target, name, step.name, priority,
+                                    self._run_token, self._dispatch_owner)
+        try:
+            yield
+        finally:
+            self.dispatcher.release(self.dispatch_target, name, priority,
+                                    reserve=step.delay_after, owner=self._dispatch_owner)
+
+    def _trip_breaker(self, workflow: Workflow, error: Exception):
+        """Too many consecutive send failures: stop hammering the editor"""
+        self._bump("breaker_trips")
+        message = (f"circuit open after {self._breaker.consecutive_failures} "
+                   f"consecutive send failures: {error}")
+        logger.error(f"Workflow '{workflow.name}' {message}")
+        if self.breaker_action == "suspend":
+            # Half-open on resume: the next attempt decides
+            self._breaker.reset()
+            with self._lock:
+                self._paused = True
+            self._clock.notify()
+            self._emit("workflow_done", workflow, f"suspended: {message}")
+        else:
+            with self._lock:
+                self._halt_reason = message
+                self._cancel_requested = True
+            self._run_token.cancel("halted")
+            self._clock.notify()
+
+    def _send(self, prompt: str, token: Optional[CancelToken] = None) -> Any:
+        """Hand a resolved prompt to the configured editor bridge.
+        Send functions that take a `token` keyword get the step's CancelToken."""
+        # Auto-interact: send prompt AND wait for AI to finish
+        fn = self.send_and_wait_fn or self.send_prompt_fn
+        if fn is None:
+            return f"[Dry Run] Prompt queued: {prompt[:80]}..."
+        if token is not None and _accepts_token(fn):
+            return fn(prompt, token=token)
+        return fn(prompt)
+
+    def _send_remote(self, workflow: Workflow, step: WorkflowStep, prompt: str,
+                     token: CancelToken) -> str:
+        """Publish the prompt to the step queue and wait for a worker's result"""
+        run = self._current_workflow or workflow
+        priority = run.priority if run.priority is not None else self.priority
+        run_id = self._tracer.run_id if self._tracer else ""
+        task_id = self.step_queue.publish(run_id, run.name, step.name, prompt,
+                                          self.queue_target, priority)
+        return self.step_queue.wait_result(task_id, token)
+
+    def _collect_output(self, index: int, step: WorkflowStep, raw: Any, started: float,
+                        token: Optional[CancelToken] = None) -> str:
+        """Drain a plain or streamed result into bounded memory.
+
+        Timing: a plain result is one span ('wait' for send_and_wait_fn,
+        'send' otherwise). For a stream, 'send' lasts until the first chunk
+        (the prompt has been typed) and 'wait' until the stream ends.
+        Streams are also checked against `token` between chunks, which
+        bounds send functions that do not take a token themselves."""
+        output = StepOutput(self.output_dir, self.result_spill_chars, label=step.name)
+        if raw is None or isinstance(raw, str):
+            output.write(raw or "")
+            phase = "wait" if self.send_and_wait_fn or self.step_queue else "send"
+            self._trace(step.name, phase, started, time.monotonic())
+        else:
+            first_chunk = None
+            for chunk in raw:
+                if token is not None and token.cancelled:
+                    if hasattr(raw, "close"):
+                        raw.close()
+                    token.check()
+                if first_chunk is None:
+                    first_chunk = time.monotonic()
+                    self._trace(step.name, "send", started, first_chunk)
+                chunk = str(chunk)
+                output.write(chunk)
+                for piece in split_chunks(chunk, self.max_output_chunk):
+                    self._emit("step_output", index, step, piece)
+            self._trace(step.name, "wait", first_chunk or started, time.monotonic())
+        step.result_path = str(output.path) if output.path else None
+        return output.finish()
+
+    def _trace(self, step_name: str, phase: str, start: float, end: float):
+        if self._tracer:
+            self._tracer.add(step_name, phase, start, end, iteration=self._iteration)
+
+    @contextmanager
+    def _span(self, step_name: str, phase: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._trace(step_name, phase, start, time.monotonic())
+
+    def _trace_path(self, tracer: RunTracer) -> str:
+        safe_name = safe_file_name(tracer.workflow)
+        part = f".{self._resumes}" if self._resumes else ""  # restored runs keep their id
+        return os.path.join(self.trace_dir, f"{safe_name}__{tracer.run_id}{part}.jsonl")
+
+    def _flush_trace(self):
+        """End of a loop iteration: append its spans to the trace, fold them
+        into the metrics file and drop them, so looping runs export as they
+        go and hold only the current iteration's spans"""
+        tracer = self._tracer
+        if tracer is None:
+            return
+        spans = tracer.drain()
+        for span in spans:
+            self.metrics.observe(tracer.workflow, span.step, span.phase, span.duration)
+        try:
+            if self.trace_dir:
+                tracer.write_jsonl(self._trace_path(tracer), spans, append=True)
+            if self.metrics_path:
+                self.metrics.write(self.metrics_path)
+        except OSError as e:
+            logger.warning(f"Could not export run metrics: {e}")
+
+    def _finish_trace(self, status: str):
+        """Write the rest of the run's trace and fold it into the metrics file"""
+        tracer = self._tracer
+        if tracer is None:
+            return
+        self.metrics.observe_run(tracer, status)  # spans not flushed yet, plus the run
+        try:
+            if self.trace_dir:
+                tracer.write_jsonl(self._trace_path(tracer), append=True)
+            if self.metrics_path:
+                self.metrics.write(self.metrics_path)
+        except OSError as e:
+            logger.warning(f"Could not export run metrics: {e}")
+
+    def _record_history(self, workflow: Workflow, index: int, step: WorkflowStep):
+        if not (self.history and self._tracer):
+            return
+        self.history.record_step(
+            self._tracer.run_id, workflow.name, step.name, index, step.status,
+            result=step.result, iteration=self._iteration, attempts=max(1, step.attempts),
+            started_at=step.started_at.timestamp() if step.started_at else None,
+            finished_at=step.completed_at.timestamp() if step.completed_at else None,
+            result_path=step.result_path,
+        )
+
+    def _fingerprint(self, workflow: Workflow, index: int, step: WorkflowStep,
+                     prompt: str) -> Optional[str]:
+        """The step's ledger fingerprint for this run (None without a ledger).
+        Upstream steps contribute their own fingerprint and result, so a
+        change anywhere upstream changes every fingerprint below it."""
+        if self.step_ledger is None:
+            return None
+        upstream = []
+        for d in workflow.dependency_graph()[index]:
+            dep = workflow.steps[d]
+            upstream.append(f"{self._fingerprints.get(d, dep.status)}:{prompt_hash(dep.result or '')}")
+        extra = ""
+        try:
+            if step.foreach:
+                extra = json.dumps(expand_items(step.foreach, workflow.variables,
+                                                workflow.variables.get("project_path")))
+            elif step.workflow:
+                sub = self.resolve_workflow(step.workflow)
+                extra = json.dumps([[s.to_dict() for s in sub.steps],
+                                    self._scoped_variables(workflow, step)], default=str)
+        except (OSError, ValueError) as e:
+            extra = f"error: {e}"  # the step will fail the same way when run
+        fingerprint = step_fingerprint(step.to_dict(), prompt, upstream, extra)
+        self._fingerprints[index] = fingerprint
+        return fingerprint
+
+    def _previous_result(self, workflow: Workflow, index: int, step: WorkflowStep,
+                         fingerprint: Optional[str]) -> Optional[str]:
+        """The ledger's result for an unchanged step, in incremental runs"""
+        if not (fingerprint and self.incremental) or self.loop_mode:
+            return None
+        entry = self.step_ledger.lookup(workflow.name, index, step.name, fingerprint)
+        if entry is None:
+            return None
+        result_path = entry.get("result_path")
+        step.result_path = result_path if result_path and os.path.isfile(result_path) else None
+        self._bump("reused_steps")
+        logger.info(f"Step '{step.name}' unchanged since its last run; reusing its result")
+        return entry["result"]
+
+    def _tree_state(self, workflow: Workflow) -> Optional[str]:
+        """git tree state of the workflow's project, else its mtime index"""
+        project_path = workflow.variables.get("project_path")
+        return project_fingerprint(project_path or "", self.fingerprint_method)
+
+    def _cache_key(self, workflow: Workflow, step: WorkflowStep, prompt: str,
+                   tree_state: Optional[str] = None) -> Optional[str]:
+        if not (step.cacheable and self.result_cache) or step.foreach or step.workflow:
+            return None
+        # Without a fingerprint the project's state is unknown and a stored
+        # result could be stale, so no caching
+        tree_state = tree_state or self._tree_state(workflow)
+        if tree_state is None:
+            return None
+        return StepResultCache.make_key(prompt, self.cache_scope, tree_state)
+
+    def _builtin_full_feature_dev(self) -> Workflow:
+        """Full Feature Development"""
         wf = Workflow(
             name="Full Feature Dev",
             description="End-to-end feature development: analyze → model → UI → state → test"
@@ -437,9 +1864,10 @@ class WorkflowEngine:
             ),
             delay_after=2.0,
         ))
-        workflows["Full Feature Dev"] = wf
+        return wf
 
-        # === Bug Fix & Test ===
+    def _builtin_bug_fix_test(self) -> Workflow:
+        """Bug Fix & Test"""
         wf2 = Workflow(
             name="Bug Fix & Test",
             description="Diagnose a bug, fix it, write a regression test, and verify"
@@ -485,9 +1913,10 @@ class WorkflowEngine:
             ),
             delay_after=2.0,
         ))
-        workflows["Bug Fix & Test"] = wf2
+        return wf2
 
-        # === Code Review & Refactor ===
+    def _builtin_code_review_refactor(self) -> Workflow:
+        """Code Review & Refactor"""
         wf3 = Workflow(
             name="Code Review & Refactor",
             description="Deep code review, identify improvements, refactor, and verify"
@@ -539,9 +1968,10 @@ class WorkflowEngine:
             ),
             delay_after=2.0,
         ))
-        workflows["Code Review & Refactor"] = wf3
+        return wf3
 
-        # === Analyze, Fix & Sync ===
+    def _builtin_analyze_fix_sync(self) -> Workflow:
+        """Analyze, Fix & Sync"""
         wf4 = Workflow(
             name="Analyze, Fix & Sync",
             description="Deep project maintenance: analyze → organize → GitHub sync"
@@ -581,9 +2011,10 @@ class WorkflowEngine:
             ),
             delay_after=5.0,
         ))
-        workflows["Analyze, Fix & Sync"] = wf4
+        return wf4
 
-        # === Autonomous Feature Architect ===
+    def _builtin_autonomous_feature_architect(self) -> Workflow:
+        """Autonomous Feature Architect"""
         wf5 = Workflow(
             name="Autonomous Feature Architect",
             description="End-to-end full-stack development: discovery → implementation → test → deploy"
@@ -666,9 +2097,10 @@ class WorkflowEngine:
             ),
             delay_after=5.0,
         ))
-        workflows["Autonomous Feature Architect"] = wf5
+        return wf5
 
-        # === The Executive Developer ===
+    def _builtin_the_executive_developer(self) -> Workflow:
+        """The Executive Developer"""
         wf6 = Workflow(
             name="The Executive Developer",
             description="High-level project management: Logic → UI → Git → Build"
@@ -708,16 +2140,17 @@ class WorkflowEngine:
             ),
             delay_after=10.0,
         ))
-        workflows["The Executive Developer"] = wf6
+        return wf6
 
-        # === Enterprise Solution Architect ===
+    def _builtin_enterprise_solution_architect(self) -> Workflow:
+        """Enterprise Solution Architect"""
         wf7 = Workflow(
             name="Enterprise Solution Architect",
             description="High-governance architecture, security, and stability enforcement"
         )
         
-        # Define the base enterprise instruction
-        ent_base = (
+        # The enterprise charter opens every prompt; kept once as a variable
+        wf7.variables["enterprise_charter"] = (
             "You are acting as:\n"
             "- Enterprise Software Architect\n"
             "- Flutter Desktop Technical Lead\n"
@@ -730,7 +2163,7 @@ class WorkflowEngine:
         wf7.add_step(WorkflowStep(
             name="1. Enterprise Audit & Scorecard",
             prompt=(
-                f"{ent_base}\n\n"
+                "{enterprise_charter}\n\n"
                 "=========================================================\n"
                 "STEP 1: ARCHITECTURE, SECURITY & EXTERNAL AUDIT\n"
                 "=========================================================\n"
@@ -747,7 +2180,7 @@ class WorkflowEngine:
         wf7.add_step(WorkflowStep(
             name="2. Governed Implementation & Quality",
             prompt=(
-                f"{ent_base}\n\n"
+                "{enterprise_charter}\n\n"
                 "=========================================================\n"
                 "STEP 2: IMPLEMENTATION & CODE QUALITY ENFORCEMENT\n"
                 "=========================================================\n"
@@ -763,7 +2196,7 @@ class WorkflowEngine:
         wf7.add_step(WorkflowStep(
             name="3. Stability & Hardening",
             prompt=(
-                f"{ent_base}\n\n"
+                "{enterprise_charter}\n\n"
                 "=========================================================\n"
                 "STEP 3: WINDOWS STABILITY & SECURITY MITIGATION\n"
                 "=========================================================\n"
@@ -778,7 +2211,7 @@ class WorkflowEngine:
         wf7.add_step(WorkflowStep(
             name="4. Documentation & Git Registry",
             prompt=(
-                f"{ent_base}\n\n"
+                "{enterprise_charter}\n\n"
                 "=========================================================\n"
                 "STEP 4: GIT GOVERNANCE & DOCUMENTATION\n"
                 "=========================================================\n"
@@ -790,9 +2223,7 @@ class WorkflowEngine:
             delay_after=10.0,
         ))
         
-        workflows["Enterprise Solution Architect"] = wf7
-
-        return workflows
+        return wf7
 
     def save_workflow(self, workflow: Workflow, save_dir: str) -> str:
         """Save a workflow to a JSON file"""
@@ -825,6 +2256,15 @@ class WorkflowEngine:
 
 
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        # Headless runner: python -m workflow_engine run <file.json> ...
+        # Register this module under its real name so the CLI does not import it twice.
+        sys.modules.setdefault("workflow_engine", sys.modules[__name__])
+        from workflow_cli import main
+        sys.exit(main())
+
     # Quick self-test
     engine = WorkflowEngine()
     print(f"✅ WorkflowEngine loaded with {len(engine.builtin_workflows)} built-in workflows:")
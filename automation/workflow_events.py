@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Workflow Events — queued dispatch of engine callbacks.
+
+The engine publishes events into a bounded queue and normally returns
+immediately; one dispatcher thread delivers them to subscribers in order.
+High-frequency events (progress, loop countdown) are coalesced: a newer
+value replaces a pending one, so a slow subscriber sees the latest state
+instead of a backlog.
+Lifecycle events are never dropped: once `max_pending` events are waiting,
+publishing them blocks until the dispatcher catches up.
+
+The dispatcher thread exits after `idle_timeout` seconds without events, or
+once the queue drains after close(); the next publish starts a new one.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only the latest pending value matters
+COALESCED_EVENTS = frozenset({"progress", "loop_wait"})
+
+# May be dropped when the queue is full; lifecycle events never are
+LOSSY_EVENTS = frozenset({"step_output"})
+
+
+class _Entry:
+    __slots__ = ("event", "args", "live")
+
+    def __init__(self, event: str, args: tuple):
+        self.event = event
+        self.args = args
+        self.live = True
+
+
+class EventBus:
+    """Bounded publish/subscribe queue with a single dispatcher thread"""
+
+    def __init__(self, max_pending: int = 1000,
+                 coalesced: frozenset = COALESCED_EVENTS,
+                 lossy: frozenset = LOSSY_EVENTS, idle_timeout: float = 30.0):
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.coalesced = coalesced
+        self.lossy = lossy
+        self._subscribers: Dict[str, List[Callable[..., None]]] = {}
+        self._queue: deque = deque()
+        self._latest: Dict[str, _Entry] = {}  # coalesced event -> pending entry
+        self._pending = 0
+        self._busy = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        self.published = 0
+        self.delivered = 0
+        self.coalesced_count = 0
+        self.dropped = 0
+        self.handler_errors = 0
+
+    # ═══════════════════════════════════════════════════
+    # SUBSCRIPTIONS
+    # ═══════════════════════════════════════════════════
+    def subscribe(self, event: str, handler: Callable[..., None]):
+        with self._cond:
+            self._subscribers.setdefault(event, []).append(handler)
+
+    def unsubscribe(self, event: str, handler: Callable[..., None]):
+        with self._cond:
+            handlers = self._subscribers.get(event, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    # ═══════════════════════════════════════════════════
+    # PUBLISHING
+    # ═══════════════════════════════════════════════════
+    def publish(self, event: str, *args: Any):
+        """Queue an event. Coalesced and lossy events never wait; any other
+        event blocks while `max_pending` events are queued, until the
+        dispatcher catches up (not when published from a handler)."""
+        with self._cond:
+            self.published += 1
+            if event in self.coalesced:
+                previous = self._latest.get(event)
+                if previous is not None:
+                    # Retire the old slot and requeue at the tail, so the
+                    # latest value keeps its place relative to other events
+                    previous.live = False
+                    self._pending -= 1
+                    self.coalesced_count += 1
+            elif event in self.lossy and self._pending >= self.max_pending:
+                self.dropped += 1
+                return
+            elif threading.current_thread() is not self._thread:
+                # Backpressure; a handler publishing from the dispatcher never waits
+                while self._pending >= self.max_pending:
+                    self._ensure_thread()
+                    self._cond.wait(0.5)
+
+            entry = _Entry(event, args)
+            self._queue.append(entry)
+            self._pending += 1
+            if event in self.coalesced:
+                self._latest[event] = entry
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event has been delivered"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, wait: bool = True, timeout: Optional[float] = None):
+        """Stop the dispatcher thread once queued events are delivered.
+        Publishing afterwards starts a new one."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "published": self.published,
+                "delivered": self.delivered,
+                "coalesced": self.coalesced_count,
+                "dropped": self.dropped,
+                "handler_errors": self.handler_errors,
+                "pending": self._pending,
+            }
+
+    # ═══════════════════════════════════════════════════
+    # DISPATCH
+    # ═══════════════════════════════════════════════════
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch_loop,
+                                            name="workflow-events", daemon=True)
+            self._thread.start()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                while not self._queue:
+                    if self._closing or not self._cond.wait(self.idle_timeout):
+                        if not self._queue:
+                            # Decided under the lock: publish() sees no thread and starts one
+                            self._closing = False
+                            self._thread = None
+                            return
+                entry = self._queue.popleft()
+                if not entry.live:
+                    continue
+                self._pending -= 1
+                if self._latest.get(entry.event) is entry:
+                    del self._latest[entry.event]
+                handlers = list(self._subscribers.get(entry.event, ()))
+                self._busy = True
+
+            errors = 0
+            for handler in handlers:
+                try:
+                    handler(*entry.args)
+                except Exception as e:
+                    errors += 1
+                    logger.debug(f"Event handler for '{entry.event}' failed: {e}")
+            with self._cond:
+                self.delivered += 1
+                self.handler_errors += errors
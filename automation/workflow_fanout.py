@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Fan-out Steps — one step template applied to every item of a list.
+
+A step with `foreach` set expands into one child invocation per item. The
+items come from a workflow variable holding a list (or a comma/newline
+separated string), or from a glob under the project:
+
+    step.foreach = "screens"
+    workflow.variables["screens"] = ["home", "profile", "settings"]
+    workflow.variables["screens"] = "glob:lib/screens/*.dart"
+    step.foreach = "glob:lib/screens/**/*_screen.dart"
+
+Each child sees `{item}`, `{item_name}` (file stem of the item),
+`{item_index}` (1-based) and `{item_count}` in the prompt.
+"""
+
+import glob
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+GLOB_PREFIX = "glob:"
+
+
+class FanoutError(Exception):
+    """Some children of a fan-out step failed; str() is the aggregated report"""
+
+    def __init__(self, report: str, failed: int, total: int):
+        super().__init__(report)
+        self.failed = failed
+        self.total = total
+
+
+def expand_items(spec: str, variables: Mapping[str, Any],
+                 project_path: Optional[str] = None) -> List[str]:
+    """Resolve a step's `foreach` spec to its list of items.
+    Raises ValueError if it names a variable that does not exist."""
+    spec = spec.strip()
+    if not spec.startswith(GLOB_PREFIX):
+        if spec not in variables:
+            raise ValueError(f"foreach variable '{spec}' is not set")
+        spec = variables[spec]
+    return _items_from_value(spec, project_path)
+
+
+def _items_from_value(value: Any, project_path: Optional[str]) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if str(v).strip()]
+    text = str(value).strip()
+    if text.startswith(GLOB_PREFIX):
+        return discover_files(text[len(GLOB_PREFIX):].strip(), project_path)
+    separator = "\n" if "\n" in text else ","
+    return [part.strip() for part in text.split(separator) if part.strip()]
+
+
+def discover_files(pattern: str, project_path: Optional[str] = None) -> List[str]:
+    """Files matching `pattern` (relative to project_path), as sorted
+    forward-slash paths relative to the project"""
+    root = Path(project_path or os.getcwd())
+    matches = glob.glob(str(root / pattern), recursive=True)
+    return sorted(Path(m).relative_to(root).as_posix() for m in matches if os.path.isfile(m))
+
+
+def item_variables(item: str, index: int, count: int) -> Dict[str, str]:
+    """Template variables for child `index` (0-based) of `count`"""
+    return {
+        "item": item,
+        "item_name": Path(item).stem or item,
+        "item_index": str(index + 1),
+        "item_count": str(count),
+    }
+
+
+def aggregate_results(items: List[str], statuses: List[str], results: List[str]) -> str:
+    """One section per child, in item order"""
+    sections = []
+    for i, (item, status, result) in enumerate(zip(items, statuses, results)):
+        mark = {"completed": "✅", "failed": "❌"}.get(status, "⏭")
+        sections.append(f"{mark} [{i + 1}/{len(items)}] {item}\n{result}".rstrip())
+    return "\n\n".join(sections)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Workflow History — every run and step stored in a local SQLite database.
+
+The engine only enqueues records; one writer thread batches them into WAL
+transactions, so a run never waits on disk. Results longer than
+`inline_limit` are stored out of line (the `outputs` table) and the step
+row keeps a preview.
+
+    python workflow_history.py --db workflows/history.db slowest --days 7
+    python workflow_history.py --db workflows/history.db failures --days 30
+    python workflow_history.py --db workflows/history.db runs --workflow "Full Feature Dev"
+"""
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          TEXT PRIMARY KEY,
+    workflow    TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    duration    REAL,
+    summary     TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_workflow_time ON runs (workflow, started_at);
+CREATE INDEX IF NOT EXISTS runs_status_time ON runs (status, started_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (started_at);
+
+CREATE TABLE IF NOT EXISTS steps (
+    id          INTEGER PRIMARY KEY,
+    run_id      TEXT NOT NULL REFERENCES runs (id),
+    workflow    TEXT NOT NULL,
+    step        TEXT NOT NULL,
+    step_index  INTEGER NOT NULL,
+    iteration   INTEGER NOT NULL DEFAULT 0,
+    status      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 1,
+    started_at  REAL,
+    finished_at REAL,
+    duration    REAL,
+    result      TEXT,
+    output_id   INTEGER REFERENCES outputs (id),
+    result_path TEXT
+);
+CREATE INDEX IF NOT EXISTS steps_run ON steps (run_id);
+CREATE INDEX IF NOT EXISTS steps_workflow_step_time ON steps (workflow, step, started_at);
+CREATE INDEX IF NOT EXISTS steps_status_time ON steps (status, started_at);
+CREATE INDEX IF NOT EXISTS steps_time ON steps (started_at);
+
+CREATE TABLE IF NOT EXISTS outputs (
+    id   INTEGER PRIMARY KEY,
+    body TEXT NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+class RunHistory:
+    """Asynchronous writer plus synchronous query API over one database file"""
+
+    def __init__(self, db_path: str, inline_limit: int = 8 * 1024, batch_size: int = 256):
+        self.db_path = str(db_path)
+        self.inline_limit = inline_limit
+        self.batch_size = batch_size
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="workflow-history",
+                                        daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL: durable at checkpoint, never corrupt
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ═══════════════════════════════════════════════════
+    # RECORDING (non-blocking)
+    # ═══════════════════════════════════════════════════
+    def record_run_start(self, run_id: str, workflow: str, started_at: Optional[float] = None):
+        self._queue.put(("run_start", (run_id, workflow, started_at or time.time())))
+
+    def record_step(self, run_id: str, workflow: str, step: str, step_index: int,
+                    status: str, result: str = "", iteration: int = 0, attempts: int = 1,
+                    started_at: Optional[float] = None, finished_at: Optional[float] = None,
+                    result_path: Optional[str] = None):
+        duration = (finished_at - started_at) if started_at and finished_at else None
+        self._queue.put(("step", (run_id, workflow, step, step_index, iteration, status, attempts,
+                                  started_at, finished_at, duration, result or "", result_path)))
+
+    def record_run_end(self, run_id: str, status: str, summary: Optional[Dict[str, Any]] = None,
+                       finished_at: Optional[float] = None):
+        self._queue.put(("run_end", (run_id, status, finished_at or time.time(),
+                                     json.dumps(summary or {}, default=str))))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put((_STOP, None))
+            self._writer.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = self._apply(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, batch: list) -> bool:
+        stop = False
+        waiters = []
+        try:
+            with conn:
+                for kind, payload in batch:
+                    if kind is _STOP:
+                        stop = True
+                    elif kind == "flush":
+                        waiters.append(payload)
+                    elif kind == "run_start":
+                        conn.execute(
+                            "INSERT OR IGNORE INTO runs (id, workflow, status, started_at) "
+                            "VALUES (?, ?, 'running', ?)", payload)
+                    elif kind == "step":
+                        self._insert_step(conn, payload)
+                    elif kind == "run_end":
+                        run_id, status, finished_at, summary = payload
+                        conn.execute(
+                            "UPDATE runs SET status = ?, finished_at = ?, "
+                            "duration = ? - started_at, summary = ? WHERE id = ?",
+                            (status, finished_at, finished_at, summary, run_id))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write run history: {e}")
+        for waiter in waiters:
+            waiter.set()
+        return stop
+
+    def _insert_step(self, conn: sqlite3.Connection, payload: tuple):
+        *head, result, result_path = payload
+        output_id = None
+        if len(result) > self.inline_limit:
+            output_id = conn.execute("INSERT INTO outputs (body) VALUES (?)", (result,)).lastrowid
+            result = result[:self.inline_limit]
+        conn.execute(
+            "INSERT INTO steps (run_id, workflow, step, step_index, iteration, status, attempts, "
+            "started_at, finished_at, duration, result, output_id, result_path) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*head, result, output_id, result_path))
+
+    # ═══════════════════════════════════════════════════
+    # QUERIES
+    # ═══════════════════════════════════════════════════
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    @staticmethod
+    def _since(days: float) -> float:
+        return time.time() - days * 86400
+
+    def slowest_steps(self, days: float = 7, limit: int = 10,
+                      workflow: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Steps ranked by average duration over the last `days`"""
+        sql = ("SELECT workflow, step, COUNT(*) AS runs, AVG(duration) AS avg_s, "
+               "MAX(duration) AS max_s FROM steps "
+               "WHERE started_at >= ? AND duration IS NOT NULL")
+        params: list = [self._since(days)]
+        if workflow:
+            sql += " AND workflow = ?"
+            params.append(workflow)
+        sql += " GROUP BY workflow, step ORDER BY avg_s DESC LIMIT ?"
+        params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def failure_rates(self, days: float = 7, workflow: Optional[str] = None,
+                      min_runs: int = 1) -> List[Dict[str, Any]]:
+        """Per-step failure rate over the last `days`, worst first"""
+        sql = ("SELECT workflow, step, COUNT(*) AS runs, "
+               "SUM(status = 'failed') AS failures, "
+               "ROUND(1.0 * SUM(status = 'failed') / COUNT(*), 4) AS failure_rate "
+               "FROM steps WHERE started_at >= ? AND status IN ('completed', 'failed')")
+        params: list = [self._since(days)]
+        if workflow:
+            sql += " AND workflow = ?"
+            params.append(workflow)
+        sql += " GROUP BY workflow, step HAVING COUNT(*) >= ? ORDER BY failure_rate DESC, runs DESC"
+        params.append(min_runs)
+        return self._query(sql, tuple(params))
+
+    def recent_runs(self, limit: int = 20, workflow: Optional[str] = None,
+                    status: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT id, workflow, status, started_at, finished_at, duration FROM runs"
+        clauses, params = [], []
+        if workflow:
+            clauses.append("workflow = ?")
+            params.append(workflow)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def run_steps(self, run_id: str) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT id, step, step_index, iteration, status, attempts, started_at, duration, "
+            "result, output_id IS NOT NULL AS truncated, result_path "
+            "FROM steps WHERE run_id = ? ORDER BY started_at, step_index", (run_id,))
+
+    def step_result(self, step_id: int) -> Optional[str]:
+        """Full result of one step, including out-of-line output"""
+        rows = self._query(
+            "SELECT COALESCE(o.body, s.result) AS body FROM steps s "
+            "LEFT JOIN outputs o ON o.id = s.output_id WHERE s.id = ?", (step_id,))
+        return rows[0]["body"] if rows else None
+
+
+# ═══════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════
+def _print_table(rows: List[Dict[str, Any]]):
+    if not rows:
+        print("(no rows)")
+        return
+    columns = list(rows[0])
+    cells = [[_format(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, float):
+        if value > 1e9:  # epoch timestamp
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value))
+        return f"{value:.2f}"
+    return "" if value is None else str(value).replace("\n", " ")
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Query workflow run history")
+    parser.add_argument("--db", default=str(Path(__file__).parent / "workflows" / "history.db"))
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_slow = sub.add_parser("slowest", help="Slowest steps by average duration")
+    p_slow.add_argument("--days", type=float, default=7)
+    p_slow.add_argument("--limit", type=int, default=10)
+    p_slow.add_argument("--workflow")
+
+    p_fail = sub.add_parser("failures", help="Failure rate per step")
+    p_fail.add_argument("--days", type=float, default=7)
+    p_fail.add_argument("--workflow")
+    p_fail.add_argument("--min-runs", type=int, default=1)
+
+    p_runs = sub.add_parser("runs", help="Most recent runs")
+    p_runs.add_argument("--limit", type=int, default=20)
+    p_runs.add_argument("--workflow")
+    p_runs.add_argument("--status")
+
+    p_steps = sub.add_parser("steps", help="Steps of one run")
+    p_steps.add_argument("run_id")
+
+    args = parser.parse_args(argv)
+    history = RunHistory(args.db)
+    try:
+        if args.command == "slowest":
+            rows = history.slowest_steps(args.days, args.limit, args.workflow)
+        elif args.command == "failures":
+            rows = history.failure_rates(args.days, args.workflow, args.min_runs)
+        elif args.command == "runs":
+            rows = history.recent_runs(args.limit, args.workflow, args.status)
+        else:
+            rows = history.run_steps(args.run_id)
+    finally:
+        history.close()
+
+    if args.json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False, default=str))
+    else:
+        _print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Run Journal — append-only record of step transitions for crash recovery.
+One JSONL file per run; a run without a `run_end` record was interrupted
+and can be resumed from the first step that did not complete.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Not allowed in Windows file names, whitespace, and glob metacharacters
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\[\]\s\x00-\x1f]')
+_RESERVED_NAMES = {"con", "prn", "aux", "nul", *(f"com{i}" for i in range(1, 10)),
+                   *(f"lpt{i}" for i in range(1, 10))}
+
+
+def safe_file_name(name: str) -> str:
+    """A workflow name as a file-name stem valid on Windows and POSIX:
+    lower case, unsafe characters replaced by '_'. Used by every store
+    that names files after workflows (journals, snapshots, ledgers, traces)."""
+    stem = _UNSAFE_CHARS.sub("_", name.lower()).rstrip(".")
+    if not stem or stem in _RESERVED_NAMES:
+        stem += "_"
+    return stem
+
+
+def prompt_hash(prompt: str) -> str:
+    """Short stable hash used to tell whether a step was edited since it ran"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class RunJournal:
+    """Append-only JSONL journal for one workflow run.
+
+    Every record is written to the OS immediately; fsync is batched and
+    happens once `batch_size` records are pending, `batch_interval`
+    seconds have passed, or a record is written with `durable=True`
+    (step completions and run end).
+    """
+
+    def __init__(self, path: Path, batch_size: int = 16, batch_interval: float = 2.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def record(self, event: str, durable: bool = False, **fields):
+        entry = {"t": datetime.now().isoformat(), "event": event, **fields}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._pending += 1
+            if (durable or self._pending >= self.batch_size
+                    or time.monotonic() - self._last_sync >= self.batch_interval):
+                self._sync()
+
+    def _sync(self):
+        try:
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.debug(f"Journal fsync failed: {e}")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self, status: str):
+        self.record("run_end", durable=True, status=status)
+        self.detach()
+
+    def detach(self):
+        """Close the file without a run_end record: the run stays resumable"""
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    @staticmethod
+    def read(path: Path) -> List[dict]:
+        """Read all intact records; a torn last line from a crash is ignored"""
+        records = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+
+
+class ResumeState:
+    """Completed steps recovered from an interrupted run's journal"""
+
+    def __init__(self, path: Path, run_id: str, completed: Dict[str, dict], iteration: int):
+        self.path = path
+        self.run_id = run_id
+        self.completed = completed  # step name -> {"index", "result", "prompt_hash"}
+        self.iteration = iteration
+
+    def __repr__(self):
+        return f"ResumeState(run_id={self.run_id!r}, completed={len(self.completed)})"
+
+
+class JournalStore:
+    """Directory of run journals, one file per run"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def open_run(self, workflow_name: str) -> RunJournal:
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = self.directory / f"{safe_file_name(workflow_name)}__{run_id}.jsonl"
+        return RunJournal(path)
+
+    def reopen(self, state: ResumeState) -> RunJournal:
+        return RunJournal(state.path)
+
+    def find_resumable(self, workflow_name: str) -> Optional[ResumeState]:
+        """Latest run of this workflow that never recorded run_end"""
+        if not self.directory.is_dir():
+            return None
+        prefix = f"{safe_file_name(workflow_name)}__"
+        candidates = sorted(
+            (p for p in self.directory.glob(f"{prefix}*.jsonl")),
+            key=lambda p: p.name, reverse=True,
+        )
+        for path in candidates:
+            try:
+                records = RunJournal.read(path)
+            except OSError:
+                continue
+            if not records or any(r.get("event") == "run_end" for r in records):
+                return None  # the most recent run finished cleanly
+            return self._replay(path, records)
+        return None
+
+    @staticmethod
+    def _replay(path: Path, records: List[dict]) -> ResumeState:
+        completed: Dict[str, dict] = {}
+        iteration = 0
+        for r in records:
+            event = r.get("event")
+            if event == "iteration":
+                iteration = r.get("n", iteration)
+                completed.clear()  # a new loop pass starts from scratch
+            elif event == "step_end" and r.get("status") == "completed":
+                completed[r["name"]] = {
+                    "index": r.get("index"),
+                    "result": r.get("result", ""),
+                    "prompt_hash": r.get("prompt_hash", ""),
+                }
+            elif event == "step_start":
+                completed.pop(r.get("name"), None)
+        run_id = path.stem.split("__", 1)[-1]
+        return ResumeState(path, run_id, completed, iteration)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Step Ledger — incremental re-runs after a workflow is edited.
+
+Every completed step is recorded under a fingerprint of
+
+  * its definition (prompt template, guard, fan-out / sub-workflow spec,
+    dependencies),
+  * its inputs as resolved for this run (the final prompt, fan-out items,
+    the sub-workflow's steps), and
+  * the fingerprint and result of each step it depends on (the previous
+    step in a sequential workflow, `depends_on` in a DAG).
+
+When a step comes up again with the same fingerprint, its result is taken
+from the ledger instead of sending it to the editor. Editing one step
+therefore re-runs that step and everything downstream of it, and nothing
+upstream. One JSON file per workflow holds the last good result per step,
+keyed by the step's position and name (names need not be unique).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+import logging
+
+from workflow_journal import safe_file_name
+
+logger = logging.getLogger(__name__)
+
+# WorkflowStep.to_dict() keys that change what a step produces. Timing,
+# retry and caching settings do not.
+DEFINITION_KEYS = ("name", "prompt", "condition", "foreach", "workflow", "workflow_vars",
+                   "depends_on")
+
+
+def step_fingerprint(definition: Dict[str, Any], prompt: str, upstream: Iterable[str],
+                     extra: str = "") -> str:
+    """Hash of a step's definition, resolved inputs and upstream state"""
+    digest = hashlib.sha256()
+    spec = {key: definition.get(key) for key in DEFINITION_KEYS}
+    for part in (json.dumps(spec, sort_keys=True, ensure_ascii=False, default=str),
+                 prompt, extra, *upstream):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+class StepLedger:
+    """Last successful result of each step, per workflow, by fingerprint"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, dict]] = {}  # workflow -> step key -> entry
+
+    @staticmethod
+    def _key(index: int, step: str) -> str:
+        return f"{index}:{step}"
+
+    def _path(self, workflow: str) -> Path:
+        return self.directory / f"{safe_file_name(workflow)}.json"
+
+    def _load(self, workflow: str) -> Dict[str, dict]:
+        """The workflow's entries (lock held)"""
+        entries = self._entries.get(workflow)
+        if entries is None:
+            try:
+                entries = json.loads(self._path(workflow).read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable step ledger for '{workflow}': {e}")
+                entries = {}
+            self._entries[workflow] = entries
+        return entries
+
+    def lookup(self, workflow: str, index: int, step: str, fingerprint: str) -> Optional[dict]:
+        """The recorded entry if step `index` (named `step`) last completed
+        with this fingerprint"""
+        with self._lock:
+            entry = self._load(workflow).get(self._key(index, step))
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry
+        return None
+
+    def record(self, workflow: str, index: int, step: str, fingerprint: str, result: str,
+               result_path: Optional[str] = None):
+        with self._lock:
+            entries = self._load(workflow)
+            entries[self._key(index, step)] = {"fingerprint": fingerprint, "result": result,
+                             "result_path": result_path, "completed_at": time.time()}
+            self._save(workflow, entries)
+
+    def forget(self, workflow: str):
+        """Drop everything recorded for a workflow (the next run is a full run)"""
+        with self._lock:
+            self._entries[workflow] = {}
+            try:
+                self._path(workflow).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _save(self, workflow: str, entries: Dict[str, dict]):
+        path = self._path(workflow)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write step ledger for '{workflow}': {e}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Workflow Library — lazy, indexed access to a directory of saved workflows.
+A manifest (.workflow_index.json) keeps name, description, step count,
+mtime and hash per file. On refresh only files whose stat data changed are
+re-read; full Workflow objects are parsed when a workflow is selected.
+A file modified within the timestamp granularity of its indexing could
+change again without its mtime moving, so such "racy" entries are checked
+against their hash until they are old enough to trust (as git does).
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import time
+
+from workflow_engine import Workflow
+
+logger = logging.getLogger(__name__)
+
+# Coarsest mtime resolution we expect (FAT, some network shares)
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class WorkflowLibrary:
+    """Manifest-backed view of `workflow_*.json` files in one directory"""
+
+    INDEX_FILE = ".workflow_index.json"
+    INDEX_VERSION = 1
+
+    def __init__(self, save_dir: str):
+        self.save_dir = Path(save_dir)
+        self._entries: Dict[str, dict] = {}  # filename -> manifest entry
+        self._by_name: Dict[str, str] = {}  # workflow name -> filename
+        self._loaded: Dict[str, Workflow] = {}  # filename -> parsed workflow
+        self._index_loaded = False
+
+    # ═══════════════════════════════════════════════════
+    # MANIFEST
+    # ═══════════════════════════════════════════════════
+    def refresh(self) -> List[dict]:
+        """Sync the manifest with the directory using stat data only;
+        files are opened only if new or changed. Returns the entries."""
+        if not self._index_loaded:
+            self._entries = self._read_index()
+            self._index_loaded = True
+
+        seen = set()
+        changed = False
+        try:
+            scan = list(os.scandir(self.save_dir))
+        except OSError:
+            scan = []
+
+        for entry in scan:
+            fname = entry.name
+            if not (fname.startswith("workflow_") and fname.endswith(".json")) or not entry.is_file():
+                continue
+            seen.add(fname)
+            st = entry.stat()
+            current = self._entries.get(fname)
+            if current and current["mtime_ns"] == st.st_mtime_ns and current["size"] == st.st_size:
+                if not self._racy(current):
+                    continue
+                if self._same_content(Path(entry.path), current):
+                    current["indexed_ns"] = time.time_ns()
+                    changed = True
+                    continue
+            indexed = self._index_file(Path(entry.path), st)
+            if indexed is None:
+                self._entries.pop(fname, None)
+            else:
+                self._entries[fname] = indexed
+            self._loaded.pop(fname, None)
+            changed = True
+
+        for fname in set(self._entries) - seen:
+            del self._entries[fname]
+            self._loaded.pop(fname, None)
+            changed = True
+
+        if changed:
+            self._write_index()
+
+        self._by_name = {}
+        for fname in sorted(self._entries):
+            self._by_name[self._entries[fname]["name"]] = fname
+        return self.entries()
+
+    def entries(self) -> List[dict]:
+        """Manifest entries (one per workflow name), sorted by name"""
+        return [dict(self._entries[f], file=f) for _, f in sorted(self._by_name.items())]
+
+    def names(self) -> List[str]:
+        return sorted(self._by_name)
+
+    def entry(self, name: str) -> Optional[dict]:
+        fname = self._by_name.get(name)
+        return dict(self._entries[fname], file=fname) if fname else None
+
+    def _index_file(self, path: Path, st: os.stat_result) -> Optional[dict]:
+        try:
+            raw = path.read_bytes()
+            data = json.loads(raw.decode("utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to index workflow {path.name}: {e}")
+            return None
+        return {
+            "name": data.get("name", "Untitled"),
+            "description": data.get("description", ""),
+            "step_count": len(data.get("steps", [])),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "hash": hashlib.sha256(raw).hexdigest(),
+            "indexed_ns": time.time_ns(),
+        }
+
+    @staticmethod
+    def _racy(entry: dict) -> bool:
+        """Modified too close to its indexing for the stat data to prove it unchanged"""
+        return entry["mtime_ns"] >= entry.get("indexed_ns", 0) - _RACY_WINDOW_NS
+
+    @staticmethod
+    def _same_content(path: Path, entry: dict) -> bool:
+        try:
+            return hashlib.sha256(path.read_bytes()).hexdigest() == entry.get("hash")
+        except OSError:
+            return False
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            data = json.loads((self.save_dir / self.INDEX_FILE).read_text(encoding="utf-8"))
+            if data.get("version") == self.INDEX_VERSION:
+                return data.get("files", {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _write_index(self):
+        if not self.save_dir.is_dir():
+            return
+        path = self.save_dir / self.INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps({"version": self.INDEX_VERSION, "files": self._entries}),
+                           encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"Could not write workflow index: {e}")
+
+    # ═══════════════════════════════════════════════════
+    # LAZY LOADING
+    # ═══════════════════════════════════════════════════
+    def get(self, name: str) -> Optional[Workflow]:
+        """Parse (once) and return the saved workflow called `name`"""
+        fname = self._by_name.get(name)
+        if fname is None:
+            return None
+        workflow = self._loaded.get(fname)
+        if workflow is None:
+            with open(self.save_dir / fname, "r", encoding="utf-8") as f:
+                workflow = Workflow.from_dict(json.load(f))
+            self._loaded[fname] = workflow
+        return workflow
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Workflow Metrics — per-step phase spans and their export.
+
+Each run gets a RunTracer that records spans (resolve, queue, send, wait,
+cooldown, backoff, loop_wait, handoff, prefetch) with monotonic timestamps.
+'handoff' runs from one step being done to the next step's send; 'prefetch'
+spans overlap the step they prepare ahead of. Finished runs are
+written as JSONL traces and folded into a MetricsRegistry, which renders latency
+histograms in the Prometheus text format (for a node_exporter textfile
+collector or any scraper that reads files).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PHASES = ("resolve", "queue", "send", "wait", "cooldown", "backoff", "loop_wait",
+          "handoff", "prefetch", "lock")
+
+# Seconds; steps range from sub-second dry runs to half-hour AI sessions
+LATENCY_BUCKETS = (0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+class Span:
+    __slots__ = ("step", "phase", "start", "end", "iteration", "attrs")
+
+    def __init__(self, step: str, phase: str, start: float, end: float,
+                 iteration: int = 0, attrs: Optional[dict] = None):
+        self.step = step
+        self.phase = phase
+        self.start = start
+        self.end = end
+        self.iteration = iteration
+        self.attrs = attrs or {}
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class RunTracer:
+    """Collects the spans of one workflow run (thread-safe for DAG runs).
+    Long (looping) runs drain() their spans once exported; phase_totals()
+    still covers the whole run."""
+
+    def __init__(self, workflow: str, run_id: Optional[str] = None):
+        self.workflow = workflow
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.started_wall = time.time()
+        self.origin = time.monotonic()
+        self.spans: List[Span] = []
+        self._drained_totals: Dict[str, float] = {}  # phase -> seconds of drained spans
+        self._lock = threading.Lock()
+
+    def add(self, step: str, phase: str, start: float, end: float,
+            iteration: int = 0, **attrs):
+        with self._lock:
+            self.spans.append(Span(step, phase, start, end, iteration, attrs))
+
+    @contextmanager
+    def span(self, step: str, phase: str, iteration: int = 0, **attrs) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(step, phase, start, time.monotonic(), iteration, **attrs)
+
+    def phase_totals(self) -> Dict[str, float]:
+        """Seconds spent per phase across all steps"""
+        with self._lock:
+            totals = dict(self._drained_totals)
+            for span in self.spans:
+                totals[span.phase] = totals.get(span.phase, 0.0) + span.duration
+        return {phase: round(seconds, 3) for phase, seconds in totals.items()}
+
+    def drain(self) -> List[Span]:
+        """Remove and return the spans collected so far, keeping their
+        phase totals"""
+        with self._lock:
+            spans, self.spans = self.spans, []
+            for span in spans:
+                self._drained_totals[span.phase] = (self._drained_totals.get(span.phase, 0.0)
+                                                    + span.duration)
+        return spans
+
+    def write_jsonl(self, path: str, spans: Optional[List[Span]] = None, append: bool = False):
+        """One JSON object per span (default: the current ones); times are
+        seconds since the run started"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        if spans is None:
+            with self._lock:
+                spans = list(self.spans)
+        with open(path, "a" if append else "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps({
+                    "run_id": self.run_id,
+                    "workflow": self.workflow,
+                    "iteration": span.iteration,
+                    "step": span.step,
+                    "phase": span.phase,
+                    "start": round(span.start - self.origin, 6),
+                    "end": round(span.end - self.origin, 6),
+                    "duration": round(span.duration, 6),
+                    "wall_start": round(self.started_wall + span.start - self.origin, 6),
+                    **span.attrs,
+                }, ensure_ascii=False) + "\n")
+
+
+# ═══════════════════════════════════════════════════
+# PROMETHEUS EXPORT
+# ═══════════════════════════════════════════════════
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float, buckets: Tuple[float, ...]):
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(**labels: str) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(str(value))}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+    """Latency histograms per (workflow, step, phase) plus run counters"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._phases: Dict[Tuple[str, str, str], _Histogram] = {}
+        self._runs: Dict[str, _Histogram] = {}
+        self._run_status: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, workflow: str, step: str, phase: str, seconds: float):
+        with self._lock:
+            hist = self._phases.get((workflow, step, phase))
+            if hist is None:
+                hist = self._phases[(workflow, step, phase)] = _Histogram(len(self.buckets))
+            hist.observe(seconds, self.buckets)
+
+    def observe_run(self, tracer: RunTracer, status: str):
+        for span in list(tracer.spans):
+            self.observe(tracer.workflow, span.step, span.phase, span.duration)
+        with self._lock:
+            hist = self._runs.get(tracer.workflow)
+            if hist is None:
+                hist = self._runs[tracer.workflow] = _Histogram(len(self.buckets))
+            hist.observe(time.monotonic() - tracer.origin, self.buckets)
+            key = (tracer.workflow, status.split(":", 1)[0])
+            self._run_status[key] = self._run_status.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            lines += ["# HELP workflow_step_phase_seconds Time spent per workflow step phase.",
+                      "# TYPE workflow_step_phase_seconds histogram"]
+            for (workflow, step, phase), hist in sorted(self._phases.items()):
+                self._render_histogram(lines, "workflow_step_phase_seconds", hist,
+                                       _labels(workflow=workflow, step=step, phase=phase))
+
+            lines += ["# HELP workflow_run_seconds Wall time of complete workflow runs.",
+                      "# TYPE workflow_run_seconds histogram"]
+            for workflow, hist in sorted(self._runs.items()):
+                self._render_histogram(lines, "workflow_run_seconds", hist,
+                                       _labels(workflow=workflow))
+
+            lines += ["# HELP workflow_runs_total Finished workflow runs by final status.",
+                      "# TYPE workflow_runs_total counter"]
+            for (workflow, status), count in sorted(self._run_status.items()):
+                lines.append(f"workflow_runs_total{{{_labels(workflow=workflow, status=status)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histogram(self, lines: List[str], name: str, hist: _Histogram, labels: str):
+        for bound, count in zip(self.buckets, hist.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{{{labels}}} {hist.total:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+    def write(self, path: str):
+        """Atomically replace `path` with the current metrics"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, target)
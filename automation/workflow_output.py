@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Step Output — collects streamed step results with bounded memory.
+Chunks are split to a maximum size for callbacks; once a result grows past
+the spill threshold it is written to a file and only a preview stays in
+memory (and in WorkflowStep.result).
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+def split_chunks(text: str, max_chars: int) -> Iterator[str]:
+    """Yield `text` in pieces of at most `max_chars` characters"""
+    if max_chars <= 0 or len(text) <= max_chars:
+        if text:
+            yield text
+        return
+    for start in range(0, len(text), max_chars):
+        yield text[start:start + max_chars]
+
+
+class StepOutput:
+    """Accumulates one step's output, spilling to disk past a threshold"""
+
+    def __init__(self, spill_dir: Optional[str] = None, spill_threshold: int = 64 * 1024,
+                 preview_chars: int = 2000, label: str = "step"):
+        self.spill_dir = Path(spill_dir) if spill_dir else Path(tempfile.gettempdir()) / "auto_prompt_output"
+        self.spill_threshold = spill_threshold
+        self.preview_chars = preview_chars
+        self.label = label
+        self.path: Optional[Path] = None
+        self.total_chars = 0
+        self._buffer: list = []
+        self._buffered_chars = 0
+        self._preview = ""
+        self._file = None
+        self._last_chunk = ""
+
+    def write(self, chunk: str):
+        if not chunk:
+            return
+        self.total_chars += len(chunk)
+        self._last_chunk = chunk
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._buffer.append(chunk)
+        self._buffered_chars += len(chunk)
+        if self._buffered_chars > self.spill_threshold:
+            self._spill()
+
+    def _spill(self):
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        safe_label = "".join(c if c.isalnum() else "_" for c in self.label)[:40]
+        fd, name = tempfile.mkstemp(prefix=f"{safe_label}_", suffix=".txt", dir=str(self.spill_dir))
+        self.path = Path(name)
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        text = "".join(self._buffer)
+        self._preview = text[:self.preview_chars]
+        self._file.write(text)
+        self._buffer = []
+        self._buffered_chars = 0
+
+    def finish(self) -> str:
+        """Close the spill file (if any) and return the text to keep in memory"""
+        if self._file is None:
+            return "".join(self._buffer)
+        self._file.close()
+        self._file = None
+        return (f"{self._preview}\n… [{self.total_chars} chars total; full output in {self.path}]\n"
+                f"{self._last_chunk[-self.preview_chars:]}")
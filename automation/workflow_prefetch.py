@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Step Prefetch — preparing the next step while the current one runs.
+
+A sequential run spends most of its time waiting for the AI, then does
+the next step's preparation on the critical path. With prefetching the
+engine prepares the step that comes next on a background thread:
+
+  * while the current step is sent and waited on: resolve its prompt,
+    compile its guard and hand the prompt to the bridge's `prepare`
+    hook (file-drop payloads are staged, the editor window is found);
+  * while the current step cools down: evaluate its guard to warm the
+    probe cache and compute its result-cache key, recording the project
+    fingerprint they were taken against.
+
+Prepared work is used only if the workflow has not been edited, the
+step's prompt, fan-out list and guard are the ones it was prepared from,
+and the variables are unchanged when the step comes up; otherwise it is
+dropped and the step is prepared inline as before. Warmed probes and the
+cache key are also dropped if the project fingerprint moved on since
+(the AI may still be editing during the cooldown).
+"""
+
+import copy
+from concurrent.futures import Future
+from typing import Any, Collection, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StepPrefetch:
+    """Work prepared ahead of time for the step at `index`"""
+
+    def __init__(self, index: int, step: Any, revision: int, variables: Dict[str, Any]):
+        self.index = index
+        self.step = step
+        self.revision = revision
+        self.variables = copy.deepcopy(variables)
+        self.source = self._source(step)
+        self.prompt: Optional[str] = None
+        self.cache_key: Optional[str] = None
+        self.tree_state: Optional[str] = None  # project state the warm-up saw
+        self.futures: List[Future] = []
+
+    def settle(self):
+        """Wait for the background jobs; their errors only mean less was prepared"""
+        for future in self.futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.debug(f"Prefetch for '{self.step.name}' failed: {e}")
+
+    @staticmethod
+    def _source(step: Any) -> tuple:
+        """What the prepared work was derived from (steps are edited in place)"""
+        return (step.prompt, copy.deepcopy(step.foreach), step.condition)
+
+    def matches(self, workflow: Any, index: int) -> bool:
+        """True if the prepared prompt is still what the step would send now"""
+        return (self.prompt is not None and index == self.index
+                and index < len(workflow.steps) and workflow.steps[index] is self.step
+                and workflow.revision == self.revision and workflow.variables == self.variables
+                and self._source(self.step) == self.source)
+
+
+def next_sequential_step(workflow: Any, index: int, skip: Collection[int] = ()) -> Optional[int]:
+    """Index of the step a sequential run reaches after `index`, if it sends
+    a prompt of its own (fan-out and sub-workflow steps are prepared by
+    their children). Disabled steps and indices in `skip` are passed over."""
+    for j in range(index + 1, len(workflow.steps)):
+        step = workflow.steps[j]
+        if j in skip or not step.enabled:
+            continue
+        if step.foreach or step.workflow:
+            return None
+        return j
+    return None
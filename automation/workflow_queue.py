@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Step Queue — run workflow steps on worker machines through a durable queue.
+
+With `engine.step_queue` set, the engine publishes each resolved prompt as
+a task in a SQLite database (WAL mode, on a local or shared disk) instead
+of typing it itself, and waits for the result. Worker processes, each
+owning an EditorBridge, claim tasks under a lease, heartbeat while the AI
+works, and write the result back:
+
+    python -m workflow_engine worker --queue /srv/steps.db --editor windsurf --mode auto_interact
+    python -m workflow_engine run "Full Feature Dev" --queue /srv/steps.db
+
+A worker that dies stops heartbeating; once its lease expires the task goes
+back to the queue for another worker (at most `max_leases` times). Parallel
+steps (DAG workflows, fan-out items, several runs) spread across workers,
+so throughput grows with the number of workers.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+from workflow_timers import CancelToken, StepCancelled
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY,
+    run_id      TEXT NOT NULL,
+    workflow    TEXT NOT NULL,
+    step        TEXT NOT NULL,
+    prompt      TEXT NOT NULL,
+    target      TEXT,               -- editor a worker must own; NULL = any
+    priority    INTEGER NOT NULL DEFAULT 50,
+    status      TEXT NOT NULL,      -- queued | leased | completed | failed | cancelled
+    leases      INTEGER NOT NULL DEFAULT 0,
+    worker      TEXT,
+    lease_until REAL,
+    created_at  REAL NOT NULL,
+    claimed_at  REAL,
+    finished_at REAL,
+    result      TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, priority, id);
+CREATE INDEX IF NOT EXISTS tasks_lease ON tasks (status, lease_until);
+CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id);
+"""
+
+FINISHED = ("completed", "failed", "cancelled")
+
+
+class WorkerLost(Exception):
+    """A task ran out of leases because its workers kept disappearing"""
+
+
+class StepQueue:
+    """Durable task table shared by one or more engines and workers"""
+
+    def __init__(self, db_path: str, lease_seconds: float = 60.0, max_leases: int = 3,
+                 poll_interval: float = 0.2):
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_leases = max(1, max_leases)
+        self.poll_interval = poll_interval
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._db() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit; claims take the write lock explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ═══════════════════════════════════════════════════
+    # ENGINE SIDE
+    # ═══════════════════════════════════════════════════
+    def publish(self, run_id: str, workflow: str, step: str, prompt: str,
+                target: Optional[str] = None, priority: int = 50) -> int:
+        with self._db() as conn:
+            return conn.execute(
+                "INSERT INTO tasks (run_id, workflow, step, prompt, target, priority, status, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+                (run_id, workflow, step, prompt, target, priority, time.time())).lastrowid
+
+    def wait_result(self, task_id: int, token: Optional[CancelToken] = None) -> str:
+        """Block until the task finishes. Returns the result, raises
+        RuntimeError / WorkerLost if it failed. If `token` is cancelled
+        first, the task is cancelled (its worker notices on the next
+        heartbeat) and StepCancelled / StepTimeout is raised."""
+        conn = self._connect()
+        try:
+            while True:
+                row = conn.execute("SELECT status, result, lease_until FROM tasks WHERE id = ?",
+                                   (task_id,)).fetchone()
+                if row is None:
+                    raise RuntimeError(f"Task {task_id} disappeared from the queue")
+                if row["status"] == "completed":
+                    return row["result"] or ""
+                if row["status"] == "failed":
+                    if row["result"] and row["result"].startswith("worker lost"):
+                        raise WorkerLost(row["result"])
+                    raise RuntimeError(row["result"] or "Worker reported a failure")
+                if row["status"] == "cancelled":
+                    raise StepCancelled("cancelled in queue")
+                if row["status"] == "leased" and row["lease_until"] < time.time():
+                    self.expire_leases()  # its worker is gone; don't wait for another to claim
+                if token is None:
+                    time.sleep(self.poll_interval)
+                elif token.wait(self.poll_interval):
+                    self.cancel(task_id)
+                    token.check()
+        finally:
+            conn.close()
+
+    def cancel(self, task_id: int):
+        with self._db() as conn:
+            conn.execute("UPDATE tasks SET status = 'cancelled', finished_at = ? "
+                         "WHERE id = ? AND status IN ('queued', 'leased')", (time.time(), task_id))
+
+    def cancel_run(self, run_id: str) -> int:
+        with self._db() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = 'cancelled', finished_at = ? "
+                "WHERE run_id = ? AND status IN ('queued', 'leased')",
+                (time.time(), run_id)).rowcount
+
+    # ═══════════════════════════════════════════════════
+    # WORKER SIDE
+    # ═══════════════════════════════════════════════════
+    def claim(self, worker: str, targets: Optional[List[str]] = None) -> Optional[sqlite3.Row]:
+        """Lease the most urgent queued task this worker can run, first
+        returning expired leases to the queue. None if there is nothing to do."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn, now)
+            sql = "SELECT * FROM tasks WHERE status = 'queued'"
+            params: list = []
+            if targets:
+                sql += f" AND (target IS NULL OR target IN ({','.join('?' * len(targets))}))"
+                params += targets
+            row = conn.execute(sql + " ORDER BY priority, id LIMIT 1", params).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE tasks SET status = 'leased', worker = ?, leases = leases + 1, "
+                    "lease_until = ?, claimed_at = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, row["id"]))
+            conn.execute("COMMIT")
+            return row
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def expire_leases(self):
+        """Return tasks whose worker stopped heartbeating to the queue"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn, time.time())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute(
+            "SELECT id, worker, leases FROM tasks WHERE status = 'leased' AND lease_until < ?",
+            (now,)).fetchall()
+        for row in expired:
+            if row["leases"] >= self.max_leases:
+                conn.execute("UPDATE tasks SET status = 'failed', finished_at = ?, result = ? "
+                             "WHERE id = ?",
+                             (now, f"worker lost {row['leases']} times (last: {row['worker']})",
+                              row["id"]))
+            else:
+                conn.execute("UPDATE tasks SET status = 'queued', worker = NULL, "
+                             "lease_until = NULL WHERE id = ?", (row["id"],))
+            logger.warning(f"Lease on task {row['id']} held by {row['worker']} expired")
+
+    def heartbeat(self, task_id: int, worker: str) -> bool:
+        """Extend the lease; False if the worker no longer holds the task
+        (expired and re-leased, or cancelled)"""
+        with self._db() as conn:
+            return conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, task_id, worker)).rowcount == 1
+
+    def finish(self, task_id: int, worker: str, status: str, result: str) -> bool:
+        """Record the outcome; ignored (False) if the lease was lost meanwhile"""
+        with self._db() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (status, result, time.time(), task_id, worker)).rowcount == 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db() as conn:
+            counts = {row["status"]: row["n"] for row in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM tasks GROUP BY status")}
+            workers = [row["worker"] for row in conn.execute(
+                "SELECT DISTINCT worker FROM tasks WHERE status = 'leased'")]
+        return {"tasks": counts, "busy_workers": workers}
+
+    def purge(self, older_than_days: float = 7.0) -> int:
+        """Delete finished tasks older than the given age"""
+        with self._db() as conn:
+            return conn.execute(
+                f"DELETE FROM tasks WHERE status IN ({','.join('?' * len(FINISHED))}) "
+                "AND finished_at < ?", (*FINISHED, time.time() - older_than_days * 86400)).rowcount
+
+
+class QueueWorker:
+    """Claims tasks and runs them through `send_fn(prompt, token)`.
+    A heartbeat thread keeps the lease alive; if the lease is lost or the
+    task is cancelled, the token is cancelled and the send is abandoned."""
+
+    def __init__(self, queue: StepQueue, send_fn: Callable[[str, CancelToken], Any],
+                 worker_id: Optional[str] = None, targets: Optional[List[str]] = None,
+                 idle_interval: float = 1.0):
+        self.queue = queue
+        self.send_fn = send_fn
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.targets = targets
+        self.idle_interval = idle_interval
+        self.on_task: Optional[Callable[[dict, str, str], None]] = None  # (task, status, result)
+        self.stats = {"completed": 0, "failed": 0, "abandoned": 0}
+        self._stop = CancelToken()
+
+    def stop(self):
+        """Claim nothing new; the task in progress still finishes"""
+        self._stop.cancel("stopped")
+
+    def run(self, max_tasks: Optional[int] = None):
+        """Work until stop() (or max_tasks tasks)"""
+        done = 0
+        while not self._stop.cancelled and (max_tasks is None or done < max_tasks):
+            task = self.queue.claim(self.worker_id, self.targets)
+            if task is None:
+                self._stop.wait(self.idle_interval)
+                continue
+            self.run_task(dict(task))
+            done += 1
+
+    def run_task(self, task: dict):
+        token = CancelToken()  # stop() lets the current task finish
+        beating = threading.Thread(target=self._heartbeat, args=(task["id"], token),
+                                   name=f"lease-{task['id']}", daemon=True)
+        beating.start()
+        try:
+            raw = self.send_fn(task["prompt"], token)
+            result = self._drain(raw, token)
+            status = "completed"
+        except StepCancelled as e:
+            status, result = "failed", f"Step {e}"
+        except Exception as e:
+            status, result = "failed", str(e)
+        finally:
+            token.cancel("finished")
+            beating.join()
+
+        if self.queue.finish(task["id"], self.worker_id, status, result):
+            self.stats[status] += 1
+        else:
+            self.stats["abandoned"] += 1
+            status = "abandoned"
+            logger.warning(f"Task {task['id']} ('{task['step']}') was cancelled or re-leased; "
+                           "result discarded")
+        if self.on_task:
+            try:
+                self.on_task(task, status, result)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _drain(raw: Any, token: CancelToken) -> str:
+        if raw is None or isinstance(raw, str):
+            return raw or "Done"
+        parts = []
+        for chunk in raw:
+            token.check()
+            parts.append(str(chunk))
+        return "".join(parts) or "Done"
+
+    def _heartbeat(self, task_id: int, token: CancelToken):
+        interval = max(0.05, self.queue.lease_seconds / 3)
+        while not token.wait(interval):
+            try:
+                alive = self.queue.heartbeat(task_id, self.worker_id)
+            except sqlite3.Error as e:
+                logger.warning(f"Heartbeat for task {task_id} failed: {e}")
+                continue
+            if not alive:
+                token.cancel("lease lost")
+                return
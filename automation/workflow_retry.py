@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Step Retry — retry policies with exponential backoff, and a circuit breaker
+that stops a run once the editor bridge keeps failing.
+"""
+
+import random
+import threading
+from typing import Optional
+
+
+class RetryPolicy:
+    """How often a failed step is re-sent, and how long to wait in between.
+
+    Attempt n (1-based) that fails waits
+        min(max_backoff, backoff * multiplier ** (n - 1)) ± jitter
+    before the next attempt. max_attempts=1 means no retries.
+    """
+
+    def __init__(self, max_attempts: int = 1, backoff: float = 5.0,
+                 multiplier: float = 2.0, max_backoff: float = 300.0, jitter: float = 0.2):
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = max(0.0, backoff)
+        self.multiplier = max(1.0, multiplier)
+        self.max_backoff = max_backoff
+        self.jitter = min(1.0, max(0.0, jitter))  # fraction of the delay
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt `attempt` (1-based)"""
+        base = min(self.max_backoff, self.backoff * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            base *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, base)
+
+    def to_dict(self) -> dict:
+        return {
+            "max_attempts": self.max_attempts,
+            "backoff": self.backoff,
+            "multiplier": self.multiplier,
+            "max_backoff": self.max_backoff,
+            "jitter": self.jitter,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["RetryPolicy"]:
+        if not data:
+            return None
+        return cls(
+            max_attempts=data.get("max_attempts", 1),
+            backoff=data.get("backoff", 5.0),
+            multiplier=data.get("multiplier", 2.0),
+            max_backoff=data.get("max_backoff", 300.0),
+            jitter=data.get("jitter", 0.2),
+        )
+
+    def __repr__(self):
+        return f"RetryPolicy(max_attempts={self.max_attempts}, backoff={self.backoff:g}s)"
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; any success closes it.
+    threshold=0 disables the breaker."""
+
+    def __init__(self, threshold: int = 3):
+        self.threshold = threshold
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.threshold > 0 and self.consecutive_failures >= self.threshold
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if this one opened the breaker"""
+        with self._lock:
+            self.consecutive_failures += 1
+            tripped = self.threshold > 0 and self.consecutive_failures == self.threshold
+            if tripped:
+                self.trips += 1
+            return tripped
+
+    def reset(self):
+        with self._lock:
+            self.consecutive_failures = 0
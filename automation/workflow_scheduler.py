@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Workflow Scheduler — many workflows on independent schedules, one timer thread.
+
+Schedules are interval ("every 15 minutes") or cron ("*/30 9-18 * * 1-5").
+All pending firings live in one heap; a single thread sleeps until the
+earliest one is due, so thousands of idle schedules cost no CPU and no
+threads. Due workflows run on a bounded worker pool; each job keeps one
+WorkflowEngine for all its runs (a job never overlaps itself), and the
+engine's event thread exits between runs.
+
+Missed firings (the machine slept, the scheduler was stopped, or every
+worker was busy past the grace period) follow the job's misfire policy:
+'skip' drops them, 'catch_up' runs the job once, then resumes the schedule.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+import logging
+
+from workflow_engine import Workflow, WorkflowEngine
+
+logger = logging.getLogger(__name__)
+
+MISFIRE_POLICIES = ("skip", "catch_up")
+
+
+# ═══════════════════════════════════════════════════
+# SCHEDULES
+# ═══════════════════════════════════════════════════
+class IntervalSchedule:
+    """Fires every `seconds`, anchored to the previous due time (no drift)"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = float(seconds)
+
+    def next_after(self, after: float, previous: Optional[float] = None) -> float:
+        if previous is None:
+            return after + self.seconds
+        missed = max(0, int((after - previous) // self.seconds))
+        return previous + (missed + 1) * self.seconds
+
+    def __repr__(self):
+        return f"IntervalSchedule({self.seconds:g}s)"
+
+
+class CronSchedule:
+    """Standard 5-field cron expression: minute hour day-of-month month day-of-week.
+    Supports `*`, lists (1,15), ranges (9-17) and steps (*/10, 0-30/5).
+    Day-of-week is 0-6 with 0 (or 7) = Sunday. Evaluated in local time.
+    As in cron, a day-of-month or day-of-week field that starts with `*` or
+    covers its whole range is unrestricted; if both are restricted, a day
+    matching either one fires."""
+
+    _BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got '{expression}'")
+        self.expression = expression
+        parsed = [self._parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, self._BOUNDS)]
+        self.minutes, self.hours, self.days, self.months, dows = parsed
+        self.weekdays = {d % 7 for d in dows}
+        self._dom_any = fields[2].startswith("*") or self.days == set(range(1, 32))
+        self._dow_any = fields[4].startswith("*") or self.weekdays == set(range(7))
+
+    @staticmethod
+    def _parse_field(field: str, lo: int, hi: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            base, _, step_text = part.partition("/")
+            step = int(step_text) if step_text else 1
+            if base == "*":
+                start, end = lo, hi
+            elif "-" in base:
+                start, end = (int(v) for v in base.split("-", 1))
+            else:
+                start = int(base)
+                end = hi if step_text else start
+            if start < lo or end > hi or start > end or step <= 0:
+                raise ValueError(f"Invalid cron field '{field}' (allowed {lo}-{hi})")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays  # Monday=0 -> cron Monday=1
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow  # cron: either restriction matches
+
+    def next_after(self, after: float, previous: Optional[float] = None) -> float:
+        dt = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+                dt = dt.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt.timestamp()
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
+
+
+# ═══════════════════════════════════════════════════
+# JOBS
+# ═══════════════════════════════════════════════════
+class ScheduledJob:
+    """One workflow on one schedule"""
+
+    def __init__(self, name: str, workflow: Workflow, schedule, jitter: float = 0.0,
+                 misfire: str = "skip", variables: Optional[Dict[str, str]] = None,
+                 priority: Optional[int] = None):
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"misfire must be one of {MISFIRE_POLICIES}")
+        self.name = name
+        self.workflow = workflow
+        self.schedule = schedule
+        self.jitter = max(0.0, jitter)
+        self.misfire = misfire
+        self.variables = dict(variables or {})
+        self.priority = priority  # editor queue priority; None = the workflow's / engine's
+        self.enabled = True
+        self.next_run: Optional[float] = None  # wall-clock timestamp, without jitter
+        self.last_run: Optional[float] = None
+        self.last_status = ""
+        self.runs = 0
+        self.running = False
+        self.engine: Optional[WorkflowEngine] = None  # created on first run, reused
+        self._ready_due: float = 0.0  # due time of the firing waiting for a worker
+        self._caught_up = False  # that firing is already a catch-up
+        self._version = 0  # bumps invalidate stale heap entries
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "workflow": self.workflow.name,
+            "schedule": repr(self.schedule),
+            "enabled": self.enabled,
+            "running": self.running,
+            "next_run": self.next_run,
+            "last_run": self.last_run,
+            "last_status": self.last_status,
+            "runs": self.runs,
+        }
+
+
+class WorkflowScheduler:
+    """Heap of pending firings driven by a single timer thread"""
+
+    def __init__(self, engine_factory: Optional[Callable[[], WorkflowEngine]] = None,
+                 max_concurrent: int = 4, misfire_grace: float = 30.0,
+                 max_sleep: float = 60.0):
+        self.engine_factory = engine_factory or WorkflowEngine
+        self.max_concurrent = max(1, max_concurrent)
+        self.misfire_grace = misfire_grace
+        # Upper bound on one sleep, so wall-clock jumps are noticed
+        self.max_sleep = max_sleep
+
+        self.on_job_done: Optional[Callable[[ScheduledJob, str], None]] = None
+
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[tuple] = []  # (fire_at, seq, version, job name)
+        self._seq = itertools.count()
+        self._ready: List[ScheduledJob] = []  # due, waiting for a free worker
+        self._active = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self.stats = {"fired": 0, "missed_skipped": 0, "caught_up": 0,
+                      "busy_skipped": 0, "wakeups": 0}
+
+    # ═══════════════════════════════════════════════════
+    # REGISTRATION
+    # ═══════════════════════════════════════════════════
+    def add(self, name: str, workflow: Workflow, interval: Optional[float] = None,
+            cron: Optional[str] = None, jitter: float = 0.0, misfire: str = "skip",
+            variables: Optional[Dict[str, str]] = None,
+            priority: Optional[int] = None) -> ScheduledJob:
+        if (interval is None) == (cron is None):
+            raise ValueError("Give exactly one of interval or cron")
+        schedule = IntervalSchedule(interval) if interval is not None else CronSchedule(cron)
+        job = ScheduledJob(name, workflow, schedule, jitter, misfire, variables, priority)
+        with self._cond:
+            if name in self._jobs:
+                raise ValueError(f"A schedule named '{name}' already exists")
+            self._jobs[name] = job
+            self._plan(job, time.time())
+            self._cond.notify()
+        return job
+
+    def remove(self, name: str) -> bool:
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job is None:
+                return False
+            job._version += 1
+            if job in self._ready:
+                self._ready.remove(job)
+            return True
+
+    def set_enabled(self, name: str, enabled: bool):
+        with self._cond:
+            job = self._jobs[name]
+            job.enabled = enabled
+            job._version += 1
+            if enabled:
+                self._plan(job, time.time())
+                self._cond.notify()
+
+    def jobs(self) -> List[ScheduledJob]:
+        with self._cond:
+            return sorted(self._jobs.values(), key=lambda j: (j.next_run or 0, j.name))
+
+    def _plan(self, job: ScheduledJob, now: float, previous: Optional[float] = None):
+        """Compute the next firing and push it onto the heap (lock held)"""
+        job.next_run = job.schedule.next_after(now, previous)
+        fire_at = job.next_run + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        heapq.heappush(self._heap, (fire_at, next(self._seq), job._version, job.name))
+
+    # ═══════════════════════════════════════════════════
+    # LIFECYCLE
+    # ═══════════════════════════════════════════════════
+    def start(self):
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                            thread_name_prefix="scheduled-run")
+            self._thread = threading.Thread(target=self._timer_loop, name="workflow-scheduler",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """Stop firing; with wait=True, also wait for running workflows"""
+        with self._cond:
+            self._stopping = True
+            self._ready.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        if self._pool:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    # ═══════════════════════════════════════════════════
+    # TIMER
+    # ═══════════════════════════════════════════════════
+    def _timer_loop(self):
+        with self._cond:
+            while not self._stopping:
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, version, name = heapq.heappop(self._heap)
+                    job = self._jobs.get(name)
+                    if job is None or job._version != version or not job.enabled:
+                        continue  # removed, disabled or re-planned since
+                    self._due(job, now)
+                self._dispatch()
+
+                timeout = self.max_sleep
+                if self._heap:
+                    timeout = min(timeout, max(0.0, self._heap[0][0] - time.time()))
+                self._cond.wait(timeout)
+                self.stats["wakeups"] += 1
+
+    def _due(self, job: ScheduledJob, now: float):
+        """Handle one firing of `job` (lock held)"""
+        due = job.next_run or now
+        late = now - due - job.jitter
+        self._plan(job, now, previous=due)
+
+        caught_up = late > self.misfire_grace
+        if caught_up and not self._misfire(job, late, "missed its run"):
+            return
+
+        if job.running or job in self._ready:
+            self.stats["busy_skipped"] += 1
+            logger.info(f"Schedule '{job.name}' still running; skipping this firing")
+            return
+        job._ready_due = due
+        job._caught_up = caught_up
+        self._ready.append(job)
+
+    def _misfire(self, job: ScheduledJob, late: float, what: str) -> bool:
+        """Apply the job's misfire policy; True if it should run (lock held)"""
+        if job.misfire == "skip":
+            self.stats["missed_skipped"] += 1
+            logger.info(f"Schedule '{job.name}' {what} by {late:.0f}s; skipping")
+            return False
+        self.stats["caught_up"] += 1
+        logger.info(f"Schedule '{job.name}' {what} by {late:.0f}s; catching up once")
+        return True
+
+    def _dispatch(self):
+        """Hand ready jobs to free workers (lock held). A firing that waited
+        for a worker past the grace period is a misfire too."""
+        while self._ready and self._active < self.max_concurrent and self._pool:
+            job = self._ready.pop(0)
+            late = time.time() - job._ready_due - job.jitter
+            if (late > self.misfire_grace and not job._caught_up
+                    and not self._misfire(job, late, "waited for a free worker")):
+                continue
+            job.running = True
+            self._active += 1
+            self.stats["fired"] += 1
+            self._pool.submit(self._run_job, job)
+
+    def _run_job(self, job: ScheduledJob):
+        status = "error"
+        try:
+            workflow = Workflow.from_dict(job.workflow.to_dict())  # private copy per run
+            workflow.variables.update(job.variables)
+            if job.priority is not None:
+                workflow.priority = job.priority
+            if job.engine is None:
+                job.engine = self.engine_factory()
+            engine = job.engine
+            engine.start(workflow)
+            engine.wait()
+            engine.events.close()  # deliver this run's events, then free the thread
+            status = engine.last_run_summary.get("status", "completed")
+            if engine.last_run_summary.get("steps", {}).get("failed"):
+                status = "failed"
+        except Exception as e:
+            logger.error(f"Scheduled workflow '{job.name}' failed: {e}")
+            job.engine = None  # start afresh next time
+            status = f"error: {e}"
+        finally:
+            with self._cond:
+                job.running = False
+                job.last_run = time.time()
+                job.last_status = status
+                job.runs += 1
+                self._active -= 1
+                self._cond.notify()
+
+        if self.on_job_done:
+            try:
+                self.on_job_done(job, status)
+            except Exception:
+                pass
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Run Snapshots — suspend a workflow run to disk and resume it elsewhere.
+
+A snapshot holds everything a run needs to continue: the workflow itself
+(steps and variables), each step's status and result, the loop iteration,
+the run's counters and elapsed time. It is written when a run is suspended
+between steps (`WorkflowEngine.suspend_to_disk()`), after which the run's
+thread exits. Any process — the GUI after a restart, or the headless
+runner — can then claim the file and continue the run with
+`WorkflowEngine.restore()`:
+
+    store = SnapshotStore("workflows/suspended")
+    snapshot = store.claim("20250212-101500-123456")   # run id or path
+    engine.restore(snapshot)
+
+Claiming renames the file so two processes never resume the same run.
+The new name records the claiming process; a claim whose process has
+exited on this host (it crashed mid-run) is given back by the next list().
+"""
+
+import json
+import os
+import re
+import socket
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+from project_lock import pid_alive
+from workflow_journal import safe_file_name
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SUFFIX = ".snapshot.json"
+CLAIMED_SUFFIX = ".claimed"
+# <snapshot file>.<pid>@<host>.claimed
+_CLAIMED_NAME = re.compile(rf"^(.+?{re.escape(SUFFIX)})(?:\.(\d+)@(.+))?{re.escape(CLAIMED_SUFFIX)}$")
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class RunSnapshot:
+    """Serializable state of a suspended run"""
+
+    def __init__(self, run_id: str, workflow: Dict[str, Any], steps: List[Dict[str, Any]],
+                 iteration: int = 0, stats: Optional[Dict[str, Any]] = None,
+                 elapsed: float = 0.0, loop_mode: bool = False, loop_interval: float = 120.0,
+                 skip_unchanged: bool = False, resumes: int = 0,
+                 suspended_at: Optional[float] = None):
+        self.run_id = run_id
+        self.workflow = workflow  # Workflow.to_dict(), variables included
+        self.steps = steps  # per step: name, status, result, result_path, attempts, times
+        self.iteration = iteration
+        self.stats = stats or {}
+        self.elapsed = elapsed
+        self.loop_mode = loop_mode
+        self.loop_interval = loop_interval
+        self.skip_unchanged = skip_unchanged
+        self.resumes = resumes  # times this run has been restored before
+        self.suspended_at = suspended_at or time.time()
+        self.path: Optional[Path] = None  # set once saved or loaded
+
+    @property
+    def workflow_name(self) -> str:
+        return self.workflow.get("name", "")
+
+    @property
+    def current_step(self) -> int:
+        """Index of the first step still to run (len(steps) if none)"""
+        for i, step in enumerate(self.steps):
+            if step["status"] == "pending":
+                return i
+        return len(self.steps)
+
+    @staticmethod
+    def step_state(step: Any) -> Dict[str, Any]:
+        """The parts of a WorkflowStep that change while it runs"""
+        return {
+            "name": step.name,
+            "status": step.status if step.status != "running" else "pending",
+            "result": step.result,
+            "result_path": step.result_path,
+            "attempts": step.attempts,
+            "started_at": _iso(step.started_at),
+            "completed_at": _iso(step.completed_at),
+        }
+
+    def apply_steps(self, steps: List[Any]):
+        """Restore step states onto the workflow's steps (matched by position
+        and name; a step that does not match stays pending)"""
+        for step, state in zip(steps, self.steps):
+            if step.name != state["name"]:
+                logger.warning(f"Snapshot step '{state['name']}' does not match '{step.name}'")
+                continue
+            step.status = state["status"]
+            step.result = state.get("result") or ""
+            step.result_path = state.get("result_path")
+            step.attempts = state.get("attempts", 0)
+            step.started_at = _parse_iso(state.get("started_at"))
+            step.completed_at = _parse_iso(state.get("completed_at"))
+
+    def to_dict(self) -> dict:
+        return {
+            "format": FORMAT_VERSION,
+            "run_id": self.run_id,
+            "workflow": self.workflow,
+            "steps": self.steps,
+            "iteration": self.iteration,
+            "stats": self.stats,
+            "elapsed": self.elapsed,
+            "loop_mode": self.loop_mode,
+            "loop_interval": self.loop_interval,
+            "skip_unchanged": self.skip_unchanged,
+            "resumes": self.resumes,
+            "suspended_at": self.suspended_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunSnapshot":
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {data.get('format')}")
+        return cls(
+            run_id=data["run_id"],
+            workflow=data["workflow"],
+            steps=data.get("steps", []),
+            iteration=data.get("iteration", 0),
+            stats=data.get("stats"),
+            elapsed=data.get("elapsed", 0.0),
+            loop_mode=data.get("loop_mode", False),
+            loop_interval=data.get("loop_interval", 120.0),
+            skip_unchanged=data.get("skip_unchanged", False),
+            resumes=data.get("resumes", 0),
+            suspended_at=data.get("suspended_at"),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RunSnapshot":
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = cls.from_dict(json.load(f))
+        snapshot.path = Path(path)
+        return snapshot
+
+    def __repr__(self):
+        return (f"RunSnapshot(run_id={self.run_id!r}, workflow={self.workflow_name!r}, "
+                f"step={self.current_step}/{len(self.steps)})")
+
+
+class SnapshotStore:
+    """Directory of suspended runs, one JSON file per run"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def save(self, snapshot: RunSnapshot) -> Path:
+        """Write the snapshot atomically; returns its path"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{safe_file_name(snapshot.workflow_name)}__{snapshot.run_id}{SUFFIX}"
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot.to_dict(), f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        snapshot.path = path
+        return path
+
+    def list(self, workflow_name: Optional[str] = None) -> List[RunSnapshot]:
+        """Unclaimed snapshots, most recently suspended first (claims left
+        behind by crashed processes on this host are given back first)"""
+        if not self.directory.is_dir():
+            return []
+        self._recover_stale_claims()
+        pattern = f"{safe_file_name(workflow_name)}__*{SUFFIX}" if workflow_name else f"*{SUFFIX}"
+        snapshots = []
+        for path in self.directory.glob(pattern):
+            try:
+                snapshots.append(RunSnapshot.load(str(path)))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable snapshot {path.name}: {e}")
+        return sorted(snapshots, key=lambda s: s.suspended_at, reverse=True)
+
+    def find(self, workflow_name: str) -> Optional[RunSnapshot]:
+        """The most recent suspended run of this workflow, if any"""
+        snapshots = [s for s in self.list(workflow_name) if s.workflow_name == workflow_name]
+        return snapshots[0] if snapshots else None
+
+    def claim(self, ref: str) -> RunSnapshot:
+        """Take ownership of a snapshot (a path, or a run id in this store)
+        so no other process resumes it. Raises FileNotFoundError if it does
+        not exist or was claimed already."""
+        path = Path(ref)
+        if not path.is_file():
+            matches = list(self.directory.glob(f"*__{ref}{SUFFIX}")) if self.directory.is_dir() else []
+            if not matches:
+                raise FileNotFoundError(f"No suspended run '{ref}' in {self.directory}")
+            path = matches[0]
+        owner = f"{os.getpid()}@{safe_file_name(socket.gethostname())}"
+        claimed = path.with_name(f"{path.name}.{owner}{CLAIMED_SUFFIX}")
+        os.rename(path, claimed)  # fails for whoever comes second
+        try:
+            return RunSnapshot.load(str(claimed))
+        except (OSError, ValueError, KeyError):
+            os.rename(claimed, path)  # leave it for someone who can read it
+            raise
+
+    @staticmethod
+    def unclaim(snapshot: RunSnapshot):
+        """Give a claimed snapshot back (its run could not be started)"""
+        match = _CLAIMED_NAME.match(snapshot.path.name) if snapshot.path else None
+        if match:
+            original = snapshot.path.with_name(match.group(1))
+            os.rename(snapshot.path, original)
+            snapshot.path = original
+
+    def _recover_stale_claims(self):
+        """Rename back snapshots claimed by processes on this host that have
+        exited. Claims from other hosts cannot be checked and are left alone."""
+        host = safe_file_name(socket.gethostname())
+        for path in self.directory.glob(f"*{SUFFIX}.*{CLAIMED_SUFFIX}"):
+            match = _CLAIMED_NAME.match(path.name)
+            if not match or not match.group(2) or match.group(3) != host:
+                continue
+            if pid_alive(int(match.group(2))):
+                continue
+            try:
+                os.rename(path, path.with_name(match.group(1)))
+                logger.warning(f"Recovered snapshot {match.group(1)} from exited process "
+                               f"{match.group(2)}")
+            except OSError as e:
+                logger.debug(f"Could not recover {path.name}: {e}")
+
+    @staticmethod
+    def release(snapshot: RunSnapshot):
+        """Delete a claimed snapshot once its run has ended or been saved again"""
+        if snapshot.path and snapshot.path.name.endswith(CLAIMED_SUFFIX):
+            try:
+                snapshot.path.unlink()
+            except OSError as e:
+                logger.debug(f"Could not remove {snapshot.path}: {e}")
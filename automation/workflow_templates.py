@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Prompt Templates — parse `{variable}` prompts once, render in a single pass.
+"""
+
+import re
+from typing import Dict, List, Mapping, Tuple
+
+# `{name}` where name has no braces. Names may contain whitespace, as with
+# the str.replace substitution saved workflows were written against; a
+# braced span that is not a variable (`{ return x; }`, JSON) is kept verbatim.
+_PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+_BARE_NAME = re.compile(r"[^\s]+")  # what counts as missing when unset
+
+
+class PromptTemplate:
+    """A prompt split into literal and placeholder segments"""
+
+    __slots__ = ("source", "_segments", "placeholders")
+
+    def __init__(self, source: str):
+        self.source = source
+        segments: List[Tuple[bool, str]] = []  # (is_placeholder, text_or_name)
+        pos = 0
+        for match in _PLACEHOLDER.finditer(source):
+            if match.start() > pos:
+                segments.append((False, source[pos:match.start()]))
+            segments.append((True, match.group(1)))
+            pos = match.end()
+        if pos < len(source):
+            segments.append((False, source[pos:]))
+        self._segments = segments
+        self.placeholders = frozenset(text for is_var, text in segments if is_var)
+
+    def render(self, variables: Mapping[str, object]) -> str:
+        """Substitute known variables; unknown placeholders are kept verbatim"""
+        if not self.placeholders:
+            return self.source
+        parts = []
+        for is_var, text in self._segments:
+            if is_var:
+                value = variables.get(text)
+                if value is None:
+                    parts.append("{" + text + "}")
+                elif isinstance(value, (list, tuple)):  # fan-out lists
+                    parts.append(", ".join(str(v) for v in value))
+                else:
+                    parts.append(str(value))
+            else:
+                parts.append(text)
+        return "".join(parts)
+
+    def missing(self, variables: Mapping[str, object]) -> List[str]:
+        """Placeholders that have no value in `variables`, sorted. Braced
+        text with whitespace is only a placeholder when such a variable exists."""
+        return sorted(name for name in self.placeholders
+                      if name not in variables and _BARE_NAME.fullmatch(name))
+
+
+class TemplateCache:
+    """Compiled templates for one workflow, keyed by step identity.
+    An entry is recompiled only when that step's prompt text changes;
+    `invalidate()` drops everything when the workflow revision changes."""
+
+    def __init__(self):
+        self._entries: Dict[int, PromptTemplate] = {}
+
+    def get(self, key: int, source: str) -> PromptTemplate:
+        template = self._entries.get(key)
+        if template is None or template.source != source:
+            template = PromptTemplate(source)
+            self._entries[key] = template
+        return template
+
+    def invalidate(self):
+        self._entries.clear()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Workflow Timers — Deadline-based waits for the Workflow Engine.
+Replaces sleep-polling with a condition variable that is notified on
+cancel / pause / resume, so waits end immediately instead of on the next tick.
+CancelToken carries cancellation and per-step deadlines into the editor bridge.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class RunClock:
+    """Condition-variable clock shared by one workflow run.
+
+    Any state change that should interrupt a wait (cancel, pause, resume,
+    loop toggled off) calls `notify()`. Waiters re-check their predicate
+    and only wake up otherwise at their deadline or the next countdown tick.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self.wakeups = 0  # number of times a waiter returned from the condition
+
+    def notify(self):
+        """Wake every waiter so it re-evaluates its predicate"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_for(self, predicate: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        """Block until `predicate()` is true or `timeout` elapses.
+        Returns the final value of the predicate."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not predicate():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return predicate()
+                self._cond.wait(remaining)
+                self.wakeups += 1
+            return True
+
+    def countdown(self, duration: float,
+                  interrupted: Callable[[], bool],
+                  paused: Callable[[], bool] = lambda: False,
+                  on_tick: Optional[Callable[[float], None]] = None,
+                  tick_interval: float = 1.0) -> bool:
+        """Wait `duration` seconds of un-paused time.
+
+        `on_tick(remaining)` is called once at the start and then every
+        `tick_interval` seconds (0 disables periodic ticks). Time spent paused
+        does not count down. Returns True if the full duration elapsed,
+        False if `interrupted()` became true first.
+        """
+        remaining = max(0.0, duration)
+        ticking = on_tick is not None and tick_interval > 0
+
+        if on_tick and remaining > 0:
+            self._tick(on_tick, remaining)
+
+        while remaining > 0:
+            if interrupted():
+                return False
+
+            if paused():
+                self.wait_for(lambda: interrupted() or not paused())
+                continue
+
+            started = time.monotonic()
+            step = min(remaining, tick_interval) if ticking else remaining
+            stopped = self.wait_for(lambda: interrupted() or paused(), timeout=step)
+            remaining -= time.monotonic() - started
+
+            if stopped:
+                continue  # loop re-checks interrupted / paused
+            if ticking and remaining > 0:
+                self._tick(on_tick, remaining)
+
+        return not interrupted()
+
+    @staticmethod
+    def _tick(on_tick: Callable[[float], None], remaining: float):
+        try:
+            on_tick(max(0.0, remaining))
+        except Exception:
+            pass
+
+
+# ═══════════════════════════════════════════════════
+# CANCELLATION
+# ═══════════════════════════════════════════════════
+class StepCancelled(Exception):
+    """Raised by CancelToken.sleep()/check() once the token is cancelled"""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class StepTimeout(StepCancelled):
+    """The token's deadline passed"""
+
+
+class CancelToken:
+    """Cancellation flag plus optional deadline, shared by everything doing
+    work for one step. Waits block on an Event, so cancel() interrupts them
+    immediately. Child tokens are cancelled with their parent."""
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancelToken"] = None):
+        self.deadline = None if not timeout else time.monotonic() + timeout
+        self.timeout = timeout
+        self._event = threading.Event()
+        self._reason = ""
+        self._lock = threading.Lock()
+        self._children: list = []
+        if parent is not None:
+            if parent.deadline is not None and (self.deadline is None or parent.deadline < self.deadline):
+                self.deadline = parent.deadline
+            parent._adopt(self)
+
+    def child(self, timeout: Optional[float] = None) -> "CancelToken":
+        return CancelToken(timeout, parent=self)
+
+    def _adopt(self, child: "CancelToken"):
+        with self._lock:
+            self._children = [c for c in self._children if not c._event.is_set()]
+            self._children.append(child)
+            cancelled = self._event.is_set()
+        if cancelled:
+            child.cancel(self._reason)
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if not self._event.is_set():
+                self._reason = reason
+                self._event.set()
+            children, self._children = self._children, []
+        for child in children:
+            child.cancel(reason)
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() was called or the deadline passed"""
+        return self._event.is_set() or self.expired
+
+    @property
+    def reason(self) -> str:
+        if self._event.is_set():
+            return self._reason
+        return "timeout" if self.expired else ""
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to `seconds`; returns True (early) if cancelled or expired"""
+        remaining = self.remaining()
+        timeout = seconds if remaining is None else min(seconds, remaining)
+        if self._event.wait(max(0.0, timeout)):
+            return True
+        return self.expired
+
+    def check(self):
+        """Raise StepTimeout / StepCancelled if the token is no longer live"""
+        if self._event.is_set():
+            raise StepCancelled(self._reason)
+        if self.expired:
+            raise StepTimeout(f"timed out after {self.timeout:g}s" if self.timeout else "timeout")
+
+    def sleep(self, seconds: float):
+        """Interruptible time.sleep(); raises as check() does"""
+        if self.wait(seconds):
+            self.check()